@@ -0,0 +1,79 @@
+"""
+Benchmark ID operations of the Dictionary model.
+
+Compares the indexed Dictionary against the previous linear-scan behaviour
+for get, tag update and delete at 100k and 1M entries.
+
+Usage: python benchmark/bench_dictionary.py [sizes...]
+"""
+import os
+import random
+import sys
+import time
+from typing import Callable, List, Optional
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from dictionary import Dictionary, Entry  # noqa: E402
+from entry_store import EntryView  # noqa: E402
+
+
+class LinearDictionary(Dictionary):
+    """
+    Dictionary with the previous O(n) lookup and delete, for comparison.
+    """
+    def get_entry(self, entry_id: str) -> Optional[EntryView]:
+        for entry in self.entries():
+            if entry.id == entry_id:
+                return entry
+        return None
+
+    def delete_entry(self, entry_id: str) -> bool:
+        if self.get_entry(entry_id) is None:
+            return False
+        return super().delete_entry(entry_id)
+
+
+def build(cls, size: int) -> Dictionary:
+    """
+    Build a dictionary of the given class with synthetic entries.
+    """
+    dictionary = cls()
+    for i in range(size):
+        dictionary.add_entry(Entry.model_construct(id=f"id-{i:08d}", word=f"word{i}", tags=["en"]))
+    return dictionary
+
+
+def time_ops(operation: Callable[[str], object], ids: List[str]) -> float:
+    """
+    Run an operation over the given IDs and return microseconds per call.
+    """
+    start = time.perf_counter()
+    for entry_id in ids:
+        operation(entry_id)
+    return (time.perf_counter() - start) / len(ids) * 1e6
+
+
+def bench(size: int, ops: int) -> None:
+    """
+    Run the comparison for one dictionary size.
+    """
+    rng = random.Random(size)
+    for name, cls in (("linear", LinearDictionary), ("indexed", Dictionary)):
+        dictionary = build(cls, size)
+        ids = [f"id-{rng.randrange(size):08d}" for _ in range(ops)]
+        get_us = time_ops(dictionary.get_entry, ids)
+        update_us = time_ops(lambda entry_id: dictionary.update_entry_tags(entry_id, ["ja"]), ids)
+        delete_ids = list(dict.fromkeys(ids))
+        delete_us = time_ops(dictionary.delete_entry, delete_ids)
+        print(f"{size:>9} {name:<8} get {get_us:>12.2f} us  update {update_us:>12.2f} us  delete {delete_us:>12.2f} us")
+
+
+def main() -> None:
+    sizes = [int(arg) for arg in sys.argv[1:]] or [100_000, 1_000_000]
+    for size in sizes:
+        bench(size, ops=200)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+"""
+Benchmark memory held per dictionary entry.
+
+Compares the previous layout, a list of Entry models with an ID dict and a
+prefix index keyed by ID strings, with the columnar EntryStore behind
+Dictionary and the DictionaryDB prefix index. Both are built from the same
+serialized wordbank and measured with tracemalloc once the parsed JSON is
+released, so only what the database keeps alive is counted.
+
+Usage: python benchmark/bench_memory.py [sizes...]
+"""
+import gc
+import json
+import os
+import random
+import sys
+import time
+import tracemalloc
+import uuid
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from db import DictionaryDB  # noqa: E402
+from dict_manipulation import parse_dictionary  # noqa: E402
+from dictionary import Entry  # noqa: E402
+from prefix_index import normalize_word  # noqa: E402
+
+WORDS = ["学校", "한국어", "dictionary", "かわいい", "漢字", "사랑", "apple", "勉強"]
+TAGS = ["ja", "ko", "en", "n2", "n5", "weblio", "moji", "mastered"]
+
+
+def generate(size: int) -> str:
+    """
+    Generate a serialized wordbank.
+    """
+    rng = random.Random(size)
+    wordbank = [
+        {
+            "id": str(uuid.UUID(int=rng.getrandbits(128), version=4)),
+            "word": f"{rng.choice(WORDS)}{i}",
+            "tags": rng.sample(TAGS, rng.randint(0, 3)),
+        }
+        for i in range(size)
+    ]
+    return json.dumps({"wordbank": wordbank}, ensure_ascii=False)
+
+
+def build_legacy(content: str):
+    """
+    The previous layout: Entry models, an ID dict and a prefix index of IDs.
+    """
+    entries = [
+        Entry.model_construct(id=row["id"], word=row["word"], tags=row["tags"])
+        for row in json.loads(content)["wordbank"]
+    ]
+    by_id = {entry.id: entry for entry in entries}
+    pairs = sorted((normalize_word(entry.word), entry.id) for entry in entries)
+    index = ([word for word, _ in pairs], [entry_id for _, entry_id in pairs])
+    return entries, by_id, index
+
+
+def build_columnar(content: str) -> DictionaryDB:
+    """
+    The columnar layout, loaded the way the server loads a trusted snapshot.
+    """
+    db = DictionaryDB()
+    db.load_dictionary(parse_dictionary(content, trusted=True))
+    return db
+
+
+def measure(build, content: str):
+    """
+    Get the memory retained by the result of build(content), and the build time.
+    """
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = build(content)
+    elapsed = time.perf_counter() - start
+    gc.collect()
+    retained, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    gc.collect()
+    return retained, peak, elapsed
+
+
+def bench(size: int) -> None:
+    content = generate(size)
+    legacy, legacy_peak, legacy_s = measure(build_legacy, content)
+    columnar, columnar_peak, columnar_s = measure(build_columnar, content)
+    print(
+        f"{size:>9} entries  "
+        f"legacy {legacy / size:6.0f} B/entry (peak {legacy_peak / 1e6:6.1f} MB, {legacy_s:6.2f}s)  "
+        f"columnar {columnar / size:6.0f} B/entry (peak {columnar_peak / 1e6:6.1f} MB, {columnar_s:6.2f}s)  "
+        f"{legacy / columnar:4.1f}x smaller"
+    )
+
+
+def main() -> None:
+    sizes = [int(arg) for arg in sys.argv[1:]] or [10_000, 100_000, 1_000_000]
+    for size in sizes:
+        bench(size)
+
+
+if __name__ == "__main__":
+    main()
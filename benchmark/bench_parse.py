@@ -0,0 +1,91 @@
+"""
+Benchmark parse_dictionary on synthetic wordbanks.
+
+Compares the previous per-entry loop with full bulk validation and with the
+trusted fast path used for snapshots whose hash was already validated, at
+10k, 100k and 1M entries. One row in a thousand is malformed.
+
+Usage: python benchmark/bench_parse.py [sizes...]
+"""
+import json
+import os
+import random
+import sys
+import time
+import uuid
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from dict_manipulation import hash_content, parse_dictionary_with_stats  # noqa: E402
+from dictionary import Dictionary, Entry  # noqa: E402
+
+WORDS = ["学校", "한국어", "dictionary", "かわいい", "漢字", "사랑", "apple", "勉強"]
+TAGS = ["ja", "ko", "en", "n2", "n5", "weblio", "moji", "mastered"]
+
+
+def generate(size: int, malformed_every: int = 1000) -> str:
+    """
+    Generate a serialized wordbank with a few malformed rows.
+    """
+    rng = random.Random(size)
+    wordbank = []
+    for i in range(size):
+        if malformed_every and i % malformed_every == malformed_every - 1:
+            wordbank.append({"id": str(uuid.UUID(int=rng.getrandbits(128))), "tags": ["ja"]})
+            continue
+        wordbank.append({
+            "id": str(uuid.UUID(int=rng.getrandbits(128))),
+            "word": f"{rng.choice(WORDS)}{i}",
+            "tags": rng.sample(TAGS, 2),
+        })
+    return json.dumps({"wordbank": wordbank}, ensure_ascii=False, indent=2)
+
+
+def parse_legacy(content: str) -> Dictionary:
+    """
+    The previous implementation: one validated Entry per loop iteration.
+    """
+    data = json.loads(content)
+    dictionary = Dictionary()
+    for entry_data in data.get("wordbank", []):
+        try:
+            entry = Entry(
+                id=entry_data.get("id"),
+                word=entry_data.get("word"),
+                tags=entry_data.get("tags", [])
+            )
+            dictionary.add_entry(entry)
+        except Exception:
+            pass
+    return dictionary
+
+
+def timed(function, *args):
+    start = time.perf_counter()
+    result = function(*args)
+    return result, time.perf_counter() - start
+
+
+def bench(size: int) -> None:
+    content = generate(size)
+    legacy, legacy_s = timed(parse_legacy, content)
+    _, hash_s = timed(hash_content, content)
+    (dictionary, validated), validated_s = timed(parse_dictionary_with_stats, content, False)
+    # Only clean content is ever trusted: time the snapshot that was just validated
+    (_, fast), fast_s = timed(parse_dictionary_with_stats, dictionary.to_json(), True)
+    print(
+        f"{size:>9} entries  {len(content) / 1e6:7.1f} MB  "
+        f"legacy {legacy_s:7.3f}s  validated {validated_s:7.3f}s  "
+        f"trusted {fast_s:7.3f}s  hash {hash_s:6.3f}s  "
+        f"skipped {validated.skipped} (legacy kept {legacy.count()}, validated kept {validated.entries})"
+    )
+
+
+def main() -> None:
+    sizes = [int(arg) for arg in sys.argv[1:]] or [10_000, 100_000, 1_000_000]
+    for size in sizes:
+        bench(size)
+
+
+if __name__ == "__main__":
+    main()
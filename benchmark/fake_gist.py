@@ -0,0 +1,321 @@
+"""
+Local stand-in for the GitHub Gist API, for load testing without GitHub.
+
+Implements the parts of the API the service uses: GET and PATCH of a gist
+with ETag revalidation, the revision list and gists at a revision, and raw
+URLs for files too large to be inlined. Gists are kept in memory and any
+gist ID exists, empty until first written.
+
+Faults can be injected to see how the service copes: latency, a rate limit
+quota with GitHub's headers, secondary rate limit (429) and 5xx responses,
+and truncation of large files. They are set on the command line and can be
+changed at runtime with POST /_faults; GET /_stats reports request counts.
+
+Point the service at it with GITHUB_API_URL=http://127.0.0.1:8700.
+
+Usage: python benchmark/fake_gist.py [--port 8700] [--latency-ms 50] ...
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import random
+import time
+import uuid
+from typing import Any, Dict, List, Optional
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, PlainTextResponse, Response
+
+# GitHub inlines file contents up to this size in gist responses
+GITHUB_TRUNCATE_BYTES = 1024 * 1024
+
+
+class Faults:
+    """
+    Fault injection settings.
+    """
+    def __init__(
+        self,
+        latency_ms: float = 0.0,
+        jitter_ms: float = 0.0,
+        error_rate: float = 0.0,
+        throttle_rate: float = 0.0,
+        rate_limit: int = 5000,
+        rate_window: float = 3600.0,
+        truncate_bytes: int = GITHUB_TRUNCATE_BYTES,
+    ):
+        """
+        Args:
+            latency_ms: Delay added to every response
+            jitter_ms: Random extra delay, up to this much
+            error_rate: Fraction of requests answered with a 5xx error
+            throttle_rate: Fraction of requests answered with 429 and Retry-After
+            rate_limit: Requests allowed per window, as x-ratelimit-limit
+            rate_window: Length of the rate limit window in seconds
+            truncate_bytes: Files larger than this are truncated in gist responses
+        """
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.throttle_rate = throttle_rate
+        self.rate_limit = rate_limit
+        self.rate_window = rate_window
+        self.truncate_bytes = truncate_bytes
+
+    def update(self, settings: Dict[str, Any]) -> None:
+        """
+        Change some settings, ignoring unknown names.
+        """
+        for name, value in settings.items():
+            if hasattr(self, name):
+                setattr(self, name, type(getattr(self, name))(value))
+
+    def to_dict(self) -> Dict[str, Any]:
+        return dict(vars(self))
+
+
+class Gist:
+    """
+    In-memory gist with its revisions, newest last.
+    """
+    def __init__(self, gist_id: str):
+        self.id = gist_id
+        self.files: Dict[str, str] = {}
+        self.revisions: List[Dict[str, Any]] = []
+        self.commit({})
+
+    @property
+    def version(self) -> str:
+        return self.revisions[-1]["version"]
+
+    @property
+    def etag(self) -> str:
+        return f'"{self.version}"'
+
+    def commit(self, changes: Dict[str, Optional[Dict[str, Any]]]) -> None:
+        """
+        Apply a PATCH files object and record a revision.
+        """
+        additions = deletions = 0
+        for name, change in changes.items():
+            old = self.files.get(name, "")
+            if change is None:
+                self.files.pop(name, None)
+                deletions += old.count("\n") + 1 if old else 0
+                continue
+            content = change.get("content")
+            if content is None:
+                continue
+            self.files[change.get("filename") or name] = content
+            if change.get("filename") and change["filename"] != name:
+                self.files.pop(name, None)
+            additions += content.count("\n") + 1
+            deletions += old.count("\n") + 1 if old else 0
+        version = hashlib.sha1(f"{self.id}{len(self.revisions)}{uuid.uuid4()}".encode()).hexdigest()
+        self.revisions.append({
+            "version": version,
+            "committed_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+            "change_status": {"additions": additions, "deletions": deletions, "total": additions + deletions},
+            "files": dict(self.files),
+        })
+
+    def revision(self, version: str) -> Optional[Dict[str, Any]]:
+        for revision in self.revisions:
+            if revision["version"].startswith(version):
+                return revision
+        return None
+
+
+def create_app(faults: Optional[Faults] = None, seed: Optional[Dict[str, Dict[str, str]]] = None) -> FastAPI:
+    """
+    Create the fake gist API.
+
+    Args:
+        faults: Fault injection settings, none by default
+        seed: Initial files of gists, by gist ID
+
+    Returns:
+        FastAPI application
+    """
+    app = FastAPI(title="Fake GitHub Gist API")
+    app.state.faults = faults = faults or Faults()
+    gists: Dict[str, Gist] = {}
+    stats: Dict[str, int] = {}
+    quota = {"remaining": faults.rate_limit, "reset": time.time() + faults.rate_window}
+
+    def get_gist(gist_id: str) -> Gist:
+        if gist_id not in gists:
+            gists[gist_id] = Gist(gist_id)
+        return gists[gist_id]
+
+    for gist_id, files in (seed or {}).items():
+        get_gist(gist_id).commit({name: {"content": content} for name, content in files.items()})
+
+    def count(name: str) -> None:
+        stats[name] = stats.get(name, 0) + 1
+
+    def rate_headers() -> Dict[str, str]:
+        return {
+            "x-ratelimit-limit": str(faults.rate_limit),
+            "x-ratelimit-remaining": str(max(0, quota["remaining"])),
+            "x-ratelimit-reset": str(int(quota["reset"])),
+            "x-ratelimit-used": str(faults.rate_limit - max(0, quota["remaining"])),
+        }
+
+    @app.middleware("http")
+    async def inject_faults(request: Request, call_next):
+        if request.url.path.startswith("/_"):
+            return await call_next(request)
+        count("requests")
+        delay = faults.latency_ms + random.uniform(0, faults.jitter_ms)
+        if delay:
+            await asyncio.sleep(delay / 1000)
+
+        now = time.time()
+        if now >= quota["reset"]:
+            quota["remaining"] = faults.rate_limit
+            quota["reset"] = now + faults.rate_window
+        if quota["remaining"] <= 0:
+            count("rate_limited")
+            return JSONResponse(
+                {"message": "API rate limit exceeded"},
+                status_code=403,
+                headers=rate_headers(),
+            )
+        quota["remaining"] -= 1
+
+        if faults.throttle_rate and random.random() < faults.throttle_rate:
+            count("throttled")
+            return JSONResponse(
+                {"message": "You have exceeded a secondary rate limit"},
+                status_code=429,
+                headers={"retry-after": "1", **rate_headers()},
+            )
+        if faults.error_rate and random.random() < faults.error_rate:
+            count("errors")
+            return JSONResponse({"message": "Server Error"}, status_code=random.choice([500, 502, 503]), headers=rate_headers())
+
+        response = await call_next(request)
+        response.headers.update(rate_headers())
+        return response
+
+    def render(gist: Gist, revision: Dict[str, Any], request: Request) -> Dict[str, Any]:
+        base = str(request.base_url).rstrip("/")
+        files = {}
+        for name, content in revision["files"].items():
+            encoded = content.encode("utf-8")
+            truncated = len(encoded) > faults.truncate_bytes
+            files[name] = {
+                "filename": name,
+                "size": len(encoded),
+                "raw_url": f"{base}/raw/{gist.id}/{revision['version']}/{name}",
+                "truncated": truncated,
+                "content": encoded[:faults.truncate_bytes].decode("utf-8", "ignore") if truncated else content,
+            }
+        return {
+            "id": gist.id,
+            "url": f"{base}/gists/{gist.id}",
+            "files": files,
+            "history": [
+                {"version": r["version"], "committed_at": r["committed_at"], "change_status": r["change_status"]}
+                for r in reversed(gist.revisions[-10:])
+            ],
+        }
+
+    @app.get("/gists/{gist_id}")
+    async def read_gist(gist_id: str, request: Request):
+        count("get")
+        gist = get_gist(gist_id)
+        if request.headers.get("if-none-match") == gist.etag:
+            count("not_modified")
+            # Conditional requests answered 304 do not use the quota
+            quota["remaining"] += 1
+            return Response(status_code=304, headers={"ETag": gist.etag})
+        return JSONResponse(render(gist, gist.revisions[-1], request), headers={"ETag": gist.etag})
+
+    @app.patch("/gists/{gist_id}")
+    async def update_gist(gist_id: str, request: Request):
+        count("patch")
+        try:
+            body = await request.json()
+            changes = body["files"]
+        except (ValueError, KeyError, TypeError):
+            return JSONResponse({"message": "Problems parsing JSON"}, status_code=422)
+        gist = get_gist(gist_id)
+        gist.commit(changes)
+        return JSONResponse(render(gist, gist.revisions[-1], request), headers={"ETag": gist.etag})
+
+    @app.get("/gists/{gist_id}/commits")
+    async def list_commits(gist_id: str, page: int = 1, per_page: int = 30):
+        count("commits")
+        gist = get_gist(gist_id)
+        per_page = max(1, min(per_page, 100))
+        revisions = list(reversed(gist.revisions))[(page - 1) * per_page:page * per_page]
+        return [
+            {"version": r["version"], "committed_at": r["committed_at"], "change_status": r["change_status"]}
+            for r in revisions
+        ]
+
+    @app.get("/gists/{gist_id}/{version}")
+    async def read_revision(gist_id: str, version: str, request: Request):
+        count("revision")
+        gist = get_gist(gist_id)
+        revision = gist.revision(version)
+        if revision is None:
+            return JSONResponse({"message": "Not Found"}, status_code=404)
+        return render(gist, revision, request)
+
+    @app.get("/raw/{gist_id}/{version}/{name}")
+    async def read_raw(gist_id: str, version: str, name: str):
+        count("raw")
+        revision = get_gist(gist_id).revision(version)
+        if revision is None or name not in revision["files"]:
+            return PlainTextResponse("Not Found", status_code=404)
+        return PlainTextResponse(revision["files"][name])
+
+    @app.post("/_faults")
+    async def set_faults(request: Request):
+        faults.update(await request.json())
+        return faults.to_dict()
+
+    @app.get("/_stats")
+    async def get_stats():
+        return {"requests": stats, "faults": faults.to_dict(), "rate_limit_remaining": quota["remaining"]}
+
+    return app
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Local stand-in for the GitHub Gist API.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8700)
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="Delay added to every response")
+    parser.add_argument("--jitter-ms", type=float, default=0.0, help="Random extra delay, up to this much")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of 5xx responses")
+    parser.add_argument("--throttle-rate", type=float, default=0.0, help="Fraction of 429 responses")
+    parser.add_argument("--rate-limit", type=int, default=5000, help="Requests allowed per window")
+    parser.add_argument("--rate-window", type=float, default=3600.0, help="Rate limit window in seconds")
+    parser.add_argument("--truncate-bytes", type=int, default=GITHUB_TRUNCATE_BYTES, help="Truncate larger files")
+    parser.add_argument("--seed", help="JSON file of {gist_id: {file name: content}} to start from")
+    args = parser.parse_args()
+
+    faults = Faults(
+        latency_ms=args.latency_ms,
+        jitter_ms=args.jitter_ms,
+        error_rate=args.error_rate,
+        throttle_rate=args.throttle_rate,
+        rate_limit=args.rate_limit,
+        rate_window=args.rate_window,
+        truncate_bytes=args.truncate_bytes,
+    )
+    seed = None
+    if args.seed:
+        with open(args.seed, encoding="utf-8") as f:
+            seed = json.load(f)
+    uvicorn.run(create_app(faults, seed), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
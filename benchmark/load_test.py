@@ -0,0 +1,332 @@
+"""
+Load generator driving the service against the fake gist server.
+
+Starts benchmark/fake_gist.py in process (or uses a running one given with
+--gist-url), seeds it with a synthetic wordbank, serves server.app with
+uvicorn on a free port and runs concurrent clients through a mix of reads
+and writes for a fixed duration. Reports throughput, tail latency and error
+counts per operation, and the requests the fake gist received.
+
+Usage: python benchmark/load_test.py [--duration 30] [--concurrency 32]
+       [--entries 10000] [--latency-ms 80] [--error-rate 0.01] [--output FILE]
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import sys
+import tempfile
+import threading
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Tuple
+
+BENCHMARK_PATH = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BENCHMARK_PATH)
+
+import httpx  # noqa: E402
+import uvicorn  # noqa: E402
+
+from fake_gist import GITHUB_TRUNCATE_BYTES, Faults, create_app  # noqa: E402
+from suite import SRC_PATH  # noqa: E402, F401 - puts src/ on sys.path
+from suite.data import generate_wordbank, serialize_wordbank  # noqa: E402
+
+GIST_ID = "loadtest"
+HEADERS = {"Authorization": "Bearer test_api_key"}
+
+# Relative weights of the operations in the mix
+MIX = {
+    "get_dictionary": 5,
+    "get_dictionary_not_modified": 10,
+    "list_entries": 15,
+    "tag_query": 10,
+    "get_entry": 25,
+    "suggest": 15,
+    "create_entry": 8,
+    "update_tags": 8,
+    "delete_entry": 4,
+}
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def serve(app, port: int) -> uvicorn.Server:
+    """
+    Run an ASGI app with uvicorn in a background thread until it is started.
+    """
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning", lifespan="on"))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        if not thread.is_alive():
+            raise RuntimeError(f"Server on port {port} failed to start")
+        time.sleep(0.05)
+    server.thread = thread
+    return server
+
+
+def percentiles(samples: List[float]) -> Dict[str, float]:
+    """
+    Summarize latency samples given in seconds, in milliseconds.
+    """
+    if not samples:
+        return {}
+    ordered = sorted(samples)
+    count = len(ordered)
+
+    def at(fraction: float) -> float:
+        return round(ordered[min(count - 1, int(fraction * count))] * 1e3, 3)
+
+    return {
+        "mean_ms": round(sum(ordered) / count * 1e3, 3),
+        "p50_ms": at(0.50),
+        "p90_ms": at(0.90),
+        "p99_ms": at(0.99),
+        "p999_ms": at(0.999),
+        "max_ms": round(ordered[-1] * 1e3, 3),
+    }
+
+
+class LoadGenerator:
+    """
+    Concurrent clients running the operation mix against the service.
+    """
+    def __init__(self, base_url: str, ids: List[str], seed: int = 0):
+        """
+        Args:
+            base_url: Base URL of the service
+            ids: IDs of the entries of the seeded wordbank
+            seed: Random seed of the operation mix
+        """
+        self.base_url = base_url
+        self.ids = ids
+        self.rng = random.Random(seed)
+        self.created: List[str] = []
+        self.etag = None
+        self.samples: Dict[str, List[float]] = {name: [] for name in MIX}
+        self.errors: Dict[str, Dict[str, int]] = {name: {} for name in MIX}
+        self.operations: Dict[str, Callable[[httpx.AsyncClient], Awaitable[httpx.Response]]] = {
+            name: getattr(self, name) for name in MIX
+        }
+
+    async def get_dictionary(self, client: httpx.AsyncClient) -> httpx.Response:
+        response = await client.get("/v1/dictionary")
+        self.etag = response.headers.get("etag", self.etag)
+        return response
+
+    async def get_dictionary_not_modified(self, client: httpx.AsyncClient) -> httpx.Response:
+        if self.etag is None:
+            return await self.get_dictionary(client)
+        return await client.get("/v1/dictionary", headers={"If-None-Match": self.etag})
+
+    async def list_entries(self, client: httpx.AsyncClient) -> httpx.Response:
+        return await client.get("/v1/dictionary/entries", params={"limit": 100})
+
+    async def tag_query(self, client: httpx.AsyncClient) -> httpx.Response:
+        query = self.rng.choice(["ja AND n2 AND NOT mastered", "ko OR zh", "NOT (en OR de OR fr)"])
+        return await client.get("/v1/dictionary/entries", params={"tags": query, "limit": 100})
+
+    async def get_entry(self, client: httpx.AsyncClient) -> httpx.Response:
+        return await client.get(f"/v1/dictionary/entries/{self.rng.choice(self.ids)}")
+
+    async def suggest(self, client: httpx.AsyncClient) -> httpx.Response:
+        return await client.get("/v1/dictionary/suggest", params={"prefix": self.rng.choice(["学", "sch", "의", "ca"])})
+
+    async def create_entry(self, client: httpx.AsyncClient) -> httpx.Response:
+        response = await client.post("/v1/dictionary/entries", json={"word": f"load-{self.rng.random():.8f}", "tags": ["en", "load"]})
+        if response.status_code == 200:
+            self.created.append(response.json()["id"])
+        return response
+
+    async def update_tags(self, client: httpx.AsyncClient) -> httpx.Response:
+        return await client.put(f"/v1/dictionary/entries/{self.rng.choice(self.ids)}/tags", json={"tags": ["en", "review"]})
+
+    async def delete_entry(self, client: httpx.AsyncClient) -> httpx.Response:
+        if not self.created:
+            return await self.create_entry(client)
+        return await client.delete(f"/v1/dictionary/entries/{self.created.pop()}")
+
+    async def worker(self, client: httpx.AsyncClient, deadline: float) -> None:
+        names, weights = list(MIX), list(MIX.values())
+        clock = time.perf_counter
+        while clock() < deadline:
+            name = self.rng.choices(names, weights)[0]
+            start = clock()
+            try:
+                response = await self.operations[name](client)
+                status = response.status_code
+            except httpx.HTTPError as e:
+                status = type(e).__name__
+            elapsed = clock() - start
+            if isinstance(status, int) and status < 400:
+                self.samples[name].append(elapsed)
+            else:
+                self.errors[name][str(status)] = self.errors[name].get(str(status), 0) + 1
+
+    async def run(self, duration: float, concurrency: int) -> float:
+        """
+        Run the clients for a duration.
+
+        Returns:
+            Elapsed seconds
+        """
+        limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+        async with httpx.AsyncClient(base_url=self.base_url, headers=HEADERS, limits=limits, timeout=60) as client:
+            start = time.perf_counter()
+            deadline = start + duration
+            await asyncio.gather(*(self.worker(client, deadline) for _ in range(concurrency)))
+            return time.perf_counter() - start
+
+    def report(self, elapsed: float) -> Dict[str, Any]:
+        operations = {}
+        for name in MIX:
+            errors = sum(self.errors[name].values())
+            operations[name] = {
+                "ok": len(self.samples[name]),
+                "errors": errors,
+                "error_statuses": self.errors[name],
+                "ops_per_s": round(len(self.samples[name]) / elapsed, 1),
+                **percentiles(self.samples[name]),
+            }
+        every = [sample for samples in self.samples.values() for sample in samples]
+        total_errors = sum(operation["errors"] for operation in operations.values())
+        return {
+            "elapsed_s": round(elapsed, 2),
+            "requests": len(every) + total_errors,
+            "errors": total_errors,
+            "ops_per_s": round(len(every) / elapsed, 1),
+            **percentiles(every),
+            "operations": operations,
+        }
+
+
+def prepare_home(gist_url: str) -> str:
+    """
+    Point the service at the fake gist, with its state in a temporary HOME.
+    """
+    home = tempfile.mkdtemp(prefix="gist-dictionary-load-")
+    os.environ["HOME"] = os.environ["USERPROFILE"] = home
+    os.environ["GITHUB_API_URL"] = gist_url
+    config_dir = os.path.join(home, ".gist_dictionary", "config")
+    os.makedirs(config_dir, exist_ok=True)
+    with open(os.path.join(config_dir, "gist_dictionary.json"), "w") as f:
+        json.dump({"GH_TOKEN": "loadtest", "config": {"gist_name": GIST_ID}}, f)
+    return home
+
+
+def seed_files(entries: int) -> Tuple[Dict[str, str], List[str]]:
+    """
+    Generate the wordbank as gist files.
+
+    Returns:
+        Tuple of (mapping of gist file name to content, entry IDs)
+    """
+    from dict_manipulation import parse_dictionary
+    from shard import split_dictionary
+
+    rows = generate_wordbank(entries)
+    dictionary = parse_dictionary(serialize_wordbank(rows), trusted=True)
+    return split_dictionary(dictionary.entries()), [row["id"] for row in rows]
+
+
+async def wait_until_loaded(base_url: str, entries: int, timeout: float = 120) -> None:
+    """
+    Wait for the service to have loaded the seeded wordbank from the gist.
+    """
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient(base_url=base_url, headers=HEADERS) as client:
+        while time.monotonic() < deadline:
+            response = await client.get("/v1/dictionary", timeout=60)
+            if response.status_code == 200 and len(response.json().get("wordbank", [])) >= entries:
+                return
+            await asyncio.sleep(0.2)
+    raise RuntimeError(f"Service did not load {entries} entries within {timeout}s")
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Load test the dictionary service against a fake gist.")
+    parser.add_argument("--duration", type=float, default=30.0, help="Seconds of load")
+    parser.add_argument("--concurrency", type=int, default=32, help="Concurrent clients")
+    parser.add_argument("--entries", type=int, default=10_000, help="Entries of the seeded wordbank")
+    parser.add_argument("--gist-url", help="Use this running fake gist server instead of starting one")
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="Latency of the fake gist")
+    parser.add_argument("--jitter-ms", type=float, default=0.0, help="Random extra latency of the fake gist")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of 5xx from the fake gist")
+    parser.add_argument("--throttle-rate", type=float, default=0.0, help="Fraction of 429 from the fake gist")
+    parser.add_argument("--rate-limit", type=int, default=5000, help="Rate limit quota of the fake gist")
+    parser.add_argument("--truncate-bytes", type=int, default=GITHUB_TRUNCATE_BYTES, help="Truncation of the fake gist")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed of the operation mix")
+    parser.add_argument("--output", help="Also write the report to this JSON file")
+    return parser.parse_args()
+
+
+def main() -> int:
+    args = parse_args()
+    # The fake gist starts without faults so that seeding and loading succeed
+    faults = Faults(rate_limit=args.rate_limit, truncate_bytes=args.truncate_bytes)
+    gist_url = args.gist_url
+    gist_server = None
+    if gist_url is None:
+        gist_port = free_port()
+        gist_server = serve(create_app(faults), gist_port)
+        gist_url = f"http://127.0.0.1:{gist_port}"
+    prepare_home(gist_url)
+
+    files, ids = seed_files(args.entries)
+    gist_auth = {"Authorization": "token loadtest"}
+    httpx.patch(
+        f"{gist_url}/gists/{GIST_ID}",
+        json={"files": {name: {"content": content} for name, content in files.items()}},
+        headers=gist_auth,
+        timeout=120,
+    ).raise_for_status()
+
+    import server
+
+    port = free_port()
+    service = serve(server.app, port)
+    base_url = f"http://127.0.0.1:{port}"
+    try:
+        asyncio.run(wait_until_loaded(base_url, args.entries))
+        httpx.post(f"{gist_url}/_faults", json={
+            "latency_ms": args.latency_ms,
+            "jitter_ms": args.jitter_ms,
+            "error_rate": args.error_rate,
+            "throttle_rate": args.throttle_rate,
+        }).raise_for_status()
+
+        generator = LoadGenerator(base_url, ids, args.seed)
+        elapsed = asyncio.run(generator.run(args.duration, args.concurrency))
+        report = {
+            "settings": {key: value for key, value in vars(args).items() if key != "output"},
+            **generator.report(elapsed),
+            "gist": httpx.get(f"{gist_url}/_stats").json(),
+        }
+    finally:
+        service.should_exit = True
+        service.thread.join()
+        if gist_server is not None:
+            gist_server.should_exit = True
+            gist_server.thread.join()
+
+    print(f"{report['requests']} requests in {report['elapsed_s']}s, {report['ops_per_s']} ok/s, {report['errors']} errors")
+    print(f"{'operation':<30}{'ok/s':>9}{'p50 ms':>10}{'p99 ms':>10}{'p99.9 ms':>10}{'errors':>8}")
+    for name, operation in report["operations"].items():
+        print(
+            f"{name:<30}{operation['ops_per_s']:>9}{operation.get('p50_ms', '-'):>10}"
+            f"{operation.get('p99_ms', '-'):>10}{operation.get('p999_ms', '-'):>10}{operation['errors']:>8}"
+        )
+    print(f"gist requests: {report['gist']['requests']}")
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
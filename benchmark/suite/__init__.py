@@ -0,0 +1,19 @@
+"""
+Benchmark suite of the dictionary service.
+
+Generates synthetic multilingual wordbanks and measures parsing,
+serialization, DictionaryDB operations, pagination and the HTTP endpoints
+at several sizes. Results are written as JSON and compared with the
+baseline committed in benchmark/baseline.json (10k and 100k entries) to
+catch regressions. Refresh it with --save-baseline after an intended change.
+
+Usage: python -m benchmark.suite [--sizes N ...] [--cases NAME ...]
+       [--output FILE] [--baseline FILE | --no-baseline] [--save-baseline FILE]
+"""
+import os
+import sys
+
+# The application modules are imported as top-level modules, as in src/
+SRC_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "src")
+if SRC_PATH not in sys.path:
+    sys.path.insert(0, SRC_PATH)
@@ -0,0 +1,73 @@
+"""
+Command line entry point: python -m benchmark.suite --help
+"""
+import argparse
+import os
+import sys
+import tempfile
+
+# Results committed with the code, at the sizes a change is usually checked at
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "baseline.json")
+
+
+def parse_args() -> argparse.Namespace:
+    from .cases import CASES
+
+    parser = argparse.ArgumentParser(prog="python -m benchmark.suite", description="Benchmark the dictionary service.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000], help="Wordbank sizes")
+    parser.add_argument("--cases", nargs="+", choices=sorted(CASES), default=list(CASES), help="Cases to run")
+    parser.add_argument("--ops", type=int, default=1000, help="Operations timed by the per-operation cases")
+    parser.add_argument("--no-memory", action="store_true", help="Skip the peak memory measurements")
+    parser.add_argument("--output", help="Write the results to this JSON file instead of stdout")
+    parser.add_argument(
+        "--baseline",
+        default=os.path.normpath(BASELINE_PATH),
+        help="Compare with this results file, exiting with 1 on regressions (default: benchmark/baseline.json)",
+    )
+    parser.add_argument("--no-baseline", action="store_true", help="Skip the comparison with a baseline")
+    parser.add_argument("--save-baseline", help="Also write the results to this file as the new baseline")
+    parser.add_argument("--threshold", type=float, default=0.2, help="Relative change counted as a regression")
+    return parser.parse_args()
+
+
+def main() -> int:
+    # Keep the journal, caches and config of the benchmark away from the real ones
+    if "GIST_DICTIONARY_BENCH_HOME" not in os.environ:
+        os.environ["GIST_DICTIONARY_BENCH_HOME"] = os.environ["HOME"] = tempfile.mkdtemp(prefix="gist-dictionary-bench-")
+        os.environ["USERPROFILE"] = os.environ["HOME"]
+    home = os.environ["GIST_DICTIONARY_BENCH_HOME"]
+    config_dir = os.path.join(home, ".gist_dictionary", "config")
+    os.makedirs(config_dir, exist_ok=True)
+    with open(os.path.join(config_dir, "gist_dictionary.json"), "w") as f:
+        f.write('{"GH_TOKEN": "benchmark", "config": {"gist_name": "benchmark"}}')
+
+    from . import SRC_PATH  # noqa: F401 - puts src/ on sys.path
+    from .cases import CASES, Workload
+    from .report import compare, load_report, new_report, print_comparison, write_report
+
+    args = parse_args()
+    report = new_report(args.sizes, args.cases, args.ops)
+    for size in args.sizes:
+        print(f"Generating {size} entries", file=sys.stderr)
+        workload = Workload(size, args.ops, memory=not args.no_memory)
+        results = report["results"][str(size)] = {}
+        for name in args.cases:
+            print(f"  {name}", file=sys.stderr)
+            results[name] = CASES[name](workload)
+
+    write_report(report, args.output)
+    if args.save_baseline:
+        write_report(report, args.save_baseline)
+    if not args.no_baseline:
+        baseline = load_report(args.baseline)
+        if baseline is None:
+            print(f"No baseline at {args.baseline}", file=sys.stderr)
+            return 0
+        regressions, improvements = compare(report, baseline, args.threshold)
+        print_comparison(regressions, improvements, args.threshold)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
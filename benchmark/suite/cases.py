@@ -0,0 +1,222 @@
+"""
+Benchmark cases. Each case takes a Workload and returns a flat mapping of
+metric names to numbers; names ending in _s, _us or _bytes are better when
+lower, names ending in _per_s are better when higher.
+"""
+import asyncio
+import json
+import random
+from typing import Any, Callable, Dict, List
+
+from .data import generate_wordbank, serialize_wordbank
+from .measure import peak_memory, time_each, time_once
+
+
+class Workload:
+    """
+    Wordbank of one size shared by the cases.
+    """
+    def __init__(self, size: int, ops: int, memory: bool = True, seed: int = 0):
+        """
+        Generate the wordbank.
+
+        Args:
+            size: Number of entries
+            ops: Number of operations timed by the per-operation cases
+            memory: Measure peak memory, which runs some operations twice
+            seed: Random seed of the generated data
+        """
+        self.size = size
+        self.ops = ops
+        self.memory = memory
+        self.rows = generate_wordbank(size, seed)
+        self.content = serialize_wordbank(self.rows)
+        self.rng = random.Random(seed)
+
+    def sample_ids(self, count: int) -> List[str]:
+        """
+        Get IDs of existing entries in random order.
+        """
+        return [row["id"] for row in self.rng.sample(self.rows, min(count, len(self.rows)))]
+
+    def dictionary(self):
+        from dict_manipulation import parse_dictionary
+        return parse_dictionary(self.content, trusted=True)
+
+
+def bench_parse(workload: Workload) -> Dict[str, Any]:
+    """
+    parse_dictionary with full validation and with the trusted fast path.
+    """
+    from dict_manipulation import parse_dictionary
+
+    result: Dict[str, Any] = {"content_bytes": len(workload.content.encode("utf-8"))}
+    for mode, trusted in (("validated", False), ("trusted", True)):
+        dictionary, seconds = time_once(lambda: parse_dictionary(workload.content, trusted=trusted))
+        result[f"{mode}_s"] = seconds
+        result[f"{mode}_entries_per_s"] = dictionary.count() / seconds
+        if workload.memory:
+            result[f"{mode}_peak_bytes"] = peak_memory(lambda: parse_dictionary(workload.content, trusted=trusted))
+    return result
+
+
+def bench_serialize(workload: Workload) -> Dict[str, Any]:
+    """
+    Dictionary.to_json and the chunked iter_json used for streaming.
+    """
+    dictionary = workload.dictionary()
+    content, seconds = time_once(dictionary.to_json)
+    result: Dict[str, Any] = {
+        "to_json_s": seconds,
+        "to_json_bytes_per_s": len(content.encode("utf-8")) / seconds,
+    }
+    _, seconds = time_once(lambda: sum(len(chunk) for chunk in dictionary.iter_json()))
+    result["iter_json_s"] = seconds
+    if workload.memory:
+        result["to_json_peak_bytes"] = peak_memory(dictionary.to_json)
+    return result
+
+
+def bench_db(workload: Workload) -> Dict[str, Any]:
+    """
+    DictionaryDB create, get, tag update and delete, one entry at a time.
+    """
+    from db import DictionaryDB
+    from dictionary import EntryCreate
+
+    db = DictionaryDB()
+    _, seconds = time_once(lambda: db.load_dictionary(workload.dictionary()))
+    result: Dict[str, Any] = {"load_s": seconds}
+
+    new_entries = [EntryCreate(word=row["word"], tags=row["tags"]) for row in generate_wordbank(workload.ops, seed=1)]
+    created = []
+    operations: Dict[str, Callable[[], Dict[str, float]]] = {
+        "create": lambda: time_each(lambda entry: created.append(db.create_entry(entry).id), new_entries),
+        "get": lambda: time_each(db.get_entry, workload.sample_ids(workload.ops)),
+        "update_tags": lambda: time_each(lambda entry_id: db.update_entry_tags(entry_id, ["en", "review"]), workload.sample_ids(workload.ops)),
+        "suggest": lambda: time_each(lambda row: db.suggest(row["word"][:2]), workload.rng.sample(workload.rows, min(workload.ops, workload.size))),
+        "tag_query": lambda: time_each(lambda query: db.find_by_tags(query, limit=100), ["ja AND n2 AND NOT mastered", "ko OR zh", "NOT (en OR de OR fr)"] * max(1, workload.ops // 30)),
+        "delete": lambda: time_each(db.delete_entry, created),
+    }
+    for name, run in operations.items():
+        for metric, value in run().items():
+            result[f"{name}_{metric}"] = value
+    return result
+
+
+def bench_pagination(workload: Workload) -> Dict[str, Any]:
+    """
+    Walking the dictionary with cursors, and the previous offset paging.
+    """
+    from db import DictionaryDB
+
+    db = DictionaryDB()
+    db.load_dictionary(workload.dictionary())
+    pages = min(workload.ops, max(1, workload.size // 100))
+
+    cursors = [None]
+
+    def next_page(_):
+        _, cursor = db.get_entries_page(cursors[-1], 100)
+        cursors.append(cursor)
+
+    result = {f"cursor_page_{metric}": value for metric, value in time_each(next_page, range(pages)).items()}
+    # Offset paging is O(offset): sample pages spread over the dictionary
+    offsets = [workload.size * i // 20 for i in range(20)]
+    result.update({
+        f"offset_page_{metric}": value
+        for metric, value in time_each(lambda skip: db.get_entries(skip, 100), offsets).items()
+    })
+    return result
+
+
+class CheckedClient:
+    """
+    Test client wrapper failing the benchmark on error responses, so that
+    errors are not timed as if they were answers.
+    """
+    def __init__(self, client):
+        self.client = client
+
+    def __getattr__(self, method: str):
+        send = getattr(self.client, method)
+
+        def request(*args, **kwargs):
+            response = send(*args, **kwargs)
+            if response.status_code >= 400:
+                raise RuntimeError(f"{method.upper()} {args[0]} failed with {response.status_code}: {response.text[:200]}")
+            return response
+        return request
+
+
+def bench_endpoints(workload: Workload) -> Dict[str, Any]:
+    """
+    The FastAPI endpoints through a test client, with the gist served by an
+    in-process mock answering If-None-Match like GitHub.
+    """
+    import httpx
+    from fastapi.testclient import TestClient
+
+    import server
+    from shard import split_dictionary
+
+    files = split_dictionary(workload.dictionary().entries())
+    etag = f'"benchmark-{workload.size}"'
+    gist_body = json.dumps({"files": {name: {"content": content} for name, content in files.items()}})
+
+    def gist(request: httpx.Request) -> httpx.Response:
+        if request.method == "PATCH":
+            return httpx.Response(200, json={}, headers={"ETag": etag})
+        if request.headers.get("if-none-match") == etag:
+            return httpx.Response(304, headers={"ETag": etag})
+        return httpx.Response(200, content=gist_body, headers={"ETag": etag, "Content-Type": "application/json"})
+
+    # The lifespan closes the gist client on shutdown, so install the mock for every run
+    server.gist_client._session = httpx.AsyncClient(transport=httpx.MockTransport(gist), base_url="https://gist.invalid")
+    server.gist_client._semaphore = asyncio.Semaphore(server.gist_client.max_concurrency)
+
+    headers = {"Authorization": "Bearer test_api_key"}
+    result: Dict[str, Any] = {}
+    with TestClient(server.app) as test_client:
+        client = CheckedClient(test_client)
+        _, seconds = time_once(lambda: client.get(f"/{server.API_VERSION}/dictionary", headers=headers))
+        result["first_dictionary_s"] = seconds
+        base = f"/{server.API_VERSION}/dictionary"
+        current = {**headers, "If-None-Match": client.get(base, headers=headers).headers["etag"]}
+        repeats = max(3, min(workload.ops, 2_000_000 // workload.size))
+        requests: Dict[str, Callable[[Any], Any]] = {
+            "get_dictionary": lambda _: client.get(base, headers=headers),
+            "get_dictionary_stream": lambda _: client.get(f"{base}?stream=true", headers=headers),
+            "get_dictionary_not_modified": lambda _: client.get(base, headers=current),
+        }
+        for name, request in requests.items():
+            for metric, value in time_each(request, range(repeats)).items():
+                result[f"{name}_{metric}"] = value
+
+        ids = workload.sample_ids(workload.ops)
+        created: List[str] = []
+        requests = {
+            "get_entry": lambda entry_id: client.get(f"{base}/entries/{entry_id}", headers=headers),
+            "list_entries": lambda _: client.get(f"{base}/entries?limit=100", headers=headers),
+            "tag_query": lambda _: client.get(f"{base}/entries", params={"tags": "ja AND n2 AND NOT mastered"}, headers=headers),
+            "suggest": lambda entry_id: client.get(f"{base}/suggest", params={"prefix": "学"}, headers=headers),
+            "create_entry": lambda entry_id: created.append(
+                client.post(f"{base}/entries", json={"word": "benchmark", "tags": ["en"]}, headers=headers).json()["id"]
+            ),
+            "update_tags": lambda entry_id: client.put(f"{base}/entries/{entry_id}/tags", json={"tags": ["en", "review"]}, headers=headers),
+        }
+        for name, request in requests.items():
+            for metric, value in time_each(request, ids).items():
+                result[f"{name}_{metric}"] = value
+        for metric, value in time_each(lambda entry_id: client.delete(f"{base}/entries/{entry_id}", headers=headers), created).items():
+            result[f"delete_entry_{metric}"] = value
+    return result
+
+
+CASES: Dict[str, Callable[[Workload], Dict[str, Any]]] = {
+    "parse": bench_parse,
+    "serialize": bench_serialize,
+    "db": bench_db,
+    "pagination": bench_pagination,
+    "endpoints": bench_endpoints,
+}
@@ -0,0 +1,62 @@
+"""
+Synthetic multilingual wordbanks.
+"""
+import json
+import random
+import uuid
+from typing import Any, Dict, List
+
+# Characters words are drawn from, per script
+SCRIPTS = {
+    "ja": "あいうえおかきくけこさしすせそたちつてとなにぬねのはひふへほまみむめもやゆよらりるれろわをん学校勉強漢字日本語先生",
+    "ko": "가나다라마바사아자차카타파하한국어사랑학교공부선생님친구",
+    "zh": "的一是不了人我在有他这中大来上国个到说们为子和你地出道也时年",
+    "en": "abcdefghijklmnopqrstuvwxyz",
+    "de": "abcdefghijklmnopqrstuvwxyzäöüß",
+    "fr": "abcdefghijklmnopqrstuvwxyzéèêàçôù",
+    "ru": "абвгдеёжзийклмнопрстуфхцчшщъыьэюя",
+}
+LANGUAGES = list(SCRIPTS)
+LEVEL_TAGS = ["n1", "n2", "n3", "n4", "n5", "topik1", "topik2", "hsk3", "hsk4", "b1", "b2"]
+SOURCE_TAGS = ["weblio", "moji", "naver", "anki", "textbook", "news"]
+STATUS_TAGS = ["mastered", "review", "new"]
+
+
+def generate_wordbank(size: int, seed: int = 0) -> List[Dict[str, Any]]:
+    """
+    Generate wordbank rows with a language tag, usually a level or source
+    tag and sometimes a status tag, like a real learner's wordbank.
+
+    Args:
+        size: Number of entries
+        seed: Random seed, the same seed giving the same wordbank
+
+    Returns:
+        Rows with "id", "word" and "tags" keys
+    """
+    rng = random.Random(seed)
+    rows = []
+    for _ in range(size):
+        language = rng.choice(LANGUAGES)
+        script = SCRIPTS[language]
+        length = rng.randint(2, 4) if language in ("ja", "ko", "zh") else rng.randint(3, 12)
+        tags = [language]
+        if rng.random() < 0.7:
+            tags.append(rng.choice(LEVEL_TAGS))
+        if rng.random() < 0.5:
+            tags.append(rng.choice(SOURCE_TAGS))
+        if rng.random() < 0.3:
+            tags.append(rng.choice(STATUS_TAGS))
+        rows.append({
+            "id": str(uuid.UUID(int=rng.getrandbits(128), version=4)),
+            "word": "".join(rng.choice(script) for _ in range(length)),
+            "tags": tags,
+        })
+    return rows
+
+
+def serialize_wordbank(rows: List[Dict[str, Any]]) -> str:
+    """
+    Serialize rows the way a gist file stores them.
+    """
+    return json.dumps({"wordbank": rows}, ensure_ascii=False, indent=2)
@@ -0,0 +1,78 @@
+"""
+Timing and memory measurement helpers.
+"""
+import gc
+import time
+import tracemalloc
+from typing import Any, Callable, Dict, Iterable, List, Tuple
+
+
+def percentiles(samples: List[float]) -> Dict[str, float]:
+    """
+    Summarize latency samples given in seconds.
+
+    Returns:
+        Mean, p50, p90, p99 and max in microseconds
+    """
+    ordered = sorted(samples)
+    count = len(ordered)
+
+    def at(fraction: float) -> float:
+        return ordered[min(count - 1, int(fraction * count))] * 1e6
+
+    return {
+        "mean_us": sum(ordered) / count * 1e6,
+        "p50_us": at(0.50),
+        "p90_us": at(0.90),
+        "p99_us": at(0.99),
+        "max_us": ordered[-1] * 1e6,
+    }
+
+
+def time_each(operation: Callable[[Any], Any], items: Iterable[Any]) -> Dict[str, float]:
+    """
+    Time an operation once per item.
+
+    Returns:
+        Number of operations, throughput and latency percentiles
+    """
+    samples = []
+    clock = time.perf_counter
+    for item in items:
+        start = clock()
+        operation(item)
+        samples.append(clock() - start)
+    total = sum(samples)
+    return {"ops": len(samples), "ops_per_s": len(samples) / total if total else 0.0, **percentiles(samples)}
+
+
+def time_once(function: Callable[[], Any]) -> Tuple[Any, float]:
+    """
+    Time a single call.
+
+    Returns:
+        Tuple of (result, seconds)
+    """
+    gc.collect()
+    start = time.perf_counter()
+    result = function()
+    return result, time.perf_counter() - start
+
+
+def peak_memory(function: Callable[[], Any]) -> int:
+    """
+    Get the peak memory allocated by Python during a call. The call is
+    made again for this, since tracing allocations slows it down.
+
+    Returns:
+        Peak traced memory in bytes
+    """
+    gc.collect()
+    tracemalloc.start()
+    try:
+        result = function()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    del result
+    return peak
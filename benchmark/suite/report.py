@@ -0,0 +1,122 @@
+"""
+Machine-readable results and comparison with a baseline.
+"""
+import json
+import os
+import platform
+import sys
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+LOWER_IS_BETTER = ("_s", "_us", "_bytes")
+HIGHER_IS_BETTER = ("_per_s",)
+# Single worst samples are too noisy to flag regressions on
+IGNORED = ("_max_us",)
+
+
+def new_report(sizes: List[int], cases: List[str], ops: int) -> Dict[str, Any]:
+    """
+    Create an empty report describing the run.
+    """
+    return {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "python": platform.python_version(),
+            "implementation": platform.python_implementation(),
+            "platform": platform.platform(),
+            "sizes": sizes,
+            "cases": cases,
+            "ops": ops,
+        },
+        "results": {},
+    }
+
+
+def flatten(report: Dict[str, Any]) -> Dict[str, float]:
+    """
+    Get the metrics of a report as "size.case.metric" keys.
+    """
+    return {
+        f"{size}.{case}.{metric}": value
+        for size, cases in report.get("results", {}).items()
+        for case, metrics in cases.items()
+        for metric, value in metrics.items()
+        if isinstance(value, (int, float))
+    }
+
+
+def direction(metric: str) -> int:
+    """
+    Get 1 if higher values of a metric are better, -1 if lower values are, 0 if neither.
+    """
+    if metric.endswith(IGNORED):
+        return 0
+    if metric.endswith(HIGHER_IS_BETTER):
+        return 1
+    if metric.endswith(LOWER_IS_BETTER):
+        return -1
+    return 0
+
+
+def compare(report: Dict[str, Any], baseline: Dict[str, Any], threshold: float) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+    """
+    Compare the metrics present in both reports.
+
+    Args:
+        report: Current results
+        baseline: Stored baseline results
+        threshold: Relative change beyond which a metric counts as changed, e.g. 0.2
+
+    Returns:
+        Tuple of (regressions, improvements), each a list of metric changes
+    """
+    current, previous = flatten(report), flatten(baseline)
+    regressions, improvements = [], []
+    for key in sorted(current.keys() & previous.keys()):
+        sign = direction(key)
+        if not sign or not previous[key]:
+            continue
+        change = (current[key] - previous[key]) / previous[key]
+        row = {"metric": key, "baseline": previous[key], "current": current[key], "change": change}
+        if change * sign < -threshold:
+            regressions.append(row)
+        elif change * sign > threshold:
+            improvements.append(row)
+    return regressions, improvements
+
+
+def load_report(path: str) -> Optional[Dict[str, Any]]:
+    """
+    Read a report, None if the file does not exist.
+    """
+    if not os.path.exists(path):
+        return None
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def write_report(report: Dict[str, Any], path: Optional[str]) -> None:
+    """
+    Write a report to a file, or to stdout without a path.
+    """
+    content = json.dumps(report, indent=2, sort_keys=True)
+    if path is None:
+        print(content)
+        return
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(content + "\n")
+
+
+def print_comparison(regressions: List[Dict[str, Any]], improvements: List[Dict[str, Any]], threshold: float) -> None:
+    """
+    Print the metrics that changed beyond the threshold to stderr.
+    """
+    print(f"Compared with baseline (threshold {threshold:.0%}):", file=sys.stderr)
+    for title, rows in (("Regressions", regressions), ("Improvements", improvements)):
+        print(f"  {title}: {len(rows)}", file=sys.stderr)
+        for row in rows:
+            print(
+                f"    {row['metric']:<60} {row['baseline']:>14.6g} -> {row['current']:<14.6g} ({row['change']:+.1%})",
+                file=sys.stderr,
+            )
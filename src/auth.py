@@ -52,6 +52,10 @@ async def get_api_key(api_key_header: str = Security(api_key_header)) -> str:
     return api_key
 
 
+# Last token reported in the log, so each change is logged once
+_logged_token: Optional[str] = None
+
+
 def get_token() -> str:
     """
     Get GitHub token for Gist access.
@@ -59,9 +63,12 @@ def get_token() -> str:
     Returns:
         GitHub token string
     """
+    global _logged_token
     token = get_github_token()
     if token:
-        logger.success(f"GitHub token retrieved successfully")
+        if token != _logged_token:
+            logger.success(f"GitHub token retrieved successfully")
+            _logged_token = token
         return token
     
     logger.error("Failed to retrieve GitHub token")
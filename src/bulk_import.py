@@ -0,0 +1,165 @@
+"""
+Streaming bulk import of dictionary entries.
+
+This module parses NDJSON or CSV request bodies incrementally, line by line,
+and creates the entries through DictionaryDB in batches.
+"""
+import asyncio
+import csv
+import json
+from typing import AsyncIterator, List, Optional, Tuple
+
+from const import BULK_IMPORT_BATCH_SIZE, BULK_IMPORT_MAX_ERRORS
+from dictionary import BulkImportError, BulkImportResult, EntryCreate
+
+# CSV files carry several tags in one cell, separated by this character
+CSV_TAG_SEPARATOR = ";"
+
+
+async def iter_lines(chunks: AsyncIterator[bytes]) -> AsyncIterator[bytes]:
+    """
+    Split a stream of byte chunks into lines, left undecoded so that an
+    invalid line can be reported as a row error.
+
+    Only the new chunk is split; the unterminated tail is kept as a list of
+    pieces, so a long line spread over many chunks is joined once.
+
+    Args:
+        chunks: Async iterator of body chunks
+
+    Returns:
+        Async iterator of lines without their line terminator
+    """
+    tail: List[bytes] = []
+    async for chunk in chunks:
+        *lines, rest = chunk.split(b"\n")
+        for line in lines:
+            if tail:
+                tail.append(line)
+                line = b"".join(tail)
+                tail = []
+            yield line.rstrip(b"\r")
+        if rest:
+            tail.append(rest)
+    if tail:
+        yield b"".join(tail).rstrip(b"\r")
+
+
+def parse_ndjson_line(line: str) -> EntryCreate:
+    """
+    Parse one NDJSON line into an entry.
+
+    Args:
+        line: JSON object with "word" and optional "tags"
+
+    Returns:
+        Entry to create
+
+    Raises:
+        ValueError: If the line is not a valid entry
+    """
+    return EntryCreate.model_validate(json.loads(line))
+
+
+def parse_csv_line(line: str, header: List[str]) -> EntryCreate:
+    """
+    Parse one CSV record into an entry.
+
+    Each record must fit on one line. Tags are separated by CSV_TAG_SEPARATOR.
+
+    Args:
+        line: CSV record
+        header: Column names from the header row
+
+    Returns:
+        Entry to create
+
+    Raises:
+        ValueError: If the record is not a valid entry
+    """
+    values = next(csv.reader([line]))
+    if len(values) != len(header):
+        raise ValueError(f"Expected {len(header)} columns, got {len(values)}")
+    row = dict(zip(header, values))
+    tags = [tag.strip() for tag in row.get("tags", "").split(CSV_TAG_SEPARATOR) if tag.strip()]
+    return EntryCreate(word=row.get("word", ""), tags=tags)
+
+
+async def parse_entries(
+    chunks: AsyncIterator[bytes],
+    content_format: str = "ndjson",
+) -> AsyncIterator[Tuple[int, Optional[EntryCreate], Optional[str]]]:
+    """
+    Parse a streamed body into entries without buffering it.
+
+    Args:
+        chunks: Async iterator of body chunks
+        content_format: "ndjson" or "csv"
+
+    Returns:
+        Async iterator of (line number, entry or None, error message or None)
+    """
+    header: Optional[List[str]] = None
+    line_number = 0
+    async for raw_line in iter_lines(chunks):
+        line_number += 1
+        if not raw_line.strip():
+            continue
+        try:
+            line = raw_line.decode("utf-8-sig")
+            if content_format == "csv":
+                if header is None:
+                    header = [name.strip().lower() for name in next(csv.reader([line]))]
+                    if "word" not in header:
+                        raise ValueError("CSV header must contain a 'word' column")
+                    continue
+                entry = parse_csv_line(line, header)
+            else:
+                entry = parse_ndjson_line(line)
+            if not entry.word.strip():
+                raise ValueError("Empty word")
+            yield line_number, entry, None
+        except Exception as e:
+            yield line_number, None, str(e)
+
+
+async def import_entries(
+    db,
+    chunks: AsyncIterator[bytes],
+    content_format: str = "ndjson",
+    batch_size: int = BULK_IMPORT_BATCH_SIZE,
+) -> BulkImportResult:
+    """
+    Create entries from a streamed body in batches.
+
+    Args:
+        db: DictionaryDB to create the entries in
+        chunks: Async iterator of body chunks
+        content_format: "ndjson" or "csv"
+        batch_size: Number of entries created between yields to the event loop
+
+    Returns:
+        Import result with per-row errors
+    """
+    result = BulkImportResult()
+    batch: List[EntryCreate] = []
+
+    async def create_batch() -> None:
+        db.create_entries(batch)
+        result.created += len(batch)
+        batch.clear()
+        # Let other requests run between batches
+        await asyncio.sleep(0)
+
+    async for line_number, entry, error in parse_entries(chunks, content_format):
+        if error is not None:
+            result.failed += 1
+            if len(result.errors) < BULK_IMPORT_MAX_ERRORS:
+                result.errors.append(BulkImportError(line=line_number, error=error))
+            continue
+        batch.append(entry)
+        if len(batch) >= batch_size:
+            await create_batch()
+    if batch:
+        await create_batch()
+    return result
@@ -0,0 +1,106 @@
+"""
+Bounded in-memory log of dictionary changes for delta synchronization.
+
+Each mutation of the database gets the next revision number and is kept in a
+deque of the most recent changes, from which the changes since a revision a
+client already has are collected. A client further behind than the log
+reaches, or holding a revision from before a full reload, has to download
+the whole dictionary again.
+"""
+from collections import deque
+from typing import Deque, Dict, List, Optional, Tuple
+
+from const import CHANGE_LOG_SIZE
+
+# (revision, operation, entry ID, word, tags)
+Change = Tuple[int, str, str, str, Tuple[str, ...]]
+
+
+class ChangeLog:
+    """
+    Most recent changes, in revision order.
+    """
+    def __init__(self, size: int = CHANGE_LOG_SIZE):
+        """
+        Initialize an empty log.
+
+        Args:
+            size: Maximum number of changes kept
+        """
+        self.changes: Deque[Change] = deque(maxlen=size)
+        # Every change after this revision is in the log
+        self.start = 0
+
+    def append(self, revision: int, operation: str, entry) -> None:
+        """
+        Record a change.
+
+        Args:
+            revision: Revision the change produced
+            operation: "create", "update_tags" or "delete"
+            entry: Entry affected by the change
+        """
+        if len(self.changes) == self.changes.maxlen:
+            self.start = self.changes[0][0]
+        self.changes.append((revision, operation, entry.id, entry.word, tuple(entry.tags or ())))
+
+    def reset(self, revision: int) -> None:
+        """
+        Forget all changes, after the dictionary was replaced as a whole.
+
+        Args:
+            revision: Revision of the replacement dictionary
+        """
+        self.changes.clear()
+        self.start = revision
+
+    def since(self, revision: int) -> Optional[List[Change]]:
+        """
+        Get the changes made after a revision.
+
+        Args:
+            revision: Revision the caller is at
+
+        Returns:
+            Changes in revision order, or None if some of them are no longer in the log
+        """
+        if revision < self.start:
+            return None
+        changes = []
+        for change in reversed(self.changes):
+            if change[0] <= revision:
+                break
+            changes.append(change)
+        changes.reverse()
+        return changes
+
+
+def collapse_changes(changes: List[Change]) -> Tuple[List[Change], List[Change], List[str]]:
+    """
+    Reduce a sequence of changes to the net effect on each entry.
+
+    Args:
+        changes: Changes in revision order
+
+    Returns:
+        Tuple of (last state of the created entries, last state of the updated
+        entries, IDs of the deleted entries). An entry created and deleted in
+        between does not appear at all.
+    """
+    first: Dict[str, str] = {}
+    last: Dict[str, Change] = {}
+    for change in changes:
+        first.setdefault(change[2], change[1])
+        # Keep the order of the latest change of each entry
+        last.pop(change[2], None)
+        last[change[2]] = change
+    created, updated, deleted = [], [], []
+    for entry_id, change in last.items():
+        if change[1] == "delete":
+            if first[entry_id] != "create":
+                deleted.append(entry_id)
+        elif first[entry_id] == "create":
+            created.append(change)
+        else:
+            updated.append(change)
+    return created, updated, deleted
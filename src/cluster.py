@@ -0,0 +1,223 @@
+"""
+Coordination of several uvicorn workers serving the same dictionary.
+
+Every worker keeps its own in-memory DictionaryDB for fast reads. Writes go
+to the shared SQLite storage, which also records them in its changes table;
+the workers notice commits made by the others through PRAGMA data_version and
+apply the new changes to their database. One worker, elected with an
+exclusive lock on a file, is the only one writing the gist; when it exits,
+another worker takes the lock over.
+"""
+import asyncio
+import os
+from typing import Awaitable, Callable, Optional
+
+try:
+    import fcntl
+except ImportError:
+    # Not available on Windows, where only a single worker is supported
+    fcntl = None
+
+from const import (
+    DEFAULT_WORKERS,
+    ROOT_PATH,
+    STORAGE_FOLDER,
+    WORKER_KEEP_CHANGES,
+    WORKER_POLL_INTERVAL,
+    WRITER_LOCK_FILENAME,
+)
+from log import logger
+from storage import SQLiteBackend
+from utils import get_config
+
+
+def get_worker_count() -> int:
+    """
+    Get the number of uvicorn workers from the WORKERS environment variable
+    or the "workers" config option.
+
+    Returns:
+        Number of workers, 1 if multi-worker mode is not supported here
+    """
+    workers = os.environ.get("WORKERS") or get_config().get("config", {}).get("workers", DEFAULT_WORKERS)
+    try:
+        workers = max(1, int(workers))
+    except ValueError:
+        logger.warning(f"Invalid number of workers: {workers}")
+        return DEFAULT_WORKERS
+    if workers > 1 and fcntl is None:
+        logger.warning("Multi-worker mode needs fcntl, running a single worker")
+        return DEFAULT_WORKERS
+    return workers
+
+
+class WorkerCoordinator:
+    """
+    Keep a worker's database in step with the shared storage and elect the gist writer.
+    """
+    def __init__(
+        self,
+        storage: SQLiteBackend,
+        lock_path: Optional[str] = None,
+        poll_interval: float = WORKER_POLL_INTERVAL,
+        keep_changes: int = WORKER_KEEP_CHANGES,
+    ):
+        """
+        Initialize the coordinator.
+
+        Args:
+            storage: Shared SQLite storage recording changes
+            lock_path: Path of the file locked by the gist writer
+            poll_interval: Seconds between two checks for changes made by other workers
+            keep_changes: Number of journaled changes kept for workers lagging behind
+        """
+        self.storage = storage
+        self.lock_path = lock_path or os.path.join(ROOT_PATH, STORAGE_FOLDER, WRITER_LOCK_FILENAME)
+        self.poll_interval = poll_interval
+        self.keep_changes = keep_changes
+        self.is_writer = False
+        # Last change applied to the database and generation it was loaded from
+        self.cursor = 0
+        self.generation = 0
+        self._data_version: Optional[int] = None
+        self._writer_seq: Optional[int] = None
+        self._lock_file = None
+        self._task: Optional[asyncio.Task] = None
+
+    def acquire(self) -> bool:
+        """
+        Try to become the gist writer without blocking.
+
+        Returns:
+            True if this worker holds the writer lock
+        """
+        if self.is_writer:
+            return True
+        os.makedirs(os.path.dirname(self.lock_path), exist_ok=True)
+        lock_file = open(self.lock_path, "a")
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            lock_file.close()
+            return False
+        self._lock_file = lock_file
+        self.is_writer = True
+        logger.info(f"Worker {os.getpid()} is the gist writer")
+        return True
+
+    def release(self) -> None:
+        """
+        Give up the writer lock.
+        """
+        if self._lock_file is not None:
+            self._lock_file.close()
+            self._lock_file = None
+        self.is_writer = False
+
+    def loaded(self) -> None:
+        """
+        Record the position of the last storage.load() the database was loaded from.
+        """
+        self.cursor = self.storage.loaded_change
+        self.generation = self.storage.loaded_generation
+
+    async def reload(self, db) -> None:
+        """
+        Load the database again from the shared storage.
+
+        Args:
+            db: DictionaryDB to load
+        """
+        gist_id = get_config().get("config", {}).get("gist_name")
+        stored = await asyncio.to_thread(self.storage.load, gist_id)
+        if stored is None:
+            return
+        dictionary, version = stored
+        db.load_dictionary(dictionary, version=version)
+        self.loaded()
+
+    async def poll(self, db) -> int:
+        """
+        Apply the changes committed by other workers since the last poll.
+
+        Args:
+            db: DictionaryDB to apply the changes to
+
+        Returns:
+            Number of changes applied
+        """
+        # Reads go through a worker thread: another process holding the
+        # database lock would otherwise stall the event loop
+        data_version = await asyncio.to_thread(self.storage.data_version)
+        # The writer also looks at its own commits, to account them as journaled
+        if data_version == self._data_version and not self.is_writer:
+            return 0
+        self._data_version = data_version
+
+        generation = await asyncio.to_thread(self.storage.generation)
+        first_change = await asyncio.to_thread(self.storage.first_change)
+        if self.is_writer:
+            # Only the writer replaces the stored dictionary
+            self.generation = generation
+        elif generation != self.generation or (first_change is not None and first_change > self.cursor + 1):
+            # Replaced by the writer, or too far behind to catch up change by change
+            await self.reload(db)
+            return 0
+
+        applied = 0
+        while True:
+            changes = await asyncio.to_thread(self.storage.changes_since, self.cursor)
+            if not changes:
+                break
+            self.storage.replaying = True
+            try:
+                for change in changes:
+                    if change["origin"] != self.storage.origin:
+                        db.apply_operation(change)
+                        applied += 1
+                    self.cursor = change["seq"]
+            finally:
+                self.storage.replaying = False
+        if self.is_writer and self.cursor != self._writer_seq:
+            await self.storage.set_writer_seq(self.cursor, self.keep_changes)
+            self._writer_seq = self.cursor
+        return applied
+
+    async def _run(self, db, promote: Callable[[], Awaitable[None]]) -> None:
+        """
+        Main loop of the background task.
+        """
+        while True:
+            try:
+                await self.poll(db)
+                # Changes after the cursor are forwarded to the gist by the
+                # listeners of the new writer, those before it by promote()
+                if not self.is_writer and self.acquire():
+                    await promote()
+            except Exception as e:
+                logger.error(f"Error following shared storage: {e}")
+            await asyncio.sleep(self.poll_interval)
+
+    def start(self, db, promote: Callable[[], Awaitable[None]]) -> None:
+        """
+        Start following the shared storage on the running event loop.
+
+        Args:
+            db: DictionaryDB of this worker
+            promote: Coroutine function run when this worker becomes the gist writer
+        """
+        if self._task is None:
+            self._task = asyncio.create_task(self._run(db, promote))
+
+    async def stop(self) -> None:
+        """
+        Stop following the shared storage and release the writer lock.
+        """
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        self.release()
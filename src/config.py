@@ -4,7 +4,7 @@ Configuration management for the gist-dictionary application.
 from typing import Dict, Any
 
 from log import logger
-from utils import get_config, get_config_path, write_json_file
+from utils import get_config, get_config_path, invalidate_config_cache, write_json_file
 
 
 def set_config(new_config: Dict[str, Any]) -> bool:
@@ -17,7 +17,9 @@ def set_config(new_config: Dict[str, Any]) -> bool:
     Returns:
         True if successful, False otherwise
     """
-    return write_json_file(get_config_path(), new_config)
+    success = write_json_file(get_config_path(), new_config)
+    invalidate_config_cache()
+    return success
 
 
 def init_config() -> Dict[str, Any]:
@@ -12,9 +12,10 @@ else:
 
 # Application paths
 ROOT_PATH = os.path.join(HOME_DIR, ".gist_dictionary")
-ROOT_FOLDERS = ["log", "config"]
+ROOT_FOLDERS = ["log", "config", "cache", "journal", "data", "webhook"]
 ROOT_PROFILES = ["gist_dictionary.json"]
 CONFIG_FILENAME = "gist_dictionary.json"
+CONFIG_RECHECK_INTERVAL = 1.0
 
 # API constants
 API_VERSION = "v1"
@@ -22,3 +23,89 @@ DEFAULT_PORT = 12000
 
 # Gist constants
 DEFAULT_GIST_FILENAME = "wordbank.json"
+SHARD_COUNT = 16
+SHARD_FILENAME_PREFIX = "wordbank-"
+GIST_CACHE_FOLDER = "cache"
+VALIDATED_HASHES_LIMIT = 256
+GITHUB_API_URL = "https://api.github.com"
+
+# Async gist client constants (seconds / number of connections)
+GIST_CONNECT_TIMEOUT = 5.0
+GIST_READ_TIMEOUT = 30.0
+GIST_MAX_CONNECTIONS = 10
+GIST_MAX_KEEPALIVE = 5
+GIST_MAX_CONCURRENCY = 4
+
+# Rate limit scheduler constants (seconds / number of requests)
+GIST_MAX_RETRIES = 5
+GIST_BACKOFF_BASE = 1.0
+GIST_BACKOFF_MAX = 60.0
+RATE_LIMIT_READ_RESERVE = 50
+RATE_LIMIT_PACE_BELOW = 500
+# Longest a read serving a user request waits for the quota or retries
+GIST_READ_MAX_WAIT = 2.0
+# Longest the final upload on shutdown waits; the journal keeps what is left
+GIST_SHUTDOWN_MAX_WAIT = 10.0
+
+# Prefix index constants (number of words)
+PREFIX_INDEX_MERGE_AT = 4096
+
+# Bulk import constants (number of rows)
+BULK_IMPORT_BATCH_SIZE = 500
+BULK_IMPORT_MAX_ERRORS = 1000
+
+# Operation journal constants (bytes)
+JOURNAL_FOLDER = "journal"
+JOURNAL_FILENAME = "operations.ndjson"
+JOURNAL_COMPACT_BYTES = 1024 * 1024
+
+# Write-behind sync constants (seconds / number of mutations)
+SYNC_DEBOUNCE = 2.0
+SYNC_MAX_DELAY = 10.0
+SYNC_MAX_BATCH = 100
+
+# Startup snapshot constants (seconds)
+SNAPSHOT_FILENAME = "dictionary.snapshot"
+SNAPSHOT_MIN_INTERVAL = 60.0
+
+# Storage backend constants
+STORAGE_BACKEND = "gist"
+STORAGE_FOLDER = "data"
+SQLITE_FILENAME = "dictionary.sqlite3"
+SQLITE_BUSY_TIMEOUT = 5000
+
+# Multi-worker constants (seconds / number of changes)
+DEFAULT_WORKERS = 1
+WRITER_LOCK_FILENAME = "writer.lock"
+WORKER_POLL_INTERVAL = 0.2
+WORKER_KEEP_CHANGES = 10000
+
+# Change log constants (number of changes)
+CHANGE_LOG_SIZE = 10000
+
+# Webhook constants (seconds / number of events)
+WEBHOOK_FOLDER = "webhook"
+WEBHOOK_DEAD_LETTER_FILENAME = "dead_letter.ndjson"
+WEBHOOK_DEAD_LETTER_BUFFER = 10000
+WEBHOOK_QUEUE_SIZE = 10000
+WEBHOOK_BATCH_SIZE = 50
+WEBHOOK_BATCH_DELAY = 1.0
+WEBHOOK_MAX_CONCURRENCY = 4
+WEBHOOK_TIMEOUT = 10.0
+WEBHOOK_MAX_RETRIES = 5
+WEBHOOK_BACKOFF_BASE = 1.0
+WEBHOOK_BACKOFF_MAX = 60.0
+
+# Revision history constants (number of files / bytes)
+HISTORY_FOLDER = "history"
+HISTORY_CACHE_MAX_FILES = 256
+HISTORY_CACHE_MAX_BYTES = 256 * 1024 * 1024
+
+# Metrics constants (histogram bucket upper bounds, in seconds / bytes)
+METRICS_LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+METRICS_BYTES_BUCKETS = tuple(1024 * 4 ** power for power in range(10))
+
+# Logging constants (level, occurrences per sampled message, characters)
+LOG_LEVEL = "DEBUG"
+LOG_SAMPLE_EVERY = 100
+LOG_PAYLOAD_PREVIEW = 200
@@ -3,33 +3,167 @@ In-memory database for dictionary entries.
 
 This module provides an in-memory database implementation for dictionary entries.
 """
-from typing import Dict, List, Optional
+import base64
+import uuid
+from itertools import islice
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
 
-from dictionary import Dictionary, Entry, EntryCreate
-from log import logger
+from changelog import ChangeLog, collapse_changes
+from dictionary import Dictionary, DictionaryChanges, Entry, EntryCreate
+from entry_store import EntryView
+from log import LogSampler, logger
+from prefix_index import PrefixIndex
+from tag_index import TagIndex, count_bits, iter_bits, parse_tag_query
+
+# Listener signature: (operation, entry) where operation is one of
+# "create", "update_tags" or "delete"
+Listener = Callable[[str, EntryView], None]
+
+# Entry mutations come one per request, or by the thousand from a bulk
+# import, so only some of them are logged
+mutation_log_sampler = LogSampler()
+
+
+def encode_cursor(seq: int) -> str:
+    """
+    Encode an insertion sequence number as an opaque pagination cursor.
+    
+    Args:
+        seq: Sequence number of the last entry of a page
+        
+    Returns:
+        URL-safe cursor string
+    """
+    return base64.urlsafe_b64encode(f"s{seq}".encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> int:
+    """
+    Decode an opaque pagination cursor.
+    
+    Args:
+        cursor: Cursor string produced by encode_cursor
+        
+    Returns:
+        Sequence number of the last entry of the previous page
+        
+    Raises:
+        ValueError: If the cursor is malformed
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+    except Exception as e:
+        raise ValueError(f"Invalid cursor: {cursor}") from e
+    if not raw.startswith("s") or not raw[1:].isdigit():
+        raise ValueError(f"Invalid cursor: {cursor}")
+    return int(raw[1:])
 
 
 class DictionaryDB:
     """
     In-memory database for dictionary entries.
+    
+    Entries are held in the columnar store of the dictionary; the methods
+    serving the API materialize them as Entry models, listeners get views.
+    
+    Every mutation and every load increments the revision. Revision numbers
+    are only meaningful within one process, so they are handed out to
+    clients prefixed with the random epoch of the process.
     """
     def __init__(self):
         """
         Initialize an empty dictionary database.
         """
         self.dictionary = Dictionary()
-        self.entries: Dict[str, Entry] = {}
+        self.version: Optional[str] = None
+        self.listeners: List[Listener] = []
+        self.prefix_index = PrefixIndex()
+        self.tag_index = TagIndex()
+        self.epoch = uuid.uuid4().hex[:12]
+        self.revision = 0
+        self.changes = ChangeLog()
     
-    def load_dictionary(self, dictionary: Dictionary) -> None:
+    def add_listener(self, listener: Listener) -> None:
+        """
+        Register a callback invoked after every mutation.
+        
+        Args:
+            listener: Callable receiving the operation name and the affected entry
+        """
+        self.listeners.append(listener)
+    
+    def _notify(self, operation: str, entry: EntryView) -> None:
+        """
+        Invoke all registered listeners for a mutation.
+        
+        Args:
+            operation: Name of the operation
+            entry: Entry affected by the operation
+        """
+        self.revision += 1
+        self.changes.append(self.revision, operation, entry)
+        for listener in self.listeners:
+            try:
+                listener(operation, entry)
+            except Exception as e:
+                logger.error(f"Listener failed for {operation}: {e}")
+    
+    def load_dictionary(self, dictionary: Dictionary, version: Optional[str] = None) -> None:
         """
         Load a dictionary into the database.
         
         Args:
             dictionary: Dictionary to load
+            version: Version (gist ETag) the dictionary was loaded from
         """
         self.dictionary = dictionary
-        self.entries = {entry.id: entry for entry in dictionary.wordbank}
-        logger.info(f"Loaded dictionary with {len(self.entries)} entries")
+        self.prefix_index = PrefixIndex.from_entries(dictionary.entries())
+        self.tag_index = TagIndex.from_store(dictionary.store)
+        self.version = version
+        self.revision += 1
+        self.changes.reset(self.revision)
+        logger.info(f"Loaded dictionary with {dictionary.count()} entries")
+    
+    def get_revision(self) -> str:
+        """
+        Get the current revision, as handed out to clients.
+        
+        Returns:
+            Revision token, "<epoch>-<revision number>"
+        """
+        return f"{self.epoch}-{self.revision}"
+    
+    def get_changes(self, since: str) -> DictionaryChanges:
+        """
+        Get the net changes made since a revision.
+        
+        Args:
+            since: Revision token returned by get_revision, bare or as the
+                ETag of the dictionary (quoted, optionally weak)
+            
+        Returns:
+            Changes since the revision, with reset set if they are not
+            available: the revision belongs to another process, is older
+            than the change log or predates a reload of the dictionary
+            
+        Raises:
+            ValueError: If the revision token is malformed
+        """
+        token = since.strip().removeprefix("W/").strip('"')
+        epoch, _, number = token.rpartition("-")
+        if not epoch or not number.isdigit():
+            raise ValueError(f"Invalid revision: {since}")
+        revision = self.get_revision()
+        changes = self.changes.since(int(number)) if epoch == self.epoch and int(number) <= self.revision else None
+        if changes is None:
+            return DictionaryChanges(revision=revision, reset=True)
+        created, updated, deleted = collapse_changes(changes)
+        return DictionaryChanges(
+            revision=revision,
+            created=[Entry.model_construct(id=entry_id, word=word, tags=list(tags)) for _, _, entry_id, word, tags in created],
+            updated=[Entry.model_construct(id=entry_id, word=word, tags=list(tags)) for _, _, entry_id, word, tags in updated],
+            deleted=deleted,
+        )
     
     def get_dictionary(self) -> Dictionary:
         """
@@ -51,7 +185,51 @@ class DictionaryDB:
         Returns:
             List of entries
         """
-        return list(self.entries.values())[skip:skip + limit]
+        return [entry.to_entry() for entry in islice(self.dictionary.entries(), skip, skip + limit)]
+    
+    def get_entries_page(self, cursor: Optional[str] = None, limit: int = 100) -> Tuple[List[Entry], Optional[str]]:
+        """
+        Get a page of entries in insertion order, in O(limit).
+        
+        Args:
+            cursor: Opaque cursor returned with the previous page, None for the first page
+            limit: Maximum number of entries to return
+            
+        Returns:
+            Tuple of (entries, cursor of the next page or None on the last page)
+            
+        Raises:
+            ValueError: If the cursor is malformed
+        """
+        after = decode_cursor(cursor) if cursor else None
+        entries, last_seq = self.dictionary.page(after, limit)
+        next_cursor = encode_cursor(last_seq) if last_seq is not None else None
+        return [entry.to_entry() for entry in entries], next_cursor
+    
+    def find_by_tags(self, query: str, cursor: Optional[str] = None, limit: int = 100) -> Tuple[int, List[Entry], Optional[str]]:
+        """
+        Get a page of the entries matching a boolean tag query, in insertion order.
+        
+        The query is evaluated on the tag index, so the cost depends on the
+        number of tags in the query and not on scanning the entries.
+        
+        Args:
+            query: Tag query such as "ja AND n2 AND NOT mastered"
+            cursor: Opaque cursor returned with the previous page, None for the first page
+            limit: Maximum number of entries to return
+            
+        Returns:
+            Tuple of (number of matching entries, entries, cursor of the next page or None on the last page)
+            
+        Raises:
+            ValueError: If the query or the cursor is malformed
+        """
+        after = decode_cursor(cursor) if cursor else None
+        matches = self.tag_index.evaluate(parse_tag_query(query))
+        seqs = iter_bits(matches, after, limit + 1)
+        entries = [self.dictionary.get_entry_by_seq(seq) for seq in seqs[:limit]]
+        next_cursor = encode_cursor(seqs[limit - 1]) if len(seqs) > limit else None
+        return count_bits(matches), [entry.to_entry() for entry in entries if entry is not None], next_cursor
     
     def get_entry(self, entry_id: str) -> Optional[Entry]:
         """
@@ -63,22 +241,55 @@ class DictionaryDB:
         Returns:
             Entry if found, None otherwise
         """
-        return self.entries.get(entry_id)
+        entry = self.dictionary.get_entry(entry_id)
+        return entry.to_entry() if entry else None
+    
+    def suggest(self, prefix: str, limit: int = 10) -> List[Entry]:
+        """
+        Get entries whose word starts with a prefix.
+        
+        Args:
+            prefix: Prefix typed so far
+            limit: Maximum number of entries to return
+            
+        Returns:
+            List of entries in word order
+        """
+        entries = (self.dictionary.get_entry_by_seq(seq) for seq in self.prefix_index.search(prefix, limit))
+        return [entry.to_entry() for entry in entries if entry is not None]
     
-    def create_entry(self, entry: EntryCreate) -> Entry:
+    def create_entry(self, entry: Union[EntryCreate, Entry]) -> Entry:
         """
         Create a new entry.
         
         Args:
-            entry: Entry to create
+            entry: Entry to create, keeping its ID if it already has one
             
         Returns:
             Created entry with ID
         """
         new_entry = self.dictionary.add_entry(entry)
-        self.entries[new_entry.id] = new_entry
-        logger.info(f"Created entry: {new_entry.word}")
-        return new_entry
+        self.prefix_index.add(new_entry.word, new_entry.seq)
+        self.tag_index.add(new_entry.seq, new_entry.tags)
+        if mutation_log_sampler():
+            logger.info("Created entry: {} (mutation {}, 1 in {} logged)", new_entry.word, mutation_log_sampler.count, mutation_log_sampler.every)
+        self._notify("create", new_entry)
+        return new_entry.to_entry()
+    
+    def create_entries(self, entries: List[Union[EntryCreate, Entry]]) -> None:
+        """
+        Create several entries, indexing their words in one pass.
+        
+        Args:
+            entries: Entries to create, keeping their IDs if they already have one
+        """
+        new_entries = [self.dictionary.add_entry(entry) for entry in entries]
+        self.prefix_index.add_many((new_entry.word, new_entry.seq) for new_entry in new_entries)
+        for new_entry in new_entries:
+            self.tag_index.add(new_entry.seq, new_entry.tags)
+            if mutation_log_sampler():
+                logger.info("Created entry: {} (mutation {}, 1 in {} logged)", new_entry.word, mutation_log_sampler.count, mutation_log_sampler.every)
+            self._notify("create", new_entry)
     
     def update_entry_tags(self, entry_id: str, tags: List[str]) -> Optional[Entry]:
         """
@@ -91,11 +302,15 @@ class DictionaryDB:
         Returns:
             Updated entry if found, None otherwise
         """
+        previous_entry = self.dictionary.get_entry(entry_id)
         updated_entry = self.dictionary.update_entry_tags(entry_id, tags)
         if updated_entry:
-            self.entries[entry_id] = updated_entry
-            logger.info(f"Updated tags for entry: {updated_entry.word}")
-        return updated_entry
+            self.tag_index.update(updated_entry.seq, previous_entry.tags, updated_entry.tags)
+            if mutation_log_sampler():
+                logger.info("Updated tags for entry: {} (mutation {}, 1 in {} logged)", updated_entry.word, mutation_log_sampler.count, mutation_log_sampler.every)
+            self._notify("update_tags", updated_entry)
+            return updated_entry.to_entry()
+        return None
     
     def delete_entry(self, entry_id: str) -> bool:
         """
@@ -107,13 +322,38 @@ class DictionaryDB:
         Returns:
             True if entry was deleted, False otherwise
         """
-        if self.dictionary.delete_entry(entry_id):
-            if entry_id in self.entries:
-                del self.entries[entry_id]
-                logger.info(f"Deleted entry with ID: {entry_id}")
-                return True
+        deleted_entry = self.dictionary.get_entry(entry_id)
+        if deleted_entry and self.dictionary.delete_entry(entry_id):
+            self.prefix_index.remove(deleted_entry.word, deleted_entry.seq)
+            self.tag_index.remove(deleted_entry.seq, deleted_entry.tags)
+            if mutation_log_sampler():
+                logger.info("Deleted entry with ID: {} (mutation {}, 1 in {} logged)", entry_id, mutation_log_sampler.count, mutation_log_sampler.every)
+            self._notify("delete", deleted_entry)
+            return True
         return False
 
+    
+    def apply_operation(self, record: Dict[str, Any]) -> None:
+        """
+        Apply a journaled operation. Applying the same operations again
+        leads to the same state, so replay is idempotent.
+        
+        Args:
+            record: Operation record with "op", "id", "word" and "tags" keys
+        """
+        operation = record.get("op")
+        entry_id = record.get("id")
+        if operation == "create":
+            if self.dictionary.get_entry(entry_id) is not None:
+                self.update_entry_tags(entry_id, record.get("tags") or [])
+            else:
+                self.create_entry(Entry(id=entry_id, word=record["word"], tags=record.get("tags") or []))
+        elif operation == "update_tags":
+            self.update_entry_tags(entry_id, record.get("tags") or [])
+        elif operation == "delete":
+            self.delete_entry(entry_id)
+        else:
+            logger.warning(f"Unknown journal operation: {operation}")
 
 # Create a singleton instance
-db = DictionaryDB()
\ No newline at end of file
+db = DictionaryDB()
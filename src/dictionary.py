@@ -4,10 +4,22 @@ Dictionary data models for entries and wordbank.
 This module defines Pydantic models for dictionary entries and related operations.
 """
 import json
+import time
 import uuid
-from typing import Dict, List, Optional, Union, Any
+from bisect import bisect_left, bisect_right
+from typing import Dict, Iterator, List, Optional, Tuple, Union, Any
 
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, PrivateAttr, field_serializer
+
+from entry_store import EntryStore, EntryView
+from metrics import serialize_duration
+
+# Dead slots are compacted away once there are at least this many of them
+# and they outnumber the live entries
+COMPACT_MIN_TOMBSTONES = 1024
+
+# Number of entries serialized into each chunk of a streamed response
+STREAM_BATCH_SIZE = 500
 
 
 class EntryBase(BaseModel):
@@ -80,28 +92,102 @@ class Entry(EntryBase):
 class Dictionary(BaseModel):
     """
     Model for the complete dictionary (collection of entries).
+    
+    Entries live in a columnar EntryStore rather than as Entry models; the
+    wordbank field only carries entries being validated into the model and
+    is moved into the store right away. Lookups, tag updates and deletes by
+    ID are O(1). A deleted entry leaves a dead slot until enough of them have
+    accumulated to compact the store, so serialization order is stable.
+    Every slot also carries an insertion sequence number that survives
+    compaction and is used as a pagination cursor.
     """
     wordbank: List[Entry] = Field(default_factory=list)
     
-    def add_entry(self, entry: Union[Entry, EntryCreate]) -> Entry:
+    _store: EntryStore = PrivateAttr(default_factory=EntryStore)
+    
+    def model_post_init(self, __context: Any) -> None:
+        """
+        Move validated entries into the store.
+        """
+        if self.wordbank:
+            wordbank = [entry for entry in self.wordbank if entry is not None]
+            self._store.extend(
+                [entry.id for entry in wordbank],
+                [entry.word for entry in wordbank],
+                [entry.tags or [] for entry in wordbank],
+            )
+            self.wordbank = []
+    
+    @classmethod
+    def from_columns(cls, ids: List[str], words: List[str], tags: List[List[str]]) -> "Dictionary":
+        """
+        Build a dictionary from columns of entry fields that are already valid.
+        
+        Args:
+            ids: Entry IDs
+            words: Words, in the same order
+            tags: Tag lists, in the same order
+            
+        Returns:
+            New Dictionary
+        """
+        dictionary = cls()
+        dictionary._store.extend(ids, words, tags)
+        return dictionary
+    
+    @field_serializer("wordbank")
+    def _serialize_wordbank(self, wordbank: List[Entry]) -> List[Dict[str, Any]]:
+        """
+        Serialize the entries of the store.
+        """
+        return [entry.to_dict() for entry in self.entries()]
+    
+    @property
+    def store(self) -> EntryStore:
+        """
+        Column store holding the entries.
+        """
+        return self._store
+    
+    def compact(self) -> None:
+        """
+        Remove the slots left by deleted entries.
+        """
+        self._store.compact()
+    
+    def entries(self) -> Iterator[EntryView]:
+        """
+        Iterate over the live entries in insertion order.
+        
+        Returns:
+            Iterator of entry views
+        """
+        return self._store.views(self._store.slots())
+    
+    def count(self) -> int:
+        """
+        Get the number of live entries.
+        
+        Returns:
+            Number of entries
+        """
+        return self._store.live
+    
+    def add_entry(self, entry: Union[Entry, EntryCreate, EntryView]) -> EntryView:
         """
         Add a new entry to the dictionary.
         
         Args:
-            entry: Entry to add
+            entry: Entry to add, keeping its ID unless it is an EntryCreate
             
         Returns:
             The added entry with ID
         """
-        if isinstance(entry, EntryCreate):
-            new_entry = Entry.create(word=entry.word, tags=entry.tags)
-        else:
-            new_entry = entry
-            
-        self.wordbank.append(new_entry)
-        return new_entry
+        entry_id = str(uuid.uuid4()) if isinstance(entry, EntryCreate) else entry.id
+        slot = self._store.append(entry_id, entry.word, entry.tags or [])
+        return self._store.view(slot)
     
-    def get_entry(self, entry_id: str) -> Optional[Entry]:
+    def get_entry(self, entry_id: str) -> Optional[EntryView]:
         """
         Get an entry by ID.
         
@@ -111,12 +197,27 @@ class Dictionary(BaseModel):
         Returns:
             Entry if found, None otherwise
         """
-        for entry in self.wordbank:
-            if entry.id == entry_id:
-                return entry
+        slot = self._store.find(entry_id)
+        if slot is None:
+            return None
+        return self._store.view(slot)
+    
+    def get_entry_by_seq(self, seq: int) -> Optional[EntryView]:
+        """
+        Get an entry by insertion sequence number.
+        
+        Args:
+            seq: Sequence number of the entry
+            
+        Returns:
+            Entry if found, None otherwise
+        """
+        slot = bisect_left(self._store.seqs, seq)
+        if slot < len(self._store) and self._store.seqs[slot] == seq and self._store.alive(slot):
+            return self._store.view(slot)
         return None
     
-    def update_entry_tags(self, entry_id: str, tags: List[str]) -> Optional[Entry]:
+    def update_entry_tags(self, entry_id: str, tags: List[str]) -> Optional[EntryView]:
         """
         Update tags for an entry.
         
@@ -127,11 +228,11 @@ class Dictionary(BaseModel):
         Returns:
             Updated entry if found, None otherwise
         """
-        entry = self.get_entry(entry_id)
-        if entry:
-            entry.tags = tags
-            return entry
-        return None
+        slot = self._store.find(entry_id)
+        if slot is None:
+            return None
+        self._store.set_tags(slot, tags)
+        return self._store.view(slot)
     
     def delete_entry(self, entry_id: str) -> bool:
         """
@@ -143,11 +244,66 @@ class Dictionary(BaseModel):
         Returns:
             True if entry was deleted, False otherwise
         """
-        for i, entry in enumerate(self.wordbank):
-            if entry.id == entry_id:
-                self.wordbank.pop(i)
-                return True
-        return False
+        slot = self._store.find(entry_id)
+        if slot is None:
+            return False
+        
+        self._store.delete(slot)
+        dead = self._store.dead()
+        if dead >= COMPACT_MIN_TOMBSTONES and dead * 2 > len(self._store):
+            self.compact()
+        return True
+    
+    def page(self, after: Optional[int] = None, limit: int = 100) -> Tuple[List[EntryView], Optional[int]]:
+        """
+        Get entries in insertion order, starting after a sequence number.
+        
+        Args:
+            after: Sequence number of the last entry already seen, None to start at the beginning
+            limit: Maximum number of entries to return
+            
+        Returns:
+            Tuple of (entries, sequence number of the last returned entry or
+            None if there are no more entries)
+        """
+        store = self._store
+        position = 0 if after is None else bisect_right(store.seqs, after)
+        entries: List[EntryView] = []
+        while position < len(store) and len(entries) < limit:
+            if store.alive(position):
+                entries.append(store.view(position))
+            position += 1
+        
+        # Skip trailing dead slots so the last page reports no cursor
+        while position < len(store) and not store.alive(position):
+            position += 1
+        last_seq = entries[-1].seq if entries and position < len(store) else None
+        return entries, last_seq
+    
+    def iter_json(self, batch_size: int = STREAM_BATCH_SIZE) -> Iterator[bytes]:
+        """
+        Serialize the dictionary as a compact JSON document, chunk by chunk.
+        
+        Only one batch of entries is held in serialized form at a time.
+        
+        Args:
+            batch_size: Number of entries per chunk
+            
+        Returns:
+            Iterator of UTF-8 encoded chunks
+        """
+        yield b'{"wordbank": ['
+        separator = ""
+        batch: List[str] = []
+        for entry in self.entries():
+            batch.append(json.dumps(entry.to_dict(), ensure_ascii=False))
+            if len(batch) >= batch_size:
+                yield (separator + ", ".join(batch)).encode("utf-8")
+                separator = ", "
+                batch = []
+        if batch:
+            yield (separator + ", ".join(batch)).encode("utf-8")
+        yield b"]}"
     
     def to_json(self) -> str:
         """
@@ -156,12 +312,99 @@ class Dictionary(BaseModel):
         Returns:
             JSON string representation of the dictionary
         """
-        return json.dumps(
-            {"wordbank": [entry.to_dict() for entry in self.wordbank]},
+        start = time.perf_counter()
+        content = json.dumps(
+            {"wordbank": [entry.to_dict() for entry in self.entries()]},
             ensure_ascii=False,
             indent=2,
             sort_keys=False
         )
+        serialize_duration.observe(time.perf_counter() - start)
+        return content
+
+
+class EntryPage(BaseModel):
+    """
+    Model for one page of entries with an opaque cursor to the next page.
+    
+    Pages of a tag query also carry the number of matching entries.
+    """
+    entries: List[Entry]
+    next_cursor: Optional[str] = None
+    total: Optional[int] = None
+
+
+class DictionaryChanges(BaseModel):
+    """
+    Model for the changes made to the dictionary since a revision.
+    
+    With reset set, the changes are not available and the whole dictionary
+    has to be downloaded again.
+    """
+    revision: str
+    reset: bool = False
+    created: List[Entry] = Field(default_factory=list)
+    updated: List[Entry] = Field(default_factory=list)
+    deleted: List[str] = Field(default_factory=list)
+
+
+class GistRevision(BaseModel):
+    """
+    Model for a revision of the gist.
+    """
+    version: str
+    committed_at: Optional[str] = None
+    additions: int = 0
+    deletions: int = 0
+
+
+class RetaggedEntry(BaseModel):
+    """
+    Model for an entry whose tags changed between two revisions.
+    """
+    id: str
+    word: str
+    old_tags: List[str]
+    new_tags: List[str]
+
+
+class RewordedEntry(BaseModel):
+    """
+    Model for an entry whose word changed between two revisions.
+    """
+    id: str
+    old_word: str
+    new_word: str
+
+
+class RevisionDiff(BaseModel):
+    """
+    Model for the entry-level differences between two revisions of the gist.
+    """
+    base: str
+    head: str
+    added: List[Entry] = Field(default_factory=list)
+    removed: List[Entry] = Field(default_factory=list)
+    retagged: List[RetaggedEntry] = Field(default_factory=list)
+    reworded: List[RewordedEntry] = Field(default_factory=list)
+
+
+class BulkImportError(BaseModel):
+    """
+    Model for a row rejected by a bulk import.
+    """
+    line: int
+    error: str
+
+
+class BulkImportResult(BaseModel):
+    """
+    Model for the outcome of a bulk import.
+    """
+    created: int = 0
+    failed: int = 0
+    errors: List[BulkImportError] = Field(default_factory=list)
+    synced: bool = False
 
 
 class TagUpdate(BaseModel):
@@ -0,0 +1,430 @@
+"""
+Compact columnar storage of dictionary entries.
+
+A million pydantic Entry objects, each with its own ID, word and tag list
+strings, take far more memory than the data they hold. EntryStore keeps
+entries in a few flat columns instead:
+
+- IDs as 16 bytes each in one bytearray: the UUID itself for canonical
+  UUID strings, a hash of the ID otherwise (the string is then kept aside),
+  indexed by an open-addressing hash table of slot numbers in an array
+- words as one UTF-8 buffer with an array of end offsets
+- tags as the number of an interned tag set, whose tags are interned
+  tag IDs, since most entries share one of a few tag combinations
+- insertion sequence numbers in an array, and one byte per slot telling
+  whether the entry is live
+
+EntryView objects with __slots__ are produced on demand for callers, and
+pydantic Entry models only at the API boundary.
+"""
+import hashlib
+from array import array
+from bisect import bisect_left
+from itertools import accumulate
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+# Hash table markers
+EMPTY = -1
+DELETED = -2
+
+KEY_SIZE = 16
+
+
+def _id_key(entry_id: str) -> Tuple[bytes, bool]:
+    """
+    Get the 16-byte key of an ID.
+
+    Args:
+        entry_id: Entry ID
+
+    Returns:
+        Tuple of (key, True if the ID is a canonical UUID string the key converts back to)
+    """
+    if len(entry_id) == 36 and entry_id[8] == entry_id[13] == entry_id[18] == entry_id[23] == "-":
+        digits = entry_id.replace("-", "")
+        try:
+            key = bytes.fromhex(digits)
+        except ValueError:
+            key = None
+        # Upper case or spaced out IDs do not round-trip
+        if key is not None and len(key) == KEY_SIZE and key.hex() == digits:
+            return key, True
+    return hashlib.blake2b(entry_id.encode("utf-8"), digest_size=KEY_SIZE).digest(), False
+
+
+class EntryView:
+    """
+    Lightweight read-only copy of a stored entry.
+    """
+    __slots__ = ("id", "word", "tags", "seq")
+
+    def __init__(self, id: str, word: str, tags: List[str], seq: int):
+        self.id = id
+        self.word = word
+        self.tags = tags
+        self.seq = seq
+
+    def __repr__(self) -> str:
+        return f"EntryView(id={self.id!r}, word={self.word!r}, tags={self.tags!r})"
+
+    def to_dict(self) -> Dict[str, object]:
+        """
+        Convert the entry to a dictionary.
+
+        Returns:
+            Dictionary representation of the entry
+        """
+        return {"id": self.id, "word": self.word, "tags": self.tags}
+
+    def to_entry(self):
+        """
+        Materialize the entry as a pydantic model, for API responses.
+
+        Returns:
+            Entry model
+        """
+        from dictionary import Entry
+        return Entry.model_construct(id=self.id, word=self.word, tags=self.tags)
+
+
+class EntryStore:
+    """
+    Column store of entries addressed by slot number, with an ID index.
+
+    Deleting an entry only marks its slot dead; compact() reclaims the space.
+    Of entries sharing an ID, find() returns the first live one.
+    """
+    def __init__(self):
+        """
+        Initialize an empty store.
+        """
+        self._keys = bytearray()
+        self._odd_ids: Dict[int, str] = {}
+        self._word_data = bytearray()
+        self._word_ends = array("Q")
+        self._tagsets = array("I")
+        self.seqs = array("Q")
+        self._alive = bytearray()
+        self.live = 0
+        self.next_seq = 0
+
+        # Interned tags and tag sets; tag set 0 is the empty set
+        self.tag_ids: Dict[str, int] = {}
+        self.tag_names: List[str] = []
+        self._tagset_ids: Dict[Tuple[str, ...], int] = {(): 0}
+        self._tagset_names: List[Tuple[str, ...]] = [()]
+        self.tagset_tag_ids: List[Tuple[int, ...]] = [()]
+
+        self._table = array("q", [EMPTY]) * 8
+        self._table_used = 0
+        # Later live slots repeating the ID of an indexed slot, in slot order
+        self._shadowed: Dict[int, List[int]] = {}
+
+    def __len__(self) -> int:
+        return len(self._alive)
+
+    # Interning
+
+    def _tagset(self, tags: Sequence[str]) -> int:
+        """
+        Get the number of an interned tag set, interning it if needed.
+        """
+        names = tuple(tags)
+        tagset = self._tagset_ids.get(names)
+        if tagset is None:
+            ids = []
+            for name in names:
+                tag_id = self.tag_ids.get(name)
+                if tag_id is None:
+                    tag_id = self.tag_ids[name] = len(self.tag_names)
+                    self.tag_names.append(name)
+                ids.append(tag_id)
+            tagset = self._tagset_ids[names] = len(self._tagset_names)
+            self._tagset_names.append(tuple(self.tag_names[tag_id] for tag_id in ids))
+            self.tagset_tag_ids.append(tuple(ids))
+        return tagset
+
+    # ID index
+
+    def _find(self, key: bytes, entry_id: str, canonical: bool) -> Tuple[int, int]:
+        """
+        Look an ID up in the hash table.
+
+        Returns:
+            Tuple of (table position of the ID or of the first free position, slot or -1)
+        """
+        table = self._table
+        mask = len(table) - 1
+        position = hash(key) & mask
+        free = -1
+        while True:
+            slot = table[position]
+            if slot == EMPTY:
+                return (position if free < 0 else free), -1
+            if slot == DELETED:
+                if free < 0:
+                    free = position
+            else:
+                start = slot * KEY_SIZE
+                if self._keys[start:start + KEY_SIZE] == key:
+                    odd_id = self._odd_ids.get(slot)
+                    if (odd_id is None) if canonical else (odd_id == entry_id):
+                        return position, slot
+            position = (position + 1) & mask
+
+    def _resize(self, capacity: int) -> None:
+        """
+        Rebuild the hash table for at least `capacity` IDs.
+        """
+        size = 8
+        while size < capacity * 2:
+            size *= 2
+        self._table = array("q", [EMPTY]) * size
+        self._table_used = 0
+        self._shadowed = {}
+        keys = self._keys
+        for slot, alive in enumerate(self._alive):
+            if alive:
+                start = slot * KEY_SIZE
+                key = bytes(keys[start:start + KEY_SIZE])
+                odd_id = self._odd_ids.get(slot)
+                position, existing = self._find(key, odd_id, odd_id is None)
+                # Only the first of duplicate IDs is reachable, as before
+                if existing < 0:
+                    self._table[position] = slot
+                    self._table_used += 1
+                else:
+                    self._shadowed.setdefault(existing, []).append(slot)
+
+    def _index(self, key: bytes, entry_id: str, canonical: bool, slot: int) -> None:
+        """
+        Add a slot to the hash table unless its ID is already there.
+        """
+        if (self._table_used + 1) * 2 > len(self._table):
+            self._resize(self.live + 1)
+        position, existing = self._find(key, entry_id, canonical)
+        if existing < 0:
+            if self._table[position] == EMPTY:
+                self._table_used += 1
+            self._table[position] = slot
+        else:
+            self._shadowed.setdefault(existing, []).append(slot)
+
+    def find(self, entry_id: str) -> Optional[int]:
+        """
+        Get the slot of an ID.
+
+        Args:
+            entry_id: Entry ID
+
+        Returns:
+            Slot number, or None if there is no live entry with this ID
+        """
+        key, canonical = _id_key(entry_id)
+        _, slot = self._find(key, entry_id, canonical)
+        return slot if slot >= 0 else None
+
+    # Mutations
+
+    def append(self, entry_id: str, word: str, tags: Sequence[str]) -> int:
+        """
+        Add an entry.
+
+        Args:
+            entry_id: Entry ID
+            word: Word of the entry
+            tags: Tags of the entry
+
+        Returns:
+            Slot of the new entry
+        """
+        slot = len(self._alive)
+        key, canonical = _id_key(entry_id)
+        self._keys += key
+        if not canonical:
+            self._odd_ids[slot] = entry_id
+        self._word_data += word.encode("utf-8")
+        self._word_ends.append(len(self._word_data))
+        self._tagsets.append(self._tagset(tags or ()))
+        self.seqs.append(self.next_seq)
+        self.next_seq += 1
+        self._alive.append(1)
+        self.live += 1
+        self._index(key, entry_id, canonical, slot)
+        return slot
+
+    def extend(self, ids: Sequence[str], words: Sequence[str], tags: Sequence[Sequence[str]]) -> None:
+        """
+        Add many entries at once, column by column.
+
+        Args:
+            ids: Entry IDs
+            words: Words, in the same order
+            tags: Tag lists, in the same order
+        """
+        count = len(ids)
+        if not (count == len(words) == len(tags)):
+            raise ValueError("Columns must have the same length")
+        first = len(self._alive)
+        keys = [_id_key(entry_id) for entry_id in ids]
+        for offset, (_, canonical) in enumerate(keys):
+            if not canonical:
+                self._odd_ids[first + offset] = ids[offset]
+        self._keys += b"".join(key for key, _ in keys)
+
+        encoded = [word.encode("utf-8") for word in words]
+        self._word_ends.extend(accumulate(map(len, encoded), initial=len(self._word_data)))
+        # accumulate() yields the starting offset first
+        del self._word_ends[first]
+        self._word_data += b"".join(encoded)
+
+        # Only the empty tag set is numbered 0, so a miss falls through to interning
+        known = self._tagset_ids.get
+        self._tagsets.extend([
+            (known(tuple(entry_tags)) or self._tagset(entry_tags)) if entry_tags else 0
+            for entry_tags in tags
+        ])
+
+        self.seqs.extend(range(self.next_seq, self.next_seq + count))
+        self.next_seq += count
+        self._alive += b"\x01" * count
+        self.live += count
+
+        if (self._table_used + count) * 2 > len(self._table):
+            self._resize(self.live)
+        else:
+            for offset, (key, canonical) in enumerate(keys):
+                self._index(key, ids[offset], canonical, first + offset)
+
+    def set_tags(self, slot: int, tags: Sequence[str]) -> None:
+        """
+        Replace the tags of an entry.
+
+        Args:
+            slot: Slot of the entry
+            tags: New tags
+        """
+        self._tagsets[slot] = self._tagset(tags or ())
+
+    def delete(self, slot: int) -> None:
+        """
+        Delete an entry, leaving its slot dead until compact().
+
+        Args:
+            slot: Slot of the entry
+        """
+        if not self._alive[slot]:
+            return
+        start = slot * KEY_SIZE
+        key = bytes(self._keys[start:start + KEY_SIZE])
+        odd_id = self._odd_ids.get(slot)
+        position, existing = self._find(key, odd_id, odd_id is None)
+        if existing == slot:
+            # The next entry with the same ID, if any, becomes reachable
+            shadowed = self._shadowed.pop(slot, None)
+            if shadowed:
+                self._table[position] = shadowed[0]
+                if len(shadowed) > 1:
+                    self._shadowed[shadowed[0]] = shadowed[1:]
+            else:
+                self._table[position] = DELETED
+        elif existing >= 0 and slot in self._shadowed.get(existing, ()):
+            self._shadowed[existing].remove(slot)
+        self._alive[slot] = 0
+        self.live -= 1
+
+    def compact(self) -> None:
+        """
+        Drop dead slots, renumbering the live ones. Sequence numbers are kept.
+        """
+        if self.live == len(self._alive):
+            return
+        keys = bytearray()
+        odd_ids: Dict[int, str] = {}
+        word_data = bytearray()
+        word_ends = array("Q")
+        tagsets = array("I")
+        seqs = array("Q")
+        for slot in self.slots():
+            new_slot = len(seqs)
+            start = slot * KEY_SIZE
+            keys += self._keys[start:start + KEY_SIZE]
+            if slot in self._odd_ids:
+                odd_ids[new_slot] = self._odd_ids[slot]
+            word_data += self._word_bytes(slot)
+            word_ends.append(len(word_data))
+            tagsets.append(self._tagsets[slot])
+            seqs.append(self.seqs[slot])
+        self._keys, self._odd_ids = keys, odd_ids
+        self._word_data, self._word_ends = word_data, word_ends
+        self._tagsets, self.seqs = tagsets, seqs
+        self._alive = bytearray(b"\x01" * len(seqs))
+        self._resize(self.live)
+
+    # Access
+
+    def alive(self, slot: int) -> bool:
+        return bool(self._alive[slot])
+
+    def dead(self) -> int:
+        """
+        Get the number of dead slots.
+        """
+        return len(self._alive) - self.live
+
+    def slots(self) -> Iterator[int]:
+        """
+        Iterate over the live slots in insertion order.
+        """
+        alive = self._alive
+        return (slot for slot in range(len(alive)) if alive[slot])
+
+    def slots_of(self, seqs: Iterable[int]) -> Iterator[int]:
+        """
+        Get the live slots of entries by sequence number, skipping those
+        that are missing or dead.
+        """
+        store_seqs, alive = self.seqs, self._alive
+        for seq in seqs:
+            slot = bisect_left(store_seqs, seq)
+            if slot < len(alive) and store_seqs[slot] == seq and alive[slot]:
+                yield slot
+
+    def _word_bytes(self, slot: int) -> bytearray:
+        start = self._word_ends[slot - 1] if slot else 0
+        return self._word_data[start:self._word_ends[slot]]
+
+    def id_at(self, slot: int) -> str:
+        odd_id = self._odd_ids.get(slot)
+        if odd_id is not None:
+            return odd_id
+        start = slot * KEY_SIZE
+        digits = self._keys[start:start + KEY_SIZE].hex()
+        return f"{digits[:8]}-{digits[8:12]}-{digits[12:16]}-{digits[16:20]}-{digits[20:]}"
+
+    def word_at(self, slot: int) -> str:
+        return self._word_bytes(slot).decode("utf-8")
+
+    def tags_at(self, slot: int) -> List[str]:
+        return list(self._tagset_names[self._tagsets[slot]])
+
+    def tag_ids_at(self, slot: int) -> Tuple[int, ...]:
+        return self.tagset_tag_ids[self._tagsets[slot]]
+
+    def view(self, slot: int) -> EntryView:
+        """
+        Get a view of the entry in a slot.
+
+        Args:
+            slot: Slot of the entry
+
+        Returns:
+            EntryView of the entry
+        """
+        return EntryView(self.id_at(slot), self.word_at(slot), self.tags_at(slot), self.seqs[slot])
+
+    def views(self, slots: Iterable[int]) -> Iterator[EntryView]:
+        """
+        Get views of the entries in several slots.
+        """
+        return (self.view(slot) for slot in slots)
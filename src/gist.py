@@ -4,18 +4,29 @@ GitHub Gist API wrapper for retrieving and updating gists.
 This module provides functions to interact with GitHub Gist API for dictionary storage.
 """
 import json
-from typing import Optional, Dict, Any
+import os
+import threading
+from typing import Optional, Dict, Any, List, Tuple
 
 import requests
 
-from log import logger
+from const import GIST_CACHE_FOLDER, ROOT_PATH
+from log import logger, payload_summary
+from utils import get_github_api_url, read_json_file, write_json_file
 
 # Implementation selection
 IMPLEMENT = "local"
 
 # Available implementations:
 # "local": Custom implementation using requests
-# "witherredaway": Third-party library (github-gists from PyPI)
+# "async": Pooled httpx client from gist_client, run to completion
+#
+# The server awaits gist_client directly so it never blocks the event loop;
+# these synchronous functions are for scripts and the CLI.
+
+# Per-gist locks of the cache files, created on first use
+_gist_cache_locks: Dict[str, threading.Lock] = {}
+_gist_cache_locks_guard = threading.Lock()
 
 
 def get_github_headers(auth_token: str) -> Dict[str, str]:
@@ -35,6 +46,182 @@ def get_github_headers(auth_token: str) -> Dict[str, str]:
     }
 
 
+def extract_gist_files(gist_metadata: Dict[str, Any]) -> Dict[str, str]:
+    """
+    Extract the file contents from a gist API response.
+    
+    Args:
+        gist_metadata: Parsed JSON body of a gist API response
+        
+    Returns:
+        Mapping of file name to file content, without truncated files
+    """
+    return {
+        name: file.get("content")
+        for name, file in gist_metadata.get("files", {}).items()
+        if file and file.get("content") is not None and not file.get("truncated")
+    }
+
+
+def get_truncated_files(gist_metadata: Dict[str, Any]) -> Dict[str, str]:
+    """
+    Find the files whose content the gist API truncated (larger than 1 MB).
+    
+    Args:
+        gist_metadata: Parsed JSON body of a gist API response
+        
+    Returns:
+        Mapping of file name to the raw URL of its full content
+    """
+    return {
+        name: file.get("raw_url")
+        for name, file in gist_metadata.get("files", {}).items()
+        if file and file.get("truncated") and file.get("raw_url")
+    }
+
+
+def extract_gist_commits(commits: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Extract the revisions from a gist commits API response.
+    
+    Args:
+        commits: Parsed JSON body of a /gists/{gist_id}/commits response
+        
+    Returns:
+        Revisions, newest first, with "version", "committed_at",
+        "additions" and "deletions" keys
+    """
+    return [
+        {
+            "version": commit.get("version"),
+            "committed_at": commit.get("committed_at"),
+            "additions": (commit.get("change_status") or {}).get("additions", 0),
+            "deletions": (commit.get("change_status") or {}).get("deletions", 0),
+        }
+        for commit in commits
+        if commit.get("version")
+    ]
+
+
+def get_gist_cache_path(gist_id: str) -> str:
+    """
+    Get the path of the local snapshot cache for a gist.
+    
+    Args:
+        gist_id: ID of the gist
+        
+    Returns:
+        Absolute path to the cache file
+    """
+    return os.path.join(ROOT_PATH, GIST_CACHE_FOLDER, f"gist_{gist_id}.json")
+
+
+def get_gist_cache_lock(gist_id: str) -> threading.Lock:
+    """
+    Get the lock serializing reads and writes of a gist's cache file, which
+    happen on worker threads of concurrent requests.
+    
+    Args:
+        gist_id: ID of the gist
+        
+    Returns:
+        Lock of the gist's cache
+    """
+    with _gist_cache_locks_guard:
+        lock = _gist_cache_locks.get(gist_id)
+        if lock is None:
+            lock = _gist_cache_locks[gist_id] = threading.Lock()
+        return lock
+
+
+def load_gist_cache(gist_id: str) -> Dict[str, Any]:
+    """
+    Load the last ETag and file contents seen for a gist.
+    
+    Args:
+        gist_id: ID of the gist
+        
+    Returns:
+        Dictionary with "etag" and "files" keys, empty if there is no cache
+    """
+    cache_path = get_gist_cache_path(gist_id)
+    with get_gist_cache_lock(gist_id):
+        if not os.path.exists(cache_path):
+            return {}
+        cache = read_json_file(cache_path)
+    if not cache.get("etag") or not isinstance(cache.get("files"), dict):
+        return {}
+    return cache
+
+
+def save_gist_cache(gist_id: str, etag: str, files: Dict[str, str]) -> bool:
+    """
+    Store the ETag and file contents of a gist as the local snapshot.
+    
+    Args:
+        gist_id: ID of the gist
+        etag: ETag returned by GitHub for this version of the gist
+        files: Mapping of file name to file content
+        
+    Returns:
+        True if successful, False otherwise
+    """
+    cache_path = get_gist_cache_path(gist_id)
+    os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+    # Written atomically so the ETag and the files always belong together
+    with get_gist_cache_lock(gist_id):
+        return write_json_file(cache_path, {"etag": etag, "files": files}, indent=None, atomic=True)
+
+
+def fetch_gist_files(auth_token: str, gist_id: str) -> Tuple[Optional[Dict[str, str]], Optional[str]]:
+    """
+    Retrieve all files of a gist, revalidating the local snapshot with If-None-Match.
+    
+    A 304 answer is served from the snapshot cache and does not count
+    against the GitHub rate limit.
+    
+    Args:
+        auth_token: GitHub authentication token
+        gist_id: ID of the gist to retrieve
+        
+    Returns:
+        Tuple of (mapping of file name to content, ETag), or (None, None) if retrieval failed
+    """
+    url = f"{get_github_api_url()}/gists/{gist_id}"
+    headers = get_github_headers(auth_token)
+
+    cache = load_gist_cache(gist_id)
+    if cache:
+        headers["If-None-Match"] = cache["etag"]
+
+    try:
+        response = requests.get(url, headers=headers)
+        
+        if response.status_code == 304 and cache:
+            logger.trace("Gist {} not modified, using cached snapshot", gist_id)
+            return cache["files"], cache["etag"]
+        elif response.status_code == 200:
+            gist_metadata = response.json()
+            logger.opt(lazy=True).trace("Fetched gist {}: {}", lambda: gist_id, lambda: payload_summary(response.content))
+            files = extract_gist_files(gist_metadata)
+            for name, raw_url in get_truncated_files(gist_metadata).items():
+                raw_response = requests.get(raw_url, headers=get_github_headers(auth_token))
+                raw_response.raise_for_status()
+                files[name] = raw_response.text
+            etag = response.headers.get("ETag")
+            if etag:
+                save_gist_cache(gist_id, etag, files)
+            return files, etag
+        else:
+            logger.error(f"Failed to retrieve gist: {response.status_code}")
+            logger.warning("Gist response: {}", payload_summary(response.text))
+            return None, None
+            
+    except Exception as e:
+        logger.error(f"Error retrieving gist: {e}")
+        return None, None
+
+
 def get_gist(auth_token: str, gist_id: str, file_name: str = "wordbank.json") -> Optional[str]:
     """
     Retrieve a gist from GitHub.
@@ -50,38 +237,23 @@ def get_gist(auth_token: str, gist_id: str, file_name: str = "wordbank.json") ->
     Official API: https://docs.github.com/en/rest/gists/gists?apiVersion=2022-11-28#get-a-gist
     """
     if IMPLEMENT == "local":
-        url = f"https://api.github.com/gists/{gist_id}"
-        headers = get_github_headers(auth_token)
-
-        try:
-            response = requests.get(url, headers=headers)
-            
-            if response.status_code == 200:
-                gist_metadata = response.json()
-                logger.trace(gist_metadata)
-                return gist_metadata.get("files", {}).get(file_name, {}).get("content")
-            else:
-                logger.error(f"Failed to retrieve gist: {response.status_code}")
-                logger.warning(response.text)
-                return None
-                
-        except Exception as e:
-            logger.error(f"Error retrieving gist: {e}")
+        files, _ = fetch_gist_files(auth_token, gist_id)
+        if files is None:
             return None
+        return files.get(file_name)
             
-    elif IMPLEMENT == "witherredaway":
+    elif IMPLEMENT == "async":
         import asyncio
-        import gists
+        from gist_client import AsyncGistClient
 
         async def main_get():
-            client = gists.Client()
-            gist = await client.get_gist(gist_id)
-            return gist
+            async with AsyncGistClient() as client:
+                return await client.get_gist(auth_token, gist_id, file_name)
 
         try:
             return asyncio.run(main_get())
         except Exception as e:
-            logger.error(f"Error retrieving gist with witherredaway: {e}")
+            logger.error(f"Error retrieving gist with async client: {e}")
             return None
     else:
         logger.error(f"Unknown implementation: {IMPLEMENT}")
@@ -109,7 +281,7 @@ def update_gist(
     Official API: https://docs.github.com/en/rest/gists/gists?apiVersion=2022-11-28#update-a-gist
     """
     if IMPLEMENT == "local":
-        url = f"https://api.github.com/gists/{gist_id}"
+        url = f"{get_github_api_url()}/gists/{gist_id}"
         headers = get_github_headers(auth_token)
 
         # Prepare payload
@@ -121,7 +293,12 @@ def update_gist(
             }
         }
         
-        logger.trace(f"Updating gist with data: {gist_data}")
+        logger.opt(lazy=True).trace(
+            "Updating gist {} file {}: {}",
+            lambda: gist_id,
+            lambda: file_name,
+            lambda: payload_summary(gist_data),
+        )
 
         try:
             response = requests.patch(
@@ -136,21 +313,36 @@ def update_gist(
             )
             
             if response.status_code == 200:
-                logger.trace(f"Gist updated successfully: {response.text}")
+                logger.opt(lazy=True).trace("Updated gist {}: {}", lambda: gist_id, lambda: payload_summary(response.content))
+                # The PATCH response carries the new version, so the next
+                # read can be answered with a 304
+                etag = response.headers.get("ETag")
+                gist_metadata = response.json()
+                if etag and not get_truncated_files(gist_metadata):
+                    save_gist_cache(gist_id, etag, extract_gist_files(gist_metadata))
                 return response.status_code
             else:
                 logger.error(f"Failed to update gist: {response.status_code}")
-                logger.warning(response.text)
+                logger.warning("Gist response: {}", payload_summary(response.text))
                 return response.status_code
                 
         except Exception as e:
             logger.error(f"Error updating gist: {e}")
             return None
             
-    elif IMPLEMENT == "witherredaway":
-        # Implementation for witherredaway library would go here
-        logger.error("witherredaway implementation for update_gist not implemented")
-        return None
+    elif IMPLEMENT == "async":
+        import asyncio
+        from gist_client import AsyncGistClient
+
+        async def main_update():
+            async with AsyncGistClient() as client:
+                return await client.update_gist(auth_token, gist_id, gist_data, file_name)
+
+        try:
+            return asyncio.run(main_update())
+        except Exception as e:
+            logger.error(f"Error updating gist with async client: {e}")
+            return None
     else:
         logger.error(f"Unknown implementation: {IMPLEMENT}")
         return None
@@ -0,0 +1,436 @@
+"""
+Asynchronous GitHub Gist client with connection pooling.
+
+This module provides a non-blocking counterpart of gist.py for use inside the
+FastAPI event loop. One keep-alive HTTP session is shared across requests, and
+all traffic goes through a rate-limit aware scheduler.
+"""
+import asyncio
+import json
+import time
+from typing import Any, Dict, List, Mapping, Optional, Tuple
+
+import httpx
+
+from const import (
+    GIST_CONNECT_TIMEOUT,
+    GIST_MAX_CONCURRENCY,
+    GIST_MAX_CONNECTIONS,
+    GIST_MAX_KEEPALIVE,
+    GIST_READ_MAX_WAIT,
+    GIST_READ_TIMEOUT,
+)
+from gist import (
+    extract_gist_commits,
+    extract_gist_files,
+    get_github_headers,
+    get_truncated_files,
+    load_gist_cache,
+    save_gist_cache,
+)
+from log import logger, payload_summary
+from metrics import gist_payload_bytes, gist_request_duration
+from ratelimit import PRIORITY_READ, PRIORITY_WRITE, GistScheduler, RateLimited
+from utils import get_github_api_url
+
+
+class AsyncGistClient:
+    """
+    Pooled asynchronous client for the GitHub Gist API.
+    """
+    def __init__(
+        self,
+        base_url: Optional[str] = None,
+        connect_timeout: float = GIST_CONNECT_TIMEOUT,
+        read_timeout: float = GIST_READ_TIMEOUT,
+        max_connections: int = GIST_MAX_CONNECTIONS,
+        max_keepalive: int = GIST_MAX_KEEPALIVE,
+        max_concurrency: int = GIST_MAX_CONCURRENCY,
+        scheduler: Optional[GistScheduler] = None,
+    ):
+        """
+        Initialize the client. The HTTP session is opened lazily on first use.
+
+        Args:
+            base_url: Base URL of the GitHub API, see get_github_api_url() if omitted
+            connect_timeout: Timeout in seconds for establishing a connection
+            read_timeout: Timeout in seconds for reading, writing and pool acquisition
+            max_connections: Maximum number of open connections
+            max_keepalive: Maximum number of idle keep-alive connections
+            max_concurrency: Maximum number of requests in flight
+            scheduler: Rate limit scheduler, a new one if omitted
+        """
+        self.base_url = base_url or get_github_api_url()
+        self.timeout = httpx.Timeout(read_timeout, connect=connect_timeout)
+        self.limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive,
+        )
+        self.max_concurrency = max_concurrency
+        self.scheduler = scheduler or GistScheduler()
+        self._session: Optional[httpx.AsyncClient] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        # Last ETag seen for each gist, from reads and writes
+        self.etags: Dict[str, str] = {}
+
+    @property
+    def session(self) -> httpx.AsyncClient:
+        """
+        Get the shared HTTP session, opening it if needed.
+
+        Returns:
+            httpx.AsyncClient bound to the GitHub API
+        """
+        if self._session is None or self._session.is_closed:
+            self._session = httpx.AsyncClient(
+                base_url=self.base_url,
+                timeout=self.timeout,
+                limits=self.limits,
+            )
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        return self._session
+
+    async def request(
+        self,
+        method: str,
+        path: str,
+        auth_token: str,
+        max_wait: Optional[float] = None,
+        **kwargs,
+    ) -> httpx.Response:
+        """
+        Send a request to the GitHub API within the concurrency limit.
+
+        Writes are scheduled ahead of reads, and throttled or failed attempts
+        are retried by the scheduler.
+
+        Args:
+            method: HTTP method
+            path: Path relative to the API base URL
+            auth_token: GitHub authentication token
+            max_wait: Longest wait in seconds for the rate limit and retries, unbounded if None
+            **kwargs: Extra arguments passed to httpx
+
+        Returns:
+            HTTP response
+
+        Raises:
+            RateLimited: If the request cannot be sent within max_wait
+        """
+        session = self.session
+        semaphore = self._semaphore
+        headers = get_github_headers(auth_token)
+        headers.update(kwargs.pop("headers", {}))
+
+        async def send() -> httpx.Response:
+            async with semaphore:
+                start = time.perf_counter()
+                try:
+                    response = await session.request(method, path, headers=headers, **kwargs)
+                except httpx.TransportError:
+                    gist_request_duration.labels(method, "error").observe(time.perf_counter() - start)
+                    raise
+            gist_request_duration.labels(method, response.status_code).observe(time.perf_counter() - start)
+            if method == "GET" and response.status_code == 200:
+                gist_payload_bytes.labels("download").observe(len(response.content))
+            return response
+
+        priority = PRIORITY_READ if method == "GET" else PRIORITY_WRITE
+        return await self.scheduler.request(send, priority, max_wait)
+
+    async def fetch_gist_files(
+        self,
+        auth_token: str,
+        gist_id: str,
+        max_wait: Optional[float] = None,
+    ) -> Tuple[Optional[Dict[str, str]], Optional[str]]:
+        """
+        Retrieve all files of a gist, revalidating the local snapshot with If-None-Match.
+
+        Args:
+            auth_token: GitHub authentication token
+            gist_id: ID of the gist to retrieve
+            max_wait: Longest wait in seconds for the rate limit and retries, unbounded if None
+
+        Returns:
+            Tuple of (mapping of file name to content, ETag), or (None, None) if retrieval failed
+        """
+        cache = await asyncio.to_thread(load_gist_cache, gist_id)
+        headers = {"If-None-Match": cache["etag"]} if cache else {}
+
+        try:
+            response = await self.request("GET", f"/gists/{gist_id}", auth_token, max_wait, headers=headers)
+
+            if response.status_code == 304 and cache:
+                logger.trace("Gist {} not modified, using cached snapshot", gist_id)
+                self.etags[gist_id] = cache["etag"]
+                return cache["files"], cache["etag"]
+            elif response.status_code == 200:
+                gist_metadata = response.json()
+                logger.opt(lazy=True).trace("Fetched gist {}: {}", lambda: gist_id, lambda: payload_summary(response.content))
+                files = extract_gist_files(gist_metadata)
+                files.update(await self.fetch_raw_files(auth_token, get_truncated_files(gist_metadata), max_wait))
+                etag = response.headers.get("ETag")
+                if etag:
+                    self.etags[gist_id] = etag
+                    await asyncio.to_thread(save_gist_cache, gist_id, etag, files)
+                return files, etag
+            else:
+                logger.error(f"Failed to retrieve gist: {response.status_code}")
+                logger.warning("Gist response: {}", payload_summary(response.text))
+                return None, None
+
+        except RateLimited as e:
+            logger.debug(f"Not retrieving gist {gist_id}: {e}")
+            return None, None
+        except Exception as e:
+            logger.error(f"Error retrieving gist: {e}")
+            return None, None
+
+    async def fetch_raw_files(
+        self,
+        auth_token: str,
+        raw_urls: Mapping[str, str],
+        max_wait: Optional[float] = None,
+    ) -> Dict[str, str]:
+        """
+        Download the full content of truncated gist files concurrently.
+
+        Args:
+            auth_token: GitHub authentication token
+            raw_urls: Mapping of file name to raw URL
+            max_wait: Longest wait in seconds for the rate limit and retries, unbounded if None
+
+        Returns:
+            Mapping of file name to file content
+
+        Raises:
+            httpx.HTTPStatusError: If any download fails
+        """
+        async def fetch(raw_url: str) -> str:
+            response = await self.request("GET", raw_url, auth_token, max_wait)
+            response.raise_for_status()
+            return response.text
+
+        names = list(raw_urls)
+        contents = await asyncio.gather(*(fetch(raw_urls[name]) for name in names))
+        return dict(zip(names, contents))
+
+    async def list_gist_commits(
+        self,
+        auth_token: str,
+        gist_id: str,
+        page: int = 1,
+        per_page: int = 30,
+        max_wait: Optional[float] = GIST_READ_MAX_WAIT,
+    ) -> List[Dict[str, Any]]:
+        """
+        List the revisions of a gist, newest first.
+
+        Args:
+            auth_token: GitHub authentication token
+            gist_id: ID of the gist
+            page: Page of the revision list, from 1
+            per_page: Number of revisions per page, at most 100
+            max_wait: Longest wait in seconds for the rate limit and retries, unbounded if None
+
+        Returns:
+            Revisions as returned by extract_gist_commits
+
+        Raises:
+            httpx.HTTPStatusError: If the request fails
+            RateLimited: If the request cannot be sent within max_wait
+        """
+        params = {"page": page, "per_page": per_page}
+        response = await self.request("GET", f"/gists/{gist_id}/commits", auth_token, max_wait, params=params)
+        response.raise_for_status()
+        return extract_gist_commits(response.json())
+
+    async def fetch_gist_revision_files(
+        self,
+        auth_token: str,
+        gist_id: str,
+        version: str,
+        max_wait: Optional[float] = GIST_READ_MAX_WAIT,
+    ) -> Dict[str, str]:
+        """
+        Retrieve all files of a gist as they were at a revision.
+
+        Args:
+            auth_token: GitHub authentication token
+            gist_id: ID of the gist
+            version: Commit SHA of the revision
+            max_wait: Longest wait in seconds for the rate limit and retries, unbounded if None
+
+        Returns:
+            Mapping of file name to file content
+
+        Raises:
+            httpx.HTTPStatusError: If the request fails
+            RateLimited: If a request cannot be sent within max_wait
+        """
+        response = await self.request("GET", f"/gists/{gist_id}/{version}", auth_token, max_wait)
+        response.raise_for_status()
+        gist_metadata = response.json()
+        files = extract_gist_files(gist_metadata)
+        files.update(await self.fetch_raw_files(auth_token, get_truncated_files(gist_metadata), max_wait))
+        return files
+
+    async def get_gist(self, auth_token: str, gist_id: str, file_name: str = "wordbank.json") -> Optional[str]:
+        """
+        Retrieve a gist file from GitHub.
+
+        Args:
+            auth_token: GitHub authentication token
+            gist_id: ID of the gist to retrieve
+            file_name: Name of the file to retrieve from the gist
+
+        Returns:
+            Content of the gist file or None if retrieval failed
+        """
+        files, _ = await self.fetch_gist_files(auth_token, gist_id)
+        if files is None:
+            return None
+        return files.get(file_name)
+
+    async def update_gist_files(
+        self,
+        auth_token: str,
+        gist_id: str,
+        files: Mapping[str, Optional[str]],
+        max_wait: Optional[float] = None,
+    ) -> Optional[int]:
+        """
+        Update several gist files in one PATCH.
+
+        Args:
+            auth_token: GitHub authentication token
+            gist_id: ID of the gist to update
+            files: Mapping of file name to new content, None to delete the file
+            max_wait: Longest wait in seconds for the rate limit and retries, unbounded if None
+
+        Returns:
+            HTTP status code or None if update failed
+        """
+        gist_data_payload = {
+            "files": {
+                file_name: {"content": content} if content is not None else None
+                for file_name, content in files.items()
+            }
+        }
+
+        try:
+            content = json.dumps(
+                gist_data_payload,
+                ensure_ascii=False,
+                indent=0,
+                sort_keys=False,
+            ).encode("utf-8")
+            gist_payload_bytes.labels("upload").observe(len(content))
+            logger.opt(lazy=True).trace(
+                "Updating {} file(s) of gist {}: {}",
+                lambda: len(files),
+                lambda: gist_id,
+                lambda: payload_summary(content),
+            )
+            response = await self.request("PATCH", f"/gists/{gist_id}", auth_token, max_wait, content=content)
+
+            if response.status_code == 200:
+                logger.opt(lazy=True).trace("Updated gist {}: {}", lambda: gist_id, lambda: payload_summary(response.content))
+                etag = response.headers.get("ETag")
+                gist_metadata = response.json()
+                if etag:
+                    self.etags[gist_id] = etag
+                if etag and not get_truncated_files(gist_metadata):
+                    files = extract_gist_files(gist_metadata)
+                    await asyncio.to_thread(save_gist_cache, gist_id, etag, files)
+                return response.status_code
+            else:
+                logger.error(f"Failed to update gist: {response.status_code}")
+                logger.warning("Gist response: {}", payload_summary(response.text))
+                return response.status_code
+
+        except Exception as e:
+            logger.error(f"Error updating gist: {e}")
+            return None
+
+    async def update_gist(
+        self,
+        auth_token: str,
+        gist_id: str,
+        gist_data: str,
+        file_name: str = "wordbank.json",
+    ) -> Optional[int]:
+        """
+        Update a gist file on GitHub.
+
+        Args:
+            auth_token: GitHub authentication token
+            gist_id: ID of the gist to update
+            gist_data: New content for the gist file
+            file_name: Name of the file to update
+
+        Returns:
+            HTTP status code or None if update failed
+        """
+        return await self.update_gist_files(auth_token, gist_id, {file_name: gist_data})
+
+    async def aclose(self) -> None:
+        """
+        Close the HTTP session and its pooled connections.
+        """
+        if self._session is not None:
+            await self._session.aclose()
+            self._session = None
+
+    async def __aenter__(self) -> "AsyncGistClient":
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.aclose()
+
+
+# Shared client used by the server
+client = AsyncGistClient()
+
+
+async def fetch_gist_files(
+    auth_token: str,
+    gist_id: str,
+    max_wait: Optional[float] = None,
+) -> Tuple[Optional[Dict[str, str]], Optional[str]]:
+    """
+    Retrieve all files of a gist with the shared client.
+    """
+    return await client.fetch_gist_files(auth_token, gist_id, max_wait)
+
+
+async def get_gist(auth_token: str, gist_id: str, file_name: str = "wordbank.json") -> Optional[str]:
+    """
+    Retrieve a gist file with the shared client.
+    """
+    return await client.get_gist(auth_token, gist_id, file_name)
+
+
+async def update_gist(
+    auth_token: str,
+    gist_id: str,
+    gist_data: str,
+    file_name: str = "wordbank.json",
+) -> Optional[int]:
+    """
+    Update a gist file with the shared client.
+    """
+    return await client.update_gist(auth_token, gist_id, gist_data, file_name)
+
+
+async def update_gist_files(
+    auth_token: str,
+    gist_id: str,
+    files: Mapping[str, Optional[str]],
+    max_wait: Optional[float] = None,
+) -> Optional[int]:
+    """
+    Update several gist files in one PATCH with the shared client.
+    """
+    return await client.update_gist_files(auth_token, gist_id, files, max_wait)
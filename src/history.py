@@ -0,0 +1,291 @@
+"""
+Revision history of the wordbank, read from the gist commits.
+
+GitHub keeps a revision of the gist for every PATCH. This module lists them
+and compares any two revisions entry by entry: each revision is reduced to a
+mapping of entry ID to (word, tags), and the diff is found by looking the IDs
+of one revision up in the other instead of diffing the JSON text, which the
+sharded layout and reordering would make meaningless.
+
+A revision never changes once committed, so downloaded revisions and
+computed diffs are kept in an on-disk LRU cache under ROOT_PATH and a
+history view does not download anything twice.
+"""
+import asyncio
+import hashlib
+import marshal
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+from const import (
+    GIST_CACHE_FOLDER,
+    HISTORY_CACHE_MAX_BYTES,
+    HISTORY_CACHE_MAX_FILES,
+    HISTORY_FOLDER,
+    ROOT_PATH,
+)
+from log import logger
+from shard import merge_shards
+
+# Entry ID to (word, tags) at one revision
+Revision = Dict[str, Tuple[str, Tuple[str, ...]]]
+
+# Commit SHA of a gist revision, possibly abbreviated
+REVISION_PATTERN = r"^[0-9a-f]{7,40}$"
+
+# Bumped whenever the layout of cached revisions or diffs changes
+HISTORY_CACHE_FORMAT = 1
+
+
+class DiskLRUCache:
+    """
+    Directory of marshal files evicting the least recently used ones.
+
+    Recency is the modification time of the files, touched on every hit, so
+    the order survives restarts.
+    """
+    def __init__(
+        self,
+        path: Optional[str] = None,
+        max_files: int = HISTORY_CACHE_MAX_FILES,
+        max_bytes: int = HISTORY_CACHE_MAX_BYTES,
+    ):
+        """
+        Initialize the cache. The directory is scanned on first use.
+
+        Args:
+            path: Directory holding the cached files
+            max_files: Maximum number of cached files
+            max_bytes: Maximum total size of the cached files
+        """
+        self.path = path or os.path.join(ROOT_PATH, GIST_CACHE_FOLDER, HISTORY_FOLDER)
+        self.max_files = max_files
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._sizes: Optional["OrderedDict[str, int]"] = None
+        self._lock = threading.Lock()
+
+    def _file_path(self, key: str) -> str:
+        name = hashlib.blake2b(key.encode("utf-8"), digest_size=16).hexdigest()
+        return os.path.join(self.path, f"{name}.marshal")
+
+    def _index(self) -> "OrderedDict[str, int]":
+        """
+        Get the sizes of the cached files, least recently used first.
+        """
+        if self._sizes is None:
+            os.makedirs(self.path, exist_ok=True)
+            files = []
+            for entry in os.scandir(self.path):
+                if entry.name.endswith(".marshal"):
+                    stat = entry.stat()
+                    files.append((stat.st_mtime, entry.path, stat.st_size))
+            self._sizes = OrderedDict((path, size) for _, path, size in sorted(files))
+        return self._sizes
+
+    def get(self, key: str) -> Any:
+        """
+        Get a cached value.
+
+        Args:
+            key: Cache key
+
+        Returns:
+            Cached value, None on a miss
+        """
+        path = self._file_path(key)
+        with self._lock:
+            sizes = self._index()
+            try:
+                with open(path, "rb") as f:
+                    data = marshal.load(f)
+                os.utime(path)
+            except FileNotFoundError:
+                sizes.pop(path, None)
+                self.misses += 1
+                return None
+            except Exception as e:
+                logger.warning(f"Dropping unreadable history cache file {path}: {e}")
+                self._remove(path)
+                self.misses += 1
+                return None
+            if not isinstance(data, dict) or data.get("format") != HISTORY_CACHE_FORMAT or data.get("key") != key:
+                self._remove(path)
+                self.misses += 1
+                return None
+            if path in sizes:
+                sizes.move_to_end(path)
+            self.hits += 1
+            return data["value"]
+
+    def put(self, key: str, value: Any) -> None:
+        """
+        Cache a value, evicting the least recently used files beyond the limits.
+
+        Args:
+            key: Cache key
+            value: Value serializable with marshal
+        """
+        path = self._file_path(key)
+        with self._lock:
+            sizes = self._index()
+            try:
+                with open(f"{path}.tmp", "wb") as f:
+                    marshal.dump({"format": HISTORY_CACHE_FORMAT, "key": key, "value": value}, f)
+                os.replace(f"{path}.tmp", path)
+            except Exception as e:
+                logger.error(f"Error writing history cache file {path}: {e}")
+                return
+            sizes.pop(path, None)
+            sizes[path] = os.path.getsize(path)
+            total = sum(sizes.values())
+            while sizes and (len(sizes) > self.max_files or total > self.max_bytes):
+                oldest, size = next(iter(sizes.items()))
+                if oldest == path:
+                    break
+                total -= size
+                self._remove(oldest)
+
+    def _remove(self, path: str) -> None:
+        if self._sizes is not None:
+            self._sizes.pop(path, None)
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            logger.warning(f"Error removing history cache file {path}: {e}")
+
+
+def revision_from_files(files: Dict[str, str]) -> Revision:
+    """
+    Reduce the files of a gist revision to its entries.
+
+    Args:
+        files: Mapping of gist file name to content
+
+    Returns:
+        Mapping of entry ID to (word, tags)
+    """
+    dictionary, _ = merge_shards(files)
+    return {entry.id: (entry.word, tuple(entry.tags)) for entry in dictionary.entries()}
+
+
+def diff_revisions(base: Revision, head: Revision) -> Dict[str, List]:
+    """
+    Compare two revisions entry by entry.
+
+    Args:
+        base: Older revision
+        head: Newer revision
+
+    Returns:
+        Dictionary with "added" and "removed" lists of (id, word, tags),
+        "retagged" of (id, word, old tags, new tags) and "reworded" of
+        (id, old word, new word), in the order of the head revision
+    """
+    added, retagged, reworded = [], [], []
+    for entry_id, (word, tags) in head.items():
+        previous = base.get(entry_id)
+        if previous is None:
+            added.append((entry_id, word, tags))
+            continue
+        if previous[0] != word:
+            reworded.append((entry_id, previous[0], word))
+        if previous[1] != tags and sorted(previous[1]) != sorted(tags):
+            retagged.append((entry_id, word, previous[1], tags))
+    removed = [(entry_id, word, tags) for entry_id, (word, tags) in base.items() if entry_id not in head]
+    return {"added": added, "removed": removed, "retagged": retagged, "reworded": reworded}
+
+
+class HistoryBrowser:
+    """
+    Revision list and cached entry-level diffs of a gist.
+    """
+    def __init__(self, client, cache: Optional[DiskLRUCache] = None):
+        """
+        Initialize the browser.
+
+        Args:
+            client: AsyncGistClient used to reach the gist
+            cache: On-disk cache of revisions and diffs, the default one if omitted
+        """
+        self.client = client
+        self.cache = cache or DiskLRUCache()
+        # Revisions being downloaded, so concurrent views share one download
+        self._loading: Dict[str, asyncio.Future] = {}
+
+    async def list_revisions(self, auth_token: str, gist_id: str, page: int = 1, per_page: int = 30) -> List[Dict[str, Any]]:
+        """
+        List the revisions of the gist, newest first. Not cached, since new
+        revisions keep being added.
+        """
+        return await self.client.list_gist_commits(auth_token, gist_id, page, per_page)
+
+    async def get_revision(self, auth_token: str, gist_id: str, version: str) -> Revision:
+        """
+        Get the entries of the gist at a revision, from the cache if possible.
+
+        Args:
+            auth_token: GitHub authentication token
+            gist_id: ID of the gist
+            version: Commit SHA of the revision
+
+        Returns:
+            Mapping of entry ID to (word, tags)
+
+        Raises:
+            httpx.HTTPStatusError: If the revision cannot be downloaded
+        """
+        key = f"revision:{gist_id}:{version}"
+        revision = await asyncio.to_thread(self.cache.get, key)
+        if revision is not None:
+            return revision
+        if key in self._loading:
+            return await asyncio.shield(self._loading[key])
+        future = asyncio.get_running_loop().create_future()
+        self._loading[key] = future
+        try:
+            files = await self.client.fetch_gist_revision_files(auth_token, gist_id, version)
+            revision = await asyncio.to_thread(revision_from_files, files)
+            await asyncio.to_thread(self.cache.put, key, revision)
+            future.set_result(revision)
+            return revision
+        except BaseException as e:
+            future.set_exception(e)
+            # Mark the exception as retrieved when nobody else waited for it
+            future.exception()
+            raise
+        finally:
+            del self._loading[key]
+
+    async def diff(self, auth_token: str, gist_id: str, base: str, head: str) -> Dict[str, List]:
+        """
+        Get the entry-level diff between two revisions, from the cache if possible.
+
+        Args:
+            auth_token: GitHub authentication token
+            gist_id: ID of the gist
+            base: Commit SHA of the older revision
+            head: Commit SHA of the newer revision
+
+        Returns:
+            Diff as returned by diff_revisions
+
+        Raises:
+            httpx.HTTPStatusError: If a revision cannot be downloaded
+        """
+        key = f"diff:{gist_id}:{base}:{head}"
+        diff = await asyncio.to_thread(self.cache.get, key)
+        if diff is not None:
+            return diff
+        base_revision, head_revision = await asyncio.gather(
+            self.get_revision(auth_token, gist_id, base),
+            self.get_revision(auth_token, gist_id, head),
+        )
+        diff = await asyncio.to_thread(diff_revisions, base_revision, head_revision)
+        await asyncio.to_thread(self.cache.put, key, diff)
+        return diff
@@ -0,0 +1,234 @@
+"""
+Append-only operation journal for dictionary mutations.
+
+Every create, tag update and delete is appended to a local JSON lines file
+as soon as it is applied, so a write costs O(edit) on disk. Operations not
+yet confirmed in the gist are replayed on top of the gist snapshot when it is
+loaded. Once the confirmed part of the journal passes a size threshold it is
+compacted: moved to a history file, leaving only unconfirmed operations.
+"""
+import json
+import os
+import time
+from typing import Any, Dict, Iterator, List, Optional
+
+from const import JOURNAL_COMPACT_BYTES, JOURNAL_FILENAME, JOURNAL_FOLDER, ROOT_PATH
+from log import logger
+from utils import read_json_file, write_json_file
+
+
+class Journal:
+    """
+    Append-only JSON lines journal with a persisted synchronized offset.
+    """
+    def __init__(
+        self,
+        path: Optional[str] = None,
+        compact_threshold: int = JOURNAL_COMPACT_BYTES,
+    ):
+        """
+        Open the journal, creating it if needed.
+
+        Args:
+            path: Path of the journal file
+            compact_threshold: Size in bytes of the synchronized part that triggers compaction
+        """
+        self.path = path or os.path.join(ROOT_PATH, JOURNAL_FOLDER, JOURNAL_FILENAME)
+        self.state_path = f"{self.path}.state"
+        self.compact_threshold = compact_threshold
+        self.replaying = False
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        self._open()
+
+    def _open(self) -> None:
+        """
+        Open the journal file and read the synchronized offset.
+        """
+        self._recover()
+        self._file = open(self.path, "ab")
+        # A crash in the middle of a write leaves a partial last line, the
+        # next append must not be glued to it
+        self._partial = self._ends_with_partial_line()
+        # Nothing is synchronized yet on a fresh start
+        state = read_json_file(self.state_path) if os.path.exists(self.state_path) else {}
+        self.synced = min(state.get("synced", 0), self.size())
+
+    def reopen(self) -> None:
+        """
+        Reopen the journal, picking up appends and compactions made by
+        another process that wrote it before.
+        """
+        self._file.close()
+        self._open()
+
+    def _recover(self) -> None:
+        """
+        Finish a compaction interrupted between its two renames.
+        """
+        tail_path = f"{self.path}.tail"
+        if os.path.exists(tail_path):
+            if os.path.exists(self.path):
+                os.remove(tail_path)
+            else:
+                os.replace(tail_path, self.path)
+                write_json_file(self.state_path, {"synced": 0}, atomic=True)
+
+    def _ends_with_partial_line(self) -> bool:
+        """
+        Check whether the journal ends with an unterminated line.
+
+        Returns:
+            True if the last byte is not a newline
+        """
+        with open(self.path, "rb") as f:
+            if f.seek(0, os.SEEK_END) == 0:
+                return False
+            f.seek(-1, os.SEEK_END)
+            return f.read(1) != b"\n"
+
+    def size(self) -> int:
+        """
+        Get the size of the journal in bytes.
+
+        Returns:
+            Number of bytes written to the journal
+        """
+        return os.path.getsize(self.path)
+
+    def offset(self) -> int:
+        """
+        Get the offset just past the last appended operation.
+
+        Returns:
+            Byte offset
+        """
+        self._file.flush()
+        return self._file.tell()
+
+    def append(self, operation: str, entry: Any) -> None:
+        """
+        Append an operation. Usable as a DictionaryDB listener.
+
+        Args:
+            operation: Name of the operation
+            entry: Entry affected by the operation
+        """
+        if self.replaying:
+            return
+        record = {
+            "op": operation,
+            "id": entry.id,
+            "word": entry.word,
+            "tags": entry.tags,
+            "at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        }
+        line = json.dumps(record, ensure_ascii=False, separators=(",", ":")) + "\n"
+        if self._partial:
+            # Terminate the partial line, read() then skips it as corrupt
+            line = "\n" + line
+            self._partial = False
+        self._file.write(line.encode("utf-8"))
+        self._file.flush()
+
+    def read(self, start: int = 0) -> Iterator[Dict[str, Any]]:
+        """
+        Read operations from the journal.
+
+        Args:
+            start: Byte offset to start reading from
+
+        Returns:
+            Iterator of operation records
+        """
+        self._file.flush()
+        with open(self.path, "rb") as f:
+            f.seek(start)
+            for line in f:
+                if not line.endswith(b"\n"):
+                    # Partial line left by a crash in the middle of a write
+                    break
+                try:
+                    yield json.loads(line)
+                except json.JSONDecodeError as e:
+                    logger.error(f"Skipping corrupt journal line: {e}")
+
+    def pending(self) -> List[Dict[str, Any]]:
+        """
+        Get the operations not yet confirmed in the gist.
+
+        Returns:
+            List of operation records
+        """
+        return list(self.read(self.synced))
+
+    def replay(self, db) -> int:
+        """
+        Apply the unconfirmed operations to a database without journaling them again.
+
+        Args:
+            db: DictionaryDB to apply the operations to
+
+        Returns:
+            Number of operations replayed
+        """
+        records = self.pending()
+        self.replaying = True
+        try:
+            for record in records:
+                db.apply_operation(record)
+        finally:
+            self.replaying = False
+        if records:
+            logger.info(f"Replayed {len(records)} journaled operation(s)")
+        return len(records)
+
+    def mark_synced(self, offset: int) -> None:
+        """
+        Record that every operation before an offset is in the gist, and
+        compact the journal if the synchronized part is large enough.
+
+        Args:
+            offset: Byte offset returned by offset() before the upload started
+        """
+        if offset <= self.synced:
+            return
+        self.synced = offset
+        write_json_file(self.state_path, {"synced": offset}, atomic=True)
+        if self.synced >= self.compact_threshold:
+            self.compact()
+
+    def compact(self) -> None:
+        """
+        Move the synchronized operations to a history file, keeping only the
+        unconfirmed ones in the journal.
+        """
+        self._file.flush()
+        synced = self.synced
+        with open(self.path, "rb") as f:
+            f.seek(synced)
+            tail = f.read()
+
+        history_path = f"{self.path}.{time.time_ns()}"
+        tail_path = f"{self.path}.tail"
+        with open(tail_path, "wb") as f:
+            f.write(tail)
+        # Replaying synchronized operations again is harmless, skipping
+        # unconfirmed ones is not, so reset the offset first
+        if not write_json_file(self.state_path, {"synced": 0}, atomic=True):
+            os.remove(tail_path)
+            logger.error("Could not reset the journal state, compaction skipped")
+            return
+        self._file.close()
+        os.replace(self.path, history_path)
+        os.replace(tail_path, self.path)
+        os.truncate(history_path, synced)
+
+        self._file = open(self.path, "ab")
+        self.synced = 0
+        logger.info(f"Compacted journal, {synced} byte(s) moved to {history_path}")
+
+    def close(self) -> None:
+        """
+        Close the journal file.
+        """
+        self._file.close()
@@ -1,25 +1,102 @@
 """
 Logger configuration for the gist-dictionary application.
 
-This module configures the application logger using hellologger.
+This module configures the application logger using hellologger. Its sinks
+are queued: a log call only puts the record on a queue and a background
+thread formats and writes it, so request handlers never wait on the disk.
+
+Messages below the level (LOG_LEVEL, or the GIST_DICTIONARY_LOG_LEVEL
+environment variable) are dropped before anything is formatted, provided
+they are written with loguru's own arguments, e.g.
+`logger.trace("Fetched {}", gist_id)`, or with
+`logger.opt(lazy=True)` for values that are costly to compute. Payloads
+are logged as payload_summary() rather than in full, and high-frequency
+events through a LogSampler.
 """
+import hashlib
 import os
+import sys
+import time
+from typing import Any
 
 from hellologger import get_logger
 
-from const import ROOT_PATH
+from const import LOG_LEVEL, LOG_PAYLOAD_PREVIEW, LOG_SAMPLE_EVERY, ROOT_PATH
+
+LOG_FORMAT = "{time:YYYY-MM-DD HH:mm:ss.SSS} | {level: <8} | {name}:{function}:{line} - {message}"
+
+level = os.environ.get("GIST_DICTIONARY_LOG_LEVEL", LOG_LEVEL).upper()
+log_path = os.path.join(ROOT_PATH, "log")
+# Resolved here rather than by loguru so the queued sink reopens the file
+# hellologger wrote its banner to
+log_file = f"gist_dictionary_{time.strftime('%Y-%m-%d_%H-%M-%S')}_{os.getpid()}.log"
 
 # Configure the application logger
 logger = get_logger(
-    log_path=os.path.join(ROOT_PATH, "log"),
-    log_file="gist_dictionary_{time}.log",
+    log_path=log_path,
+    log_file=log_file,
     log_target={
         "local": True,
         "aliyun": False,
         "aws": False,
     },
     log_level={
-        "local": "TRACE",
+        "local": level,
         "aliyun": "INFO",
     },
 )
+
+# hellologger adds its sinks synchronously and always at TRACE: replace them
+# with queued sinks at the configured level
+logger.remove()
+logger.add(sys.stderr, format=LOG_FORMAT, level=level, enqueue=True)
+logger.add(os.path.join(log_path, log_file), format=LOG_FORMAT, level=level, enqueue=True)
+
+
+def payload_summary(payload: Any, preview: int = LOG_PAYLOAD_PREVIEW) -> str:
+    """
+    Describe a payload by its size, hash and beginning instead of logging it whole.
+    
+    Args:
+        payload: Text, bytes, or any object, logged through its repr
+        preview: Number of characters of the payload to include
+        
+    Returns:
+        Summary such as `1048576 bytes, blake2b 3f2a..., '{"files": ...'`
+    """
+    if isinstance(payload, str):
+        data = payload.encode("utf-8", "replace")
+    elif isinstance(payload, (bytes, bytearray)):
+        data = bytes(payload)
+    else:
+        data = repr(payload).encode("utf-8", "replace")
+    digest = hashlib.blake2b(data, digest_size=8).hexdigest()
+    text = data[:preview * 4].decode("utf-8", "replace")
+    if len(text) > preview or len(data) > preview * 4:
+        text = text[:preview] + "..."
+    return f"{len(data)} bytes, blake2b {digest}, {text!r}"
+
+
+class LogSampler:
+    """
+    Let one out of every few occurrences of a frequent event be logged.
+    """
+    def __init__(self, every: int = LOG_SAMPLE_EVERY):
+        """
+        Initialize the sampler.
+        
+        Args:
+            every: Log the first occurrence and then one out of this many
+        """
+        self.every = max(1, every)
+        self.count = 0
+    
+    def __call__(self) -> bool:
+        """
+        Count an occurrence and tell whether to log it.
+        
+        Returns:
+            True for the occurrences to log
+        """
+        self.count += 1
+        return self.count % self.every == 1 or self.every == 1
@@ -4,7 +4,7 @@ Application entrypoint that launches the FastAPI service via uvicorn.
 import os
 import uvicorn
 
-from server import app
+from cluster import get_worker_count
 
 
 def main():
@@ -13,9 +13,27 @@ def main():
     
     Gets the port from environment variables or uses the default (12000).
     Configures the server to listen on all interfaces.
+    
+    With more than one worker (WORKERS environment variable or "workers"
+    config option), each worker process imports the application itself and
+    they share state through the SQLite storage, see cluster.py.
     """
     # Get port from environment or use default
     port = int(os.environ.get("PORT", 12000))
+    workers = get_worker_count()
+    
+    if workers > 1:
+        # Each worker imports the app by name; the parent process does not need it
+        uvicorn.run(
+            "server:app",
+            host="0.0.0.0",
+            port=port,
+            log_level="info",
+            workers=workers,
+        )
+        return
+    
+    from server import app
     
     # Run the server
     uvicorn.run(
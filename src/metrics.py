@@ -0,0 +1,353 @@
+"""
+In-process metrics exposed in the Prometheus text format.
+
+Metrics are created once at import time and their labelled children are
+resolved once per label combination and cached, so an observation is a
+dict lookup, a bisect over the bucket bounds and a couple of additions,
+with no lock: updates racing between threads may very rarely lose an
+increment, which is accepted for monitoring data. Gauges of values owned
+by other objects (entry count, sync queue depth) are read only when the
+metrics are scraped.
+
+Metrics are per process; with several workers each one reports its own.
+"""
+import time
+from abc import ABC, abstractmethod
+from bisect import bisect_left
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from const import METRICS_BYTES_BUCKETS, METRICS_LATENCY_BUCKETS
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+# Other request methods are labelled "OTHER" so clients cannot add series
+HTTP_METHODS = frozenset(("GET", "HEAD", "POST", "PUT", "PATCH", "DELETE", "OPTIONS", "CONNECT", "TRACE"))
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if isinstance(value, int) or value.is_integer():
+        return str(int(value))
+    return repr(value)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class _Metric(ABC):
+    """
+    Metric family with one child per label combination.
+    """
+    type = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children: Dict[Tuple[str, ...], object] = {}
+        # Children by label values as passed, before conversion to strings
+        self._lookup: Dict[tuple, object] = {}
+        if not self.labelnames:
+            self._children[()] = self._new_child()
+
+    @abstractmethod
+    def _new_child(self):
+        """
+        Create the child holding the values of one label combination.
+        """
+
+    def labels(self, *values) -> object:
+        """
+        Get the child of a label combination, creating it on first use.
+
+        Callers on hot paths should keep the child rather than look it up
+        for every observation.
+
+        Args:
+            *values: Label values, in the order of the label names
+
+        Returns:
+            Child metric
+        """
+        child = self._lookup.get(values)
+        if child is None:
+            key = tuple(str(value) for value in values)
+            if len(key) != len(self.labelnames):
+                raise ValueError(f"{self.name} expects labels {self.labelnames}, got {key}")
+            child = self._lookup[values] = self._children.setdefault(key, self._new_child())
+        return child
+
+    @abstractmethod
+    def _samples(self) -> Iterable[Tuple[str, str, float]]:
+        """
+        Get the samples of every child as (name suffix, labels, value).
+        """
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type}"]
+        for suffix, labels, value in self._samples():
+            lines.append(f"{self.name}{suffix}{labels} {_format_value(value)}")
+        return lines
+
+
+class CounterChild:
+    __slots__ = ("value",)
+
+    def __init__(self):
+        self.value = 0
+
+    def inc(self, amount: float = 1) -> None:
+        self.value += amount
+
+
+class Counter(_Metric):
+    """
+    Monotonically increasing count.
+    """
+    type = "counter"
+
+    def _new_child(self) -> CounterChild:
+        return CounterChild()
+
+    def inc(self, amount: float = 1) -> None:
+        self._children[()].inc(amount)
+
+    def _samples(self):
+        for key, child in list(self._children.items()):
+            yield "_total", _format_labels(self.labelnames, key), child.value
+
+
+class GaugeChild:
+    __slots__ = ("value", "function")
+
+    def __init__(self):
+        self.value = 0.0
+        self.function: Optional[Callable[[], Optional[float]]] = None
+
+    def set(self, value: float) -> None:
+        self.value = value
+
+    def set_function(self, function: Callable[[], Optional[float]]) -> None:
+        """
+        Read the value from a function when scraped. A None result omits the sample.
+        """
+        self.function = function
+
+    def get(self) -> Optional[float]:
+        return self.function() if self.function is not None else self.value
+
+
+class Gauge(_Metric):
+    """
+    Value that goes up and down.
+    """
+    type = "gauge"
+
+    def _new_child(self) -> GaugeChild:
+        return GaugeChild()
+
+    def set(self, value: float) -> None:
+        self._children[()].set(value)
+
+    def set_function(self, function: Callable[[], Optional[float]]) -> None:
+        self._children[()].set_function(function)
+
+    def _samples(self):
+        for key, child in list(self._children.items()):
+            value = child.get()
+            if value is not None:
+                yield "", _format_labels(self.labelnames, key), value
+
+
+class HistogramChild:
+    __slots__ = ("bounds", "counts", "sum")
+
+    def __init__(self, bounds: Tuple[float, ...]):
+        self.bounds = bounds
+        # One count per bucket plus the +Inf overflow, not cumulative
+        self.counts = [0] * (len(bounds) + 1)
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        # Buckets are upper-inclusive, which bisect_left gives directly
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.sum += value
+
+
+class Histogram(_Metric):
+    """
+    Distribution of observations in fixed buckets.
+    """
+    type = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = METRICS_LATENCY_BUCKETS,
+    ):
+        self.bounds = tuple(sorted(buckets))
+        super().__init__(name, documentation, labelnames)
+
+    def _new_child(self) -> HistogramChild:
+        return HistogramChild(self.bounds)
+
+    def observe(self, value: float) -> None:
+        self._children[()].observe(value)
+
+    def _samples(self):
+        for key, child in list(self._children.items()):
+            counts = list(child.counts)
+            cumulative = 0
+            for bound, count in zip(self.bounds + (float("inf"),), counts):
+                cumulative += count
+                yield "_bucket", _format_labels(self.labelnames, key, f'le="{_format_value(bound)}"'), cumulative
+            yield "_sum", _format_labels(self.labelnames, key), child.sum
+            yield "_count", _format_labels(self.labelnames, key), cumulative
+
+
+class Registry:
+    """
+    Set of metrics rendered together.
+    """
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+
+    def _register(self, metric: _Metric) -> _Metric:
+        if metric.name in self._metrics:
+            raise ValueError(f"Metric {metric.name} is already registered")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self._register(Gauge(name, documentation, labelnames))
+
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = METRICS_LATENCY_BUCKETS,
+    ) -> Histogram:
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def render(self) -> str:
+        """
+        Render every metric in the Prometheus text exposition format.
+
+        Returns:
+            Exposition text
+        """
+        lines: List[str] = []
+        for metric in list(self._metrics.values()):
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware timing HTTP requests per route.
+
+    Routes are labelled with their path template, e.g.
+    /v1/dictionary/entries/{entry_id}, so that the number of series stays
+    bounded; requests matching no route are labelled "unmatched" and
+non-standard methods "OTHER".
+    """
+    def __init__(self, app, histogram: Optional[Histogram] = None):
+        self.app = app
+        self.histogram = histogram or http_request_duration
+        self._children: Dict[Tuple[str, object, int], HistogramChild] = {}
+        self._paths: Optional[Dict[object, str]] = None
+
+    def _route_path(self, scope) -> str:
+        endpoint = scope.get("endpoint")
+        if endpoint is None:
+            return "unmatched"
+        if self._paths is None or endpoint not in self._paths:
+            app = scope.get("app")
+            routes = getattr(app, "routes", [])
+            self._paths = {
+                getattr(route, "endpoint", None): route.path
+                for route in routes
+                if hasattr(route, "path")
+            }
+        return self._paths.get(endpoint, "unmatched")
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - start
+            method = scope["method"] if scope["method"] in HTTP_METHODS else "OTHER"
+            key = (method, scope.get("endpoint"), status_code)
+            child = self._children.get(key)
+            if child is None:
+                child = self._children[key] = self.histogram.labels(method, self._route_path(scope), status_code)
+            child.observe(elapsed)
+
+
+# Registry of the application and its metrics
+registry = Registry()
+
+http_request_duration = registry.histogram(
+    "gist_dictionary_http_request_duration_seconds",
+    "Latency of HTTP requests by route and status",
+    ("method", "route", "status"),
+)
+gist_request_duration = registry.histogram(
+    "gist_dictionary_gist_request_duration_seconds",
+    "Latency of GitHub Gist API attempts by method and status, retries included",
+    ("method", "status"),
+)
+gist_payload_bytes = registry.histogram(
+    "gist_dictionary_gist_payload_bytes",
+    "Size of gist bodies downloaded and uploaded",
+    ("direction",),
+    buckets=METRICS_BYTES_BUCKETS,
+)
+parse_duration = registry.histogram(
+    "gist_dictionary_parse_duration_seconds",
+    "Time spent parsing wordbank JSON, by trusted or validated path",
+    ("mode",),
+)
+serialize_duration = registry.histogram(
+    "gist_dictionary_serialize_duration_seconds",
+    "Time spent serializing wordbank JSON",
+)
+dictionary_entries = registry.gauge(
+    "gist_dictionary_entries",
+    "Number of entries in the in-memory dictionary",
+)
+sync_pending = registry.gauge(
+    "gist_dictionary_sync_pending",
+    "Mutations waiting to be pushed to the gist",
+)
+rate_limit_remaining = registry.gauge(
+    "gist_dictionary_github_rate_limit_remaining",
+    "GitHub API requests remaining in the current rate limit window",
+)
@@ -0,0 +1,229 @@
+"""
+Prefix index over dictionary words for autocomplete.
+
+This module provides a sorted-array index searched with bisect, kept up to
+date incrementally as entries are created and deleted.
+
+Inserting into or deleting from the middle of a large sorted array shifts
+everything after it, so changes are staged instead: new words go to a small
+sorted run searched alongside the main arrays, and deleted keys are only
+marked. Both are folded into the main arrays in one pass once
+PREFIX_INDEX_MERGE_AT of them have accumulated.
+"""
+import unicodedata
+from array import array
+from bisect import bisect_left, bisect_right
+from typing import Iterable, List, Sequence, Set, Tuple
+
+from const import PREFIX_INDEX_MERGE_AT
+
+
+def normalize_word(word: str) -> str:
+    """
+    Normalize a word or prefix for matching.
+
+    Compatibility decomposition makes a Hangul syllable being typed a prefix
+    of the complete syllable (하 matches 한, ㅎ matches 하) and lets kana typed
+    without dakuten match voiced kana. Case is folded for Latin scripts.
+
+    Args:
+        word: Word or prefix to normalize
+
+    Returns:
+        Normalized key
+    """
+    return unicodedata.normalize("NFKD", word).casefold()
+
+
+def _position(words: Sequence[str], keys: Sequence[int], normalized: str, key: int) -> int:
+    """
+    Get where a (normalized word, key) pair is or would be inserted.
+    """
+    low = bisect_left(words, normalized)
+    high = bisect_right(words, normalized, low)
+    # Keys of equal words are sorted too
+    return bisect_left(keys, key, low, high)
+
+
+def _merge(
+    words: List[str],
+    keys: array,
+    pairs: List[Tuple[str, int]],
+    removed: Set[int] = frozenset(),
+) -> Tuple[List[str], array]:
+    """
+    Merge sorted (normalized word, key) pairs into sorted arrays in one
+    pass, leaving out removed keys.
+
+    Returns:
+        New word and key arrays
+    """
+    if removed:
+        kept = [position for position, key in enumerate(keys) if key not in removed]
+        words = [words[position] for position in kept]
+        keys = array("q", (keys[position] for position in kept))
+    merged_words: List[str] = []
+    merged_keys = array("q")
+    previous = 0
+    for normalized, key in pairs:
+        # Sorted pairs land at non-decreasing positions
+        position = _position(words, keys, normalized, key)
+        merged_words += words[previous:position]
+        merged_keys += keys[previous:position]
+        merged_words.append(normalized)
+        merged_keys.append(key)
+        previous = position
+    merged_words += words[previous:]
+    merged_keys += keys[previous:]
+    return merged_words, merged_keys
+
+
+def _scan(words: List[str], keys: array, normalized: str, limit: int, removed: Set[int]) -> List[Tuple[str, int]]:
+    """
+    Get up to `limit` (word, key) pairs starting with a prefix, in order.
+    """
+    position = bisect_left(words, normalized)
+    matches: List[Tuple[str, int]] = []
+    while position < len(words) and len(matches) < limit:
+        word = words[position]
+        if not word.startswith(normalized):
+            break
+        if keys[position] not in removed:
+            matches.append((word, keys[position]))
+        position += 1
+    return matches
+
+
+class PrefixIndex:
+    """
+    Sorted array of normalized words with a parallel array of entry keys.
+
+    Keys are the insertion sequence numbers of the entries, which are much
+    smaller than ID strings and never reused. Entries with the same
+    normalized word are kept in key order.
+    """
+    def __init__(self, merge_at: int = PREFIX_INDEX_MERGE_AT):
+        """
+        Initialize an empty index.
+
+        Args:
+            merge_at: Number of staged additions or removals folded into the main arrays at once
+        """
+        self.merge_at = merge_at
+        self.words: List[str] = []
+        self.keys = array("q")
+        # Recently added words, sorted, and keys removed from the main arrays
+        self.recent_words: List[str] = []
+        self.recent_keys = array("q")
+        self.removed: Set[int] = set()
+
+    @classmethod
+    def from_entries(cls, entries: Iterable) -> "PrefixIndex":
+        """
+        Build an index from entries in one sort.
+
+        Args:
+            entries: Entries with `word` and `seq` attributes
+
+        Returns:
+            New PrefixIndex
+        """
+        index = cls()
+        pairs = sorted((normalize_word(entry.word), entry.seq) for entry in entries)
+        index.words = [word for word, _ in pairs]
+        index.keys = array("q", (key for _, key in pairs))
+        return index
+
+    def __len__(self) -> int:
+        return len(self.words) - len(self.removed) + len(self.recent_words)
+
+    def compact(self) -> None:
+        """
+        Fold the staged additions and removals into the main arrays.
+        """
+        recent = list(zip(self.recent_words, self.recent_keys))
+        self.words, self.keys = _merge(self.words, self.keys, recent, self.removed)
+        self.recent_words, self.recent_keys = [], array("q")
+        self.removed = set()
+
+    def _stage(self, pairs: List[Tuple[str, int]]) -> None:
+        """
+        Add sorted pairs to the recent run, compacting once it is large.
+        """
+        if any(key in self.removed for _, key in pairs):
+            # A staged removal would hide the key again
+            self.compact()
+        if len(pairs) == 1:
+            normalized, key = pairs[0]
+            position = _position(self.recent_words, self.recent_keys, normalized, key)
+            self.recent_words.insert(position, normalized)
+            self.recent_keys.insert(position, key)
+        else:
+            self.recent_words, self.recent_keys = _merge(self.recent_words, self.recent_keys, pairs)
+        if len(self.recent_words) >= self.merge_at:
+            self.compact()
+
+    def add(self, word: str, key: int) -> None:
+        """
+        Add a word to the index.
+
+        Args:
+            word: Word of the entry
+            key: Sequence number of the entry
+        """
+        self._stage([(normalize_word(word), key)])
+
+    def add_many(self, items: Iterable[Tuple[str, int]]) -> None:
+        """
+        Add several words to the index, merging them in one pass.
+
+        Args:
+            items: Pairs of entry word and sequence number
+        """
+        pairs = sorted((normalize_word(word), key) for word, key in items)
+        if pairs:
+            self._stage(pairs)
+
+    def remove(self, word: str, key: int) -> bool:
+        """
+        Remove a word from the index.
+
+        Args:
+            word: Word of the entry
+            key: Sequence number of the entry
+
+        Returns:
+            True if the word was indexed, False otherwise
+        """
+        normalized = normalize_word(word)
+        position = _position(self.recent_words, self.recent_keys, normalized, key)
+        if position < len(self.recent_words) and self.recent_words[position] == normalized and self.recent_keys[position] == key:
+            del self.recent_words[position]
+            del self.recent_keys[position]
+            return True
+        position = _position(self.words, self.keys, normalized, key)
+        if position < len(self.words) and self.words[position] == normalized and self.keys[position] == key:
+            if key in self.removed:
+                return False
+            self.removed.add(key)
+            if len(self.removed) >= self.merge_at:
+                self.compact()
+            return True
+        return False
+
+    def search(self, prefix: str, limit: int = 10) -> List[int]:
+        """
+        Find entries whose word starts with a prefix, in word order.
+
+        Args:
+            prefix: Prefix to search for
+            limit: Maximum number of results
+
+        Returns:
+            List of entry sequence numbers
+        """
+        normalized = normalize_word(prefix)
+        matches = _scan(self.words, self.keys, normalized, limit, self.removed)
+        if self.recent_words:
+            matches = sorted(matches + _scan(self.recent_words, self.recent_keys, normalized, limit, set()))[:limit]
+        return [key for _, key in matches]
@@ -0,0 +1,301 @@
+"""
+GitHub rate-limit aware scheduling of gist requests.
+
+This module tracks the quota reported by GitHub in the X-RateLimit-* headers,
+paces requests so a burst never exhausts it, retries throttled and failed
+requests with jittered exponential backoff, and lets writes go ahead of
+refresh reads. Requests made on behalf of a user are given a max_wait and
+raise RateLimited rather than wait for the quota to reset, so the caller
+can answer from local state.
+"""
+import asyncio
+import heapq
+import itertools
+import random
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+import httpx
+
+from const import (
+    GIST_BACKOFF_BASE,
+    GIST_BACKOFF_MAX,
+    GIST_MAX_RETRIES,
+    RATE_LIMIT_PACE_BELOW,
+    RATE_LIMIT_READ_RESERVE,
+)
+from log import LogSampler, logger
+
+# Lower value is served first
+PRIORITY_WRITE = 0
+PRIORITY_READ = 1
+
+RETRYABLE_STATUS = {429, 500, 502, 503, 504}
+
+# Under throttling every request retries, so only some retries are logged;
+# the scheduler state keeps the exact count
+retry_log_sampler = LogSampler()
+
+
+class RateLimited(Exception):
+    """
+    Raised instead of waiting when a request could not be sent within its
+    max_wait, because of the rate limit, pacing or retries.
+    """
+    def __init__(self, retry_in: float):
+        super().__init__(f"Gist request deferred by the rate limit for {retry_in:.1f}s")
+        self.retry_in = retry_in
+
+
+class GistScheduler:
+    """
+    Priority queue in front of the GitHub API that honours its rate limit.
+    """
+    def __init__(
+        self,
+        max_retries: int = GIST_MAX_RETRIES,
+        backoff_base: float = GIST_BACKOFF_BASE,
+        backoff_max: float = GIST_BACKOFF_MAX,
+        read_reserve: int = RATE_LIMIT_READ_RESERVE,
+        pace_below: int = RATE_LIMIT_PACE_BELOW,
+    ):
+        """
+        Initialize the scheduler.
+
+        Args:
+            max_retries: Number of retries after the first attempt
+            backoff_base: Backoff in seconds before the first retry
+            backoff_max: Upper bound in seconds of a single backoff
+            read_reserve: Remaining requests kept for writes; reads wait for the reset below it, up to their max_wait
+            pace_below: Remaining quota under which requests are spread until the reset
+        """
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.read_reserve = read_reserve
+        self.pace_below = pace_below
+
+        # Quota as last reported by GitHub
+        self.limit: Optional[int] = None
+        self.remaining: Optional[int] = None
+        self.reset_at: Optional[float] = None
+        self.blocked_until = 0.0
+        self.last_dispatch = 0.0
+
+        # Counters for monitoring
+        self.requests = 0
+        self.retries = 0
+        self.throttled = 0
+        self.failures = 0
+
+        self._waiters: List[Tuple[int, int, asyncio.Future]] = []
+        self._sequence = itertools.count()
+        self._wakeup: Optional[asyncio.Event] = None
+        self._dispatcher: Optional[asyncio.Task] = None
+
+    def update(self, headers: httpx.Headers) -> None:
+        """
+        Record the quota reported in response headers.
+
+        Args:
+            headers: Response headers
+        """
+        try:
+            if "x-ratelimit-limit" in headers:
+                self.limit = int(headers["x-ratelimit-limit"])
+            if "x-ratelimit-remaining" in headers:
+                self.remaining = int(headers["x-ratelimit-remaining"])
+            if "x-ratelimit-reset" in headers:
+                self.reset_at = float(headers["x-ratelimit-reset"])
+        except ValueError:
+            logger.warning("Ignoring malformed rate limit headers")
+
+    def delay_for(self, priority: int) -> float:
+        """
+        Get how long a request of the given priority must wait before it is sent.
+
+        Args:
+            priority: PRIORITY_WRITE or PRIORITY_READ
+
+        Returns:
+            Delay in seconds, 0 if it can be sent now
+        """
+        now = time.time()
+        delay = max(0.0, self.blocked_until - now)
+        if self.remaining is None or self.reset_at is None or now >= self.reset_at:
+            return delay
+
+        until_reset = self.reset_at - now
+        if self.remaining <= 0:
+            return max(delay, until_reset)
+        if priority != PRIORITY_WRITE and self.remaining <= self.read_reserve:
+            return max(delay, until_reset)
+        if self.remaining < self.pace_below:
+            # Spread what is left evenly over the rest of the window
+            interval = until_reset / self.remaining
+            delay = max(delay, self.last_dispatch + interval - now)
+        return delay
+
+    def backoff(self, attempt: int) -> float:
+        """
+        Get a jittered exponential backoff.
+
+        Args:
+            attempt: Number of the failed attempt, starting at 0
+
+        Returns:
+            Delay in seconds
+        """
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+
+    def retry_delay(self, response: httpx.Response, attempt: int) -> Optional[float]:
+        """
+        Decide whether a response should be retried.
+
+        Args:
+            response: Response to inspect
+            attempt: Number of the attempt that produced it, starting at 0
+
+        Returns:
+            Delay in seconds before retrying, or None if it should not be retried
+        """
+        retry_after = response.headers.get("retry-after")
+        rate_limited = response.status_code == 429 or (
+            response.status_code == 403
+            and (retry_after is not None or response.headers.get("x-ratelimit-remaining") == "0")
+        )
+        if rate_limited:
+            self.throttled += 1
+            if retry_after is not None and retry_after.isdigit():
+                delay = float(retry_after)
+            elif self.remaining == 0 and self.reset_at:
+                delay = max(0.0, self.reset_at - time.time())
+            else:
+                delay = self.backoff(attempt)
+            # Every request waits, not only this one
+            self.blocked_until = max(self.blocked_until, time.time() + delay)
+            return delay
+        if response.status_code in RETRYABLE_STATUS:
+            return self.backoff(attempt)
+        return None
+
+    async def _turn(self, priority: int) -> None:
+        """
+        Wait until the dispatcher lets a request of this priority through.
+        """
+        if self._dispatcher is None or self._dispatcher.done():
+            self._wakeup = asyncio.Event()
+            self._dispatcher = asyncio.create_task(self._dispatch())
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (priority, next(self._sequence), future))
+        self._wakeup.set()
+        await future
+
+    async def _dispatch(self) -> None:
+        """
+        Release waiting requests one at a time, highest priority first.
+        """
+        while True:
+            while not self._waiters:
+                self._wakeup.clear()
+                await self._wakeup.wait()
+            priority = self._waiters[0][0]
+            delay = self.delay_for(priority)
+            if delay > 0:
+                try:
+                    # A new, more urgent request may change what to wait for
+                    self._wakeup.clear()
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=delay)
+                    continue
+                except asyncio.TimeoutError:
+                    pass
+            _, _, future = heapq.heappop(self._waiters)
+            if not future.done():
+                self.last_dispatch = time.time()
+                if self.remaining:
+                    # Count the request now so concurrent ones pace correctly
+                    self.remaining -= 1
+                future.set_result(None)
+
+    async def request(
+        self,
+        send: Callable[[], Awaitable[httpx.Response]],
+        priority: int = PRIORITY_READ,
+        max_wait: Optional[float] = None,
+    ) -> httpx.Response:
+        """
+        Send a request when the quota allows, retrying throttled and failed attempts.
+
+        Args:
+            send: Coroutine function performing the request
+            priority: PRIORITY_WRITE or PRIORITY_READ
+            max_wait: Longest time in seconds to spend waiting for the quota
+                and between retries, unbounded if None. Requests serving a
+                user should not wait until the rate limit resets
+
+        Returns:
+            Last response received; a retryable one if retrying would
+            exceed max_wait
+
+        Raises:
+            RateLimited: If the request cannot be sent within max_wait
+            httpx.TransportError: If every attempt failed at the transport level
+        """
+        deadline = time.monotonic() + max_wait if max_wait is not None else None
+        attempt = 0
+        while True:
+            if deadline is None:
+                await self._turn(priority)
+            else:
+                budget = deadline - time.monotonic()
+                delay = self.delay_for(priority)
+                if delay > budget:
+                    raise RateLimited(delay)
+                try:
+                    await asyncio.wait_for(self._turn(priority), timeout=max(budget, 0.001))
+                except asyncio.TimeoutError:
+                    raise RateLimited(self.delay_for(priority)) from None
+            self.requests += 1
+            try:
+                response = await send()
+            except httpx.TransportError as e:
+                delay = self.backoff(attempt)
+                if attempt >= self.max_retries or (deadline is not None and time.monotonic() + delay > deadline):
+                    self.failures += 1
+                    raise
+                if retry_log_sampler():
+                    logger.warning("Gist request failed ({}), retrying in {:.1f}s ({} retries so far)", e, delay, self.retries + 1)
+            else:
+                self.update(response.headers)
+                delay = self.retry_delay(response, attempt)
+                if delay is None:
+                    return response
+                if attempt >= self.max_retries or (deadline is not None and time.monotonic() + delay > deadline):
+                    self.failures += 1
+                    return response
+                if retry_log_sampler():
+                    logger.warning("Gist request returned {}, retrying in {:.1f}s ({} retries so far)", response.status_code, delay, self.retries + 1)
+            attempt += 1
+            self.retries += 1
+            await asyncio.sleep(delay)
+
+    def state(self) -> Dict[str, Any]:
+        """
+        Get the scheduler state for monitoring.
+
+        Returns:
+            Dictionary of quota, queue and counters
+        """
+        now = time.time()
+        return {
+            "limit": self.limit,
+            "remaining": self.remaining,
+            "reset_in": max(0.0, self.reset_at - now) if self.reset_at else None,
+            "blocked_for": max(0.0, self.blocked_until - now),
+            "queued_writes": sum(1 for waiter in self._waiters if waiter[0] == PRIORITY_WRITE),
+            "queued_reads": sum(1 for waiter in self._waiters if waiter[0] != PRIORITY_WRITE),
+            "requests": self.requests,
+            "retries": self.retries,
+            "throttled": self.throttled,
+            "failures": self.failures,
+        }
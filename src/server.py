@@ -1,23 +1,267 @@
 """
 FastAPI server entrypoint that registers API routes for the dictionary service.
 """
-from fastapi import Depends, FastAPI, HTTPException, status
+import asyncio
+import hashlib
+import math
+from contextlib import asynccontextmanager
+
+from typing import List, Optional, Set, Tuple
+
+import httpx
+from fastapi import Depends, FastAPI, HTTPException, Query, Request, Response, status
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse, StreamingResponse
 
 from auth import get_api_key, get_token
-from const import API_VERSION, DEFAULT_GIST_FILENAME
-from db import db
-from dictionary import Dictionary, Entry, EntryCreate, TagUpdate
-from dict_manipulation import parse_dictionary
-from gist import get_gist, update_gist
+from cluster import WorkerCoordinator, get_worker_count
+from const import API_VERSION, DEFAULT_GIST_FILENAME, GIST_READ_MAX_WAIT, GIST_SHUTDOWN_MAX_WAIT
+from db import Listener, db
+from bulk_import import import_entries
+from dictionary import (
+    BulkImportResult,
+    Dictionary,
+    DictionaryChanges,
+    Entry,
+    EntryCreate,
+    EntryPage,
+    GistRevision,
+    RetaggedEntry,
+    RevisionDiff,
+    RewordedEntry,
+    TagUpdate,
+)
+from gist_client import client as gist_client, fetch_gist_files, update_gist_files
+from history import REVISION_PATTERN, HistoryBrowser
+from journal import Journal
 from log import logger
+from metrics import (
+    CONTENT_TYPE as METRICS_CONTENT_TYPE,
+    MetricsMiddleware,
+    dictionary_entries,
+    rate_limit_remaining,
+    registry as metrics_registry,
+    sync_pending,
+)
+from ratelimit import RateLimited
+from shard import ShardTracker, all_shard_filenames, merge_shards, serialize_shards
+from storage import create_backend
+from sync import GistSyncer
 from utils import get_config
+from webhook import create_dispatcher
+
+
+def create_syncer() -> GistSyncer:
+    """
+    Create the write-behind syncer, honouring the optional "sync" config section.
+    
+    Returns:
+        Configured GistSyncer
+    """
+    sync_config = get_config().get("config", {}).get("sync", {})
+    options = {
+        key: sync_config[key]
+        for key in ("debounce", "max_delay", "max_batch")
+        if key in sync_config
+    }
+    return GistSyncer(update_dictionary_gist, **options)
+
+
+def warm_start() -> None:
+    """
+    Load the dictionary from local storage into the database and reapply the
+    operations journaled since, so requests can be served before the gist
+    is reached.
+    """
+    gist_id = get_config().get("config", {}).get("gist_name")
+    if not gist_id:
+        return
+    stored = storage.load(gist_id)
+    if stored is None:
+        logger.info(f"Nothing in {storage.name} storage, the dictionary will be loaded from the gist")
+        return
+    dictionary, version = stored
+    db.load_dictionary(dictionary, version=version)
+    if coordinator is None:
+        journal.replay(db)
+
+
+async def reconcile_dictionary() -> None:
+    """
+    Bring the preloaded database up to date with the gist, retrying until
+    it succeeds. Pushes to the gist are enabled once it has.
+    """
+    while not syncer.ready.is_set():
+        try:
+            await refresh_dictionary(reconcile=True)
+        except Exception as e:
+            detail = e.detail if isinstance(e, HTTPException) else e
+            logger.warning(f"Could not reconcile with gist ({detail}), retrying in {syncer.max_delay}s")
+            await asyncio.sleep(syncer.max_delay)
+
+
+async def persist_dictionary(reset: bool = False, force: bool = False) -> None:
+    """
+    Bring local storage up to date with the database.
+    
+    Args:
+        reset: The database was reloaded from the gist and replaces the stored dictionary
+        force: Persist now even if the backend would normally defer it
+    """
+    # A database that was never reconciled may be partial
+    if not syncer.ready.is_set():
+        return
+    gist_id = get_config().get("config", {}).get("gist_name")
+    if not gist_id:
+        return
+    async with storage_lock:
+        try:
+            if reset:
+                await storage.reset(db, gist_id)
+            else:
+                await storage.checkpoint(db, gist_id, force=force)
+        except Exception as e:
+            logger.error(f"Error persisting dictionary to {storage.name} storage: {e}")
+
+
+def is_gist_writer() -> bool:
+    """
+    Tell whether this process writes the gist, which is always the case
+    with a single worker.
+    
+    Returns:
+        True if this process is the gist writer
+    """
+    return coordinator is None or coordinator.is_writer
+
+
+def writer_only(listener: Listener) -> Listener:
+    """
+    Wrap a DictionaryDB listener so it only runs in the gist writer.
+    
+    Args:
+        listener: Listener journaling or pushing mutations to the gist
+        
+    Returns:
+        Wrapped listener
+    """
+    def forward(operation: str, entry: Entry) -> None:
+        if is_gist_writer():
+            listener(operation, entry)
+    return forward
+
+
+def publish_event(operation: str, entry: Entry) -> None:
+    """
+    Hand a mutation to the webhooks, except when journaled operations are
+    reapplied: their events were sent when they were first made.
+    """
+    if not journal.replaying:
+        webhooks.notify(operation, entry)
+
+
+def record_entry(record: dict) -> Entry:
+    """
+    Build the entry carried by a journal or change record.
+    """
+    return Entry.model_construct(id=record["id"], word=record.get("word"), tags=record.get("tags") or [])
+
+
+async def become_writer() -> None:
+    """
+    Take over writing the gist in multi-worker mode: journal the changes the
+    previous writer had not, schedule every unsynchronized operation for
+    upload and reconcile with the gist.
+    """
+    global reconcile_task
+    journal.reopen()
+    
+    # Changes up to the cursor are in the database but maybe not journaled
+    writer_seq = await asyncio.to_thread(storage.get_writer_seq)
+    first_change = await asyncio.to_thread(storage.first_change)
+    if first_change is not None and first_change > writer_seq + 1:
+        logger.warning("Changes were dropped before being journaled, uploading every shard")
+        shards.dirty |= all_shard_filenames()
+        syncer.notify("promote")
+    seq = writer_seq
+    while seq < coordinator.cursor:
+        changes = [
+            change for change in await asyncio.to_thread(storage.changes_since, seq)
+            if change["seq"] <= coordinator.cursor
+        ]
+        if not changes:
+            break
+        for change in changes:
+            journal.append(change["op"], record_entry(change))
+        seq = changes[-1]["seq"]
+    await storage.set_writer_seq(coordinator.cursor, coordinator.keep_changes)
+    
+    for record in journal.pending():
+        entry = record_entry(record)
+        shards.notify(record["op"], entry)
+        syncer.notify(record["op"], entry)
+    db.version = await asyncio.to_thread(storage.stored_version)
+    reconcile_task = asyncio.create_task(reconcile_dictionary())
+
+
+def schedule_persist(reset: bool = False) -> None:
+    """
+    Run persist_dictionary in the background, in order with earlier calls.
+    """
+    task = asyncio.create_task(persist_dictionary(reset=reset))
+    storage_tasks.add(task)
+    task.add_done_callback(storage_tasks.discard)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Preload the database from local storage, start the write-behind syncer
+    and the webhook deliveries, and reconcile with the gist in the
+    background. On shutdown, flush pending changes and webhook events,
+    persist the database and close the gist connection pool and storage.
+    
+    In multi-worker mode, only the worker holding the writer lock talks to
+    the gist; the others follow the shared storage.
+    """
+    global reconcile_task
+    if coordinator is not None:
+        coordinator.acquire()
+    # The journal is closed by a previous shutdown of the app in this process
+    journal.reopen()
+    warm_start()
+    syncer.start()
+    webhooks.start()
+    if coordinator is None:
+        reconcile_task = asyncio.create_task(reconcile_dictionary())
+    else:
+        coordinator.loaded()
+        if coordinator.is_writer:
+            await become_writer()
+        coordinator.start(db, become_writer)
+    yield
+    if reconcile_task is not None:
+        reconcile_task.cancel()
+    # Do not wait for a rate limit reset: unsynchronized changes are
+    # journaled and pushed again after the next start
+    if not await syncer.stop(GIST_SHUTDOWN_MAX_WAIT):
+        logger.error(f"Shutting down with {syncer.pending} unsynchronized change(s), kept in the journal")
+    if storage_tasks:
+        await asyncio.gather(*storage_tasks)
+    await persist_dictionary(force=True)
+    if coordinator is not None:
+        await coordinator.stop()
+    await webhooks.stop()
+    await gist_client.aclose()
+    journal.close()
+    storage.close()
 
 # Create FastAPI app
 app = FastAPI(
     title="Gist Dictionary API",
     description="API for managing a dictionary stored in GitHub Gists",
     version="0.1.0",
+    lifespan=lifespan,
 )
 
 # Add CORS middleware
@@ -29,6 +273,9 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Time every request, outermost so that the other middleware is included
+app.add_middleware(MetricsMiddleware)
+
 # Define API routes
 @app.get("/")
 async def root():
@@ -44,43 +291,184 @@ async def health_check():
     """
     return {"status": "healthy"}
 
+def entry_etag(entry: Entry) -> str:
+    """
+    Get the strong ETag of an entry, derived from its content so it is the
+    same in every worker.
+    """
+    content = "\0".join([entry.id, entry.word, *(entry.tags or [])])
+    return f'"{hashlib.blake2b(content.encode("utf-8"), digest_size=16).hexdigest()}"'
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """
+    Tell whether the If-None-Match header of a request matches an ETag.
+    
+    Args:
+        request: Incoming request
+        etag: Quoted ETag of the current representation
+        
+    Returns:
+        True if the client already has the representation
+    """
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    # If-None-Match uses the weak comparison
+    return any(candidate.strip().removeprefix("W/") == etag for candidate in header.split(","))
+
+
+def not_modified(etag: str) -> Response:
+    """
+    Build a 304 Not Modified response.
+    """
+    return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
+
+def get_gist_credentials() -> Tuple[str, str]:
+    """
+    Get the configured gist ID and the GitHub token.
+    
+    Returns:
+        Tuple of (gist ID, token)
+        
+    Raises:
+        HTTPException: If either is not available
+    """
+    gist_id = get_config().get("config", {}).get("gist_name")
+    if not gist_id:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Gist ID not configured"
+        )
+    token = get_token()
+    if not token:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="GitHub token not available"
+        )
+    return gist_id, token
+
+
+def gist_error(e: Exception, action: str) -> HTTPException:
+    """
+    Turn an error reaching the gist into an HTTP error, passing a missing
+    revision through as 404 and a request deferred by the rate limit as 503.
+    """
+    if isinstance(e, RateLimited):
+        logger.warning(f"Error {action}: {e}")
+        return HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=f"Error {action}: GitHub rate limit reached",
+            headers={"Retry-After": str(max(1, math.ceil(e.retry_in)))},
+        )
+    if isinstance(e, httpx.HTTPStatusError) and e.response.status_code in (404, 422):
+        return HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Revision not found")
+    logger.error(f"Error {action}: {e}")
+    return HTTPException(status_code=status.HTTP_502_BAD_GATEWAY, detail=f"Error {action}: {str(e)}")
+
 # Protected routes requiring API key
+async def refresh_dictionary(reconcile: bool = False) -> Dictionary:
+    """
+    Bring the database up to date with the Gist and return the dictionary.
+    
+    Args:
+        reconcile: Fetch the gist even if local changes are pending, waiting
+            as long as the rate limit requires, and fail instead of returning
+            the local dictionary
+    
+    Returns:
+        Current dictionary
+        
+    Raises:
+        HTTPException: If the Gist is not configured
+        RuntimeError: If reconciling and the Gist could not be fetched
+    """
+    # Local changes not yet pushed take precedence over the gist, and
+    # other workers get the gist's content through the shared storage
+    if (syncer.pending and not reconcile) or not is_gist_writer():
+        return db.get_dictionary()
+    
+    # Get configuration
+    config = get_config()
+    gist_id = config.get("config", {}).get("gist_name")
+    if not gist_id:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Gist ID not configured"
+        )
+    
+    # Get GitHub token
+    token = get_token()
+    if not token:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="GitHub token not available"
+        )
+    
+    # Get dictionary from Gist, revalidating the local snapshot; a user
+    # request does not wait for the rate limit to reset
+    gist_files, etag = await fetch_gist_files(token, gist_id, None if reconcile else GIST_READ_MAX_WAIT)
+    if gist_files is None:
+        if reconcile:
+            raise RuntimeError("Gist could not be fetched")
+        # Serve what is stored locally, empty if nothing was ever loaded
+        return db.get_dictionary()
+    
+    # Skip parsing when the gist has not changed since it was loaded
+    if etag and etag == db.version:
+        syncer.mark_ready()
+        return db.get_dictionary()
+    
+    # Parse and merge the wordbank shards
+    dictionary, legacy = merge_shards(gist_files)
+    
+    # Load dictionary into database and reapply unsynchronized operations
+    db.load_dictionary(dictionary, version=etag)
+    journal.replay(db)
+    syncer.mark_ready()
+    schedule_persist(reset=True)
+    
+    if legacy:
+        # Rewrite a single-file gist as shards on the next sync
+        logger.info("Migrating single-file gist to sharded layout")
+        shards.mark_legacy()
+        syncer.notify("migrate")
+    
+    return dictionary
+
 @app.get(f"/{API_VERSION}/dictionary", response_model=Dictionary)
-async def get_dictionary(api_key: str = Depends(get_api_key)):
+async def get_dictionary(
+    request: Request,
+    response: Response,
+    stream: bool = False,
+    api_key: str = Depends(get_api_key),
+):
     """
     Get the entire dictionary.
+    
+    With stream=true the document is written entry by entry using chunked
+    transfer encoding instead of being validated and serialized in memory.
+    
+    The ETag is the dictionary revision; a client sending it back in
+    If-None-Match gets 304 Not Modified while nothing changed.
     """
     try:
-        # Get configuration
-        config = get_config()
-        gist_id = config.get("config", {}).get("gist_name")
-        if not gist_id:
-            raise HTTPException(
-                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                detail="Gist ID not configured"
+        dictionary = await refresh_dictionary()
+        etag = f'"{db.get_revision()}"'
+        if etag_matches(request, etag):
+            return not_modified(etag)
+        if stream:
+            return StreamingResponse(
+                dictionary.iter_json(),
+                media_type="application/json",
+                headers={"ETag": etag},
             )
-        
-        # Get GitHub token
-        token = get_token()
-        if not token:
-            raise HTTPException(
-                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                detail="GitHub token not available"
-            )
-        
-        # Get dictionary from Gist
-        gist_data = get_gist(token, gist_id, DEFAULT_GIST_FILENAME)
-        if not gist_data:
-            # Return empty dictionary if no data found
-            return Dictionary()
-        
-        # Parse dictionary
-        dictionary = parse_dictionary(gist_data)
-        
-        # Load dictionary into database
-        db.load_dictionary(dictionary)
-        
+        response.headers["ETag"] = etag
         return dictionary
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error retrieving dictionary: {e}")
         raise HTTPException(
@@ -88,6 +476,77 @@ async def get_dictionary(api_key: str = Depends(get_api_key)):
             detail=f"Error retrieving dictionary: {str(e)}"
         )
 
+@app.get(f"/{API_VERSION}/dictionary/entries", response_model=EntryPage)
+async def list_entries(
+    cursor: Optional[str] = None,
+    limit: int = Query(default=100, ge=1, le=1000),
+    tags: Optional[str] = Query(default=None, max_length=1000),
+    api_key: str = Depends(get_api_key),
+):
+    """
+    Get one page of dictionary entries and the cursor of the next page.
+    
+    With tags, only the entries matching the boolean tag query are listed,
+    e.g. `ja AND n2 AND NOT mastered`, and the page carries their total.
+    """
+    try:
+        if tags is not None:
+            total, entries, next_cursor = db.find_by_tags(tags, cursor, limit)
+            return EntryPage(entries=entries, next_cursor=next_cursor, total=total)
+        entries, next_cursor = db.get_entries_page(cursor, limit)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    return EntryPage(entries=entries, next_cursor=next_cursor)
+
+@app.get(f"/{API_VERSION}/dictionary/changes", response_model=DictionaryChanges)
+async def get_changes(since: str, api_key: str = Depends(get_api_key)):
+    """
+    Get the entries created, updated or deleted since a revision, taken from
+    the ETag of the dictionary (passed as is, quotes included) or from the
+    revision field of the previous call.
+    
+    When the changes are no longer known, reset is set and the client has to
+    download the dictionary again.
+    """
+    try:
+        return db.get_changes(since)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+
+@app.get(f"/{API_VERSION}/dictionary/entries/{{entry_id}}", response_model=Entry)
+async def get_entry(entry_id: str, request: Request, response: Response, api_key: str = Depends(get_api_key)):
+    """
+    Get a dictionary entry by ID.
+    """
+    entry = db.get_entry(entry_id)
+    if entry is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Entry with ID {entry_id} not found"
+        )
+    etag = entry_etag(entry)
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    response.headers["ETag"] = etag
+    return entry
+
+@app.get(f"/{API_VERSION}/dictionary/suggest", response_model=List[Entry])
+async def suggest_entries(
+    prefix: str = Query(min_length=1),
+    limit: int = Query(default=10, ge=1, le=100),
+    api_key: str = Depends(get_api_key),
+):
+    """
+    Get entries whose word starts with the given prefix, for autocomplete.
+    """
+    return db.suggest(prefix, limit)
+
 @app.post(f"/{API_VERSION}/dictionary/entries", response_model=Entry)
 async def create_entry(entry: EntryCreate, api_key: str = Depends(get_api_key)):
     """
@@ -97,9 +556,6 @@ async def create_entry(entry: EntryCreate, api_key: str = Depends(get_api_key)):
         # Create entry in database
         new_entry = db.create_entry(entry)
         
-        # Update Gist
-        await update_dictionary_gist()
-        
         return new_entry
     except Exception as e:
         logger.error(f"Error creating entry: {e}")
@@ -108,6 +564,29 @@ async def create_entry(entry: EntryCreate, api_key: str = Depends(get_api_key)):
             detail=f"Error creating entry: {str(e)}"
         )
 
+@app.post(f"/{API_VERSION}/dictionary/entries:bulk", response_model=BulkImportResult)
+async def bulk_create_entries(request: Request, api_key: str = Depends(get_api_key)):
+    """
+    Create many entries from a streamed NDJSON or CSV body (Content-Type
+    text/csv, with a header row containing "word" and optionally "tags").
+    
+    All created entries are persisted with a single Gist update at the end.
+    """
+    content_type = request.headers.get("content-type", "")
+    content_format = "csv" if "csv" in content_type else "ndjson"
+    try:
+        async with syncer.hold():
+            result = await import_entries(db, request.stream(), content_format)
+        result.synced = await syncer.flush()
+    except Exception as e:
+        logger.error(f"Error importing entries: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error importing entries: {str(e)}"
+        )
+    logger.info(f"Bulk import created {result.created} entries, rejected {result.failed}")
+    return result
+
 @app.put(f"/{API_VERSION}/dictionary/entries/{{entry_id}}/tags", response_model=Entry)
 async def update_entry_tags(entry_id: str, tag_update: TagUpdate, api_key: str = Depends(get_api_key)):
     """
@@ -122,9 +601,6 @@ async def update_entry_tags(entry_id: str, tag_update: TagUpdate, api_key: str =
                 detail=f"Entry with ID {entry_id} not found"
             )
         
-        # Update Gist
-        await update_dictionary_gist()
-        
         return updated_entry
     except HTTPException:
         raise
@@ -149,9 +625,6 @@ async def delete_entry(entry_id: str, api_key: str = Depends(get_api_key)):
                 detail=f"Entry with ID {entry_id} not found"
             )
         
-        # Update Gist
-        await update_dictionary_gist()
-        
         return {"message": f"Entry {entry_id} deleted"}
     except HTTPException:
         raise
@@ -162,10 +635,92 @@ async def delete_entry(entry_id: str, api_key: str = Depends(get_api_key)):
             detail=f"Error deleting entry: {str(e)}"
         )
 
-async def update_dictionary_gist() -> bool:
+@app.get(f"/{API_VERSION}/dictionary/revisions", response_model=List[GistRevision])
+async def list_revisions(
+    page: int = Query(default=1, ge=1),
+    per_page: int = Query(default=30, ge=1, le=100),
+    api_key: str = Depends(get_api_key),
+):
+    """
+    List the revisions of the gist, newest first.
+    """
+    gist_id, token = get_gist_credentials()
+    try:
+        return await history.list_revisions(token, gist_id, page, per_page)
+    except Exception as e:
+        raise gist_error(e, "listing revisions")
+
+@app.get(f"/{API_VERSION}/dictionary/revisions/diff", response_model=RevisionDiff)
+async def diff_revisions(
+    base: str = Query(pattern=REVISION_PATTERN),
+    head: str = Query(pattern=REVISION_PATTERN),
+    api_key: str = Depends(get_api_key),
+):
+    """
+    Get the entries added, removed, retagged and reworded between two
+    revisions of the gist. Revisions and diffs are cached on disk.
+    """
+    gist_id, token = get_gist_credentials()
+    try:
+        diff = await history.diff(token, gist_id, base, head)
+    except Exception as e:
+        raise gist_error(e, "comparing revisions")
+    return RevisionDiff(
+        base=base,
+        head=head,
+        added=[Entry.model_construct(id=entry_id, word=word, tags=list(tags)) for entry_id, word, tags in diff["added"]],
+        removed=[Entry.model_construct(id=entry_id, word=word, tags=list(tags)) for entry_id, word, tags in diff["removed"]],
+        retagged=[
+            RetaggedEntry.model_construct(id=entry_id, word=word, old_tags=list(old_tags), new_tags=list(new_tags))
+            for entry_id, word, old_tags, new_tags in diff["retagged"]
+        ],
+        reworded=[
+            RewordedEntry.model_construct(id=entry_id, old_word=old_word, new_word=new_word)
+            for entry_id, old_word, new_word in diff["reworded"]
+        ],
+    )
+
+@app.get("/metrics")
+async def metrics():
+    """
+    Metrics of this process in the Prometheus text format.
+    """
+    return PlainTextResponse(metrics_registry.render(), media_type=METRICS_CONTENT_TYPE)
+
+@app.get(f"/{API_VERSION}/gist/rate_limit")
+async def gist_rate_limit(api_key: str = Depends(get_api_key)):
+    """
+    Get the GitHub rate limit and request scheduler state.
+    """
+    return gist_client.scheduler.state()
+
+@app.get(f"/{API_VERSION}/webhooks")
+async def webhook_state(api_key: str = Depends(get_api_key)):
+    """
+    Get the delivery state of the configured webhooks.
+    """
+    return webhooks.state()
+
+@app.post(f"/{API_VERSION}/dictionary/sync")
+async def sync_dictionary(api_key: str = Depends(get_api_key)):
+    """
+    Push pending dictionary changes to the Gist immediately.
+    """
+    pending = syncer.pending
+    if not await syncer.flush():
+        raise HTTPException(
+            status_code=status.HTTP_502_BAD_GATEWAY,
+            detail=f"Failed to synchronize {syncer.pending} pending change(s)"
+        )
+    return {"message": f"Synchronized {pending} pending change(s)"}
+
+async def update_dictionary_gist(max_wait: Optional[float] = None) -> bool:
     """
     Update the dictionary in GitHub Gist.
     
+    Args:
+        max_wait: Longest wait in seconds for the rate limit, unbounded if None
+        
     Returns:
         True if successful, False otherwise
     """
@@ -183,18 +738,67 @@ async def update_dictionary_gist() -> bool:
             logger.error("GitHub token not available")
             return False
         
-        # Get dictionary from database
-        dictionary = db.get_dictionary()
-        
+        # Serialize only the shards changed since the last upload: their
+        # entries are copied here, the JSON is built in a worker thread
+        journal_offset = journal.offset()
+        dirty, migrate_legacy = shards.take()
+        if not dirty and not migrate_legacy:
+            return True
+    except Exception as e:
+        logger.error(f"Error updating dictionary in Gist: {e}")
+        return False
+    
+    try:
+        files = await asyncio.to_thread(serialize_shards, shards.entries(db.get_dictionary(), dirty))
+        if migrate_legacy:
+            files[DEFAULT_GIST_FILENAME] = None
+    except Exception as e:
+        logger.error(f"Error updating dictionary in Gist: {e}")
+        shards.restore(dirty, migrate_legacy)
+        return False
+    
+    try:
         # Update Gist
-        status_code = update_gist(
-            token, 
-            gist_id, 
-            dictionary.to_json(), 
-            DEFAULT_GIST_FILENAME
-        )
-        
-        return status_code == 200
+        status_code = await update_gist_files(token, gist_id, files, max_wait)
     except Exception as e:
         logger.error(f"Error updating dictionary in Gist: {e}")
+        status_code = None
+    
+    if status_code != 200:
+        shards.restore(dirty, migrate_legacy)
         return False
+    
+    # The gist now holds every journaled operation up to the offset, and the
+    # database matches the version just written
+    journal.mark_synced(journal_offset)
+    db.version = gist_client.etags.get(gist_id)
+    schedule_persist()
+    return True
+
+
+# Mutations are journaled locally, acknowledged from the database and pushed
+# in the background, uploading only the shards they touched
+journal = Journal()
+shards = ShardTracker()
+syncer = create_syncer()
+storage_lock = asyncio.Lock()
+storage_tasks: Set[asyncio.Task] = set()
+reconcile_task: Optional[asyncio.Task] = None
+webhooks = create_dispatcher(get_config())
+history = HistoryBrowser(gist_client)
+
+# With several workers the storage is shared and a single one writes the gist
+workers = get_worker_count()
+storage = create_backend(get_config(), shared=workers > 1)
+coordinator = WorkerCoordinator(storage) if workers > 1 else None
+
+db.add_listener(writer_only(journal.append))
+db.add_listener(storage.record)
+db.add_listener(writer_only(shards.notify))
+db.add_listener(shards.track)
+db.add_listener(writer_only(syncer.notify))
+db.add_listener(writer_only(publish_event))
+
+dictionary_entries.set_function(lambda: db.dictionary.count())
+sync_pending.set_function(lambda: syncer.pending)
+rate_limit_remaining.set_function(lambda: gist_client.scheduler.remaining)
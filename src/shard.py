@@ -0,0 +1,242 @@
+"""
+Sharded gist layout for the wordbank.
+
+This module splits the wordbank across several files of the same gist,
+partitioned by a hash of the entry ID, so that a write only uploads the
+shards touched by the edits since the previous one. The tracker keeps the
+entries of each shard, so a sync only visits the entries of dirty shards.
+"""
+import weakref
+import zlib
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from const import DEFAULT_GIST_FILENAME, SHARD_COUNT, SHARD_FILENAME_PREFIX
+from dictionary import Dictionary, Entry
+from dict_manipulation import parse_dictionary
+from entry_store import EntryView
+
+
+def shard_filename(entry_id: str, shard_count: int = SHARD_COUNT) -> str:
+    """
+    Get the name of the gist file holding an entry.
+
+    Args:
+        entry_id: ID of the entry
+        shard_count: Number of shards
+
+    Returns:
+        Shard file name, e.g. "wordbank-0a.json"
+    """
+    shard = zlib.crc32(entry_id.encode("utf-8")) % shard_count
+    return f"{SHARD_FILENAME_PREFIX}{shard:02x}.json"
+
+
+def all_shard_filenames(shard_count: int = SHARD_COUNT) -> Set[str]:
+    """
+    Get the names of all shard files.
+
+    Args:
+        shard_count: Number of shards
+
+    Returns:
+        Set of shard file names
+    """
+    return {f"{SHARD_FILENAME_PREFIX}{shard:02x}.json" for shard in range(shard_count)}
+
+
+def is_shard_filename(file_name: str) -> bool:
+    """
+    Check whether a gist file is a wordbank shard.
+
+    Args:
+        file_name: Name of the gist file
+
+    Returns:
+        True if the file is a shard, False otherwise
+    """
+    return file_name.startswith(SHARD_FILENAME_PREFIX) and file_name.endswith(".json")
+
+
+def split_dictionary(
+    entries: Iterable[Entry],
+    file_names: Optional[Set[str]] = None,
+    shard_count: int = SHARD_COUNT,
+) -> Dict[str, str]:
+    """
+    Serialize entries into shard files.
+
+    Args:
+        entries: Entries of the dictionary
+        file_names: Shards to serialize, all shards if omitted. Requested
+            shards without entries are serialized as empty wordbanks
+        shard_count: Number of shards
+
+    Returns:
+        Mapping of shard file name to JSON content
+    """
+    if file_names is None:
+        file_names = all_shard_filenames(shard_count)
+    shards: Dict[str, Dictionary] = {file_name: Dictionary() for file_name in file_names}
+    for entry in entries:
+        shard = shards.get(shard_filename(entry.id, shard_count))
+        if shard is not None:
+            shard.add_entry(entry)
+    return {file_name: shard.to_json() for file_name, shard in sorted(shards.items())}
+
+
+def serialize_shards(shards: Dict[str, List[EntryView]]) -> Dict[str, str]:
+    """
+    Serialize entries already grouped by shard, as split_dictionary does.
+
+    Entry views are copies, so this can run in a worker thread while the
+    dictionary keeps changing.
+
+    Args:
+        shards: Mapping of shard file name to its entries in insertion order
+
+    Returns:
+        Mapping of shard file name to JSON content
+    """
+    return {
+        file_name: Dictionary.from_columns(
+            [entry.id for entry in entries],
+            [entry.word for entry in entries],
+            [entry.tags for entry in entries],
+        ).to_json()
+        for file_name, entries in sorted(shards.items())
+    }
+
+
+def merge_shards(files: Dict[str, str]) -> Tuple[Dictionary, bool]:
+    """
+    Merge the wordbank files of a gist into one dictionary.
+
+    A gist still using the single-file layout is read from DEFAULT_GIST_FILENAME.
+
+    Args:
+        files: Mapping of gist file name to content
+
+    Returns:
+        Tuple of (merged dictionary, True if the gist uses the single-file layout)
+    """
+    shard_names = sorted(name for name in files if is_shard_filename(name))
+    if not shard_names:
+        legacy = files.get(DEFAULT_GIST_FILENAME)
+        if legacy:
+            return parse_dictionary(legacy), True
+        return Dictionary(), False
+
+    dictionary = Dictionary()
+    for name in shard_names:
+        for entry in parse_dictionary(files[name]).entries():
+            dictionary.add_entry(entry)
+    return dictionary, False
+
+
+class ShardTracker:
+    """
+    Track which shards have changed since the last successful upload, and
+    which entries each shard holds.
+
+    Membership is indexed by entry sequence number for one dictionary at a
+    time; it is rebuilt when the database has loaded another one since.
+    """
+    def __init__(self, shard_count: int = SHARD_COUNT):
+        """
+        Initialize the tracker.
+
+        Args:
+            shard_count: Number of shards
+        """
+        self.shard_count = shard_count
+        self.dirty: Set[str] = set()
+        self.migrate_legacy = False
+        self.members: Dict[str, Set[int]] = {}
+        self._indexed: Optional[weakref.ref] = None
+
+    def notify(self, operation: str, entry: Any) -> None:
+        """
+        Mark the shard of a mutated entry dirty. Usable as a DictionaryDB listener.
+
+        Args:
+            operation: Name of the operation
+            entry: Entry affected by the operation
+        """
+        self.dirty.add(shard_filename(entry.id, self.shard_count))
+
+    def track(self, operation: str, entry: Any) -> None:
+        """
+        Keep shard membership up to date. Usable as a DictionaryDB listener,
+        in every worker.
+
+        Args:
+            operation: Name of the operation
+            entry: Entry affected by the operation
+        """
+        if self._indexed is None:
+            return
+        if operation == "create":
+            self.members.setdefault(shard_filename(entry.id, self.shard_count), set()).add(entry.seq)
+        elif operation == "delete":
+            self.members.get(shard_filename(entry.id, self.shard_count), set()).discard(entry.seq)
+
+    def _index(self, dictionary: Dictionary) -> None:
+        """
+        Rebuild shard membership from every entry of a dictionary.
+        """
+        store = dictionary.store
+        members = [set() for _ in range(self.shard_count)]
+        for slot in store.slots():
+            members[zlib.crc32(store.id_at(slot).encode("utf-8")) % self.shard_count].add(store.seqs[slot])
+        self.members = {f"{SHARD_FILENAME_PREFIX}{shard:02x}.json": seqs for shard, seqs in enumerate(members)}
+        self._indexed = weakref.ref(dictionary)
+
+    def entries(self, dictionary: Dictionary, file_names: Iterable[str]) -> Dict[str, List[EntryView]]:
+        """
+        Get the entries of some shards, indexing the dictionary first if it
+        was loaded since the last call.
+
+        Args:
+            dictionary: Current dictionary of the database
+            file_names: Shards to collect
+
+        Returns:
+            Mapping of shard file name to its entries in insertion order
+        """
+        if self._indexed is None or self._indexed() is not dictionary:
+            self._index(dictionary)
+        store = dictionary.store
+        return {
+            file_name: list(store.views(store.slots_of(sorted(self.members.get(file_name, ())))))
+            for file_name in file_names
+        }
+
+    def mark_legacy(self) -> None:
+        """
+        Schedule migration of a single-file gist: every shard is written and
+        the legacy file removed on the next upload.
+        """
+        self.migrate_legacy = True
+        self.dirty |= all_shard_filenames(self.shard_count)
+
+    def take(self) -> Tuple[Set[str], bool]:
+        """
+        Take the pending dirty shards, leaving the tracker clean.
+
+        Returns:
+            Tuple of (dirty shard names, whether the legacy file must be removed)
+        """
+        dirty, migrate_legacy = self.dirty, self.migrate_legacy
+        self.dirty, self.migrate_legacy = set(), False
+        return dirty, migrate_legacy
+
+    def restore(self, dirty: Set[str], migrate_legacy: bool) -> None:
+        """
+        Put back shards taken for an upload that failed.
+
+        Args:
+            dirty: Shard names returned by take()
+            migrate_legacy: Legacy flag returned by take()
+        """
+        self.dirty |= dirty
+        self.migrate_legacy = self.migrate_legacy or migrate_legacy
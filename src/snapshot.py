@@ -0,0 +1,95 @@
+"""
+Local binary snapshot of the dictionary for fast startup.
+
+This module stores the wordbank under ROOT_PATH with marshal, which loads a
+million entries far faster than JSON, so the database can be warmed at boot
+before the gist is reached.
+"""
+import marshal
+import os
+import time
+from typing import Iterable, Optional, Tuple
+
+from const import GIST_CACHE_FOLDER, ROOT_PATH, SNAPSHOT_FILENAME
+from dictionary import Dictionary, Entry
+from dict_manipulation import parse_dictionary
+from log import logger
+
+# Bumped whenever the layout of the snapshot changes
+SNAPSHOT_FORMAT = 1
+
+
+def get_snapshot_path() -> str:
+    """
+    Get the path of the local snapshot file.
+
+    Returns:
+        Absolute path to the snapshot
+    """
+    return os.path.join(ROOT_PATH, GIST_CACHE_FOLDER, SNAPSHOT_FILENAME)
+
+
+def save_snapshot(entries: Iterable[Entry], gist_id: str, version: Optional[str]) -> bool:
+    """
+    Write the entries to the snapshot file atomically.
+
+    Args:
+        entries: Entries of the dictionary
+        gist_id: ID of the gist the dictionary belongs to
+        version: Gist ETag the entries were last synchronized with
+
+    Returns:
+        True if successful, False otherwise
+    """
+    path = get_snapshot_path()
+    data = {
+        "format": SNAPSHOT_FORMAT,
+        "gist_id": gist_id,
+        "version": version,
+        "saved_at": time.time(),
+        "wordbank": [
+            {"id": entry.id, "word": entry.word, "tags": list(entry.tags or [])}
+            for entry in entries
+        ],
+    }
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(f"{path}.tmp", "wb") as f:
+            marshal.dump(data, f)
+        os.replace(f"{path}.tmp", path)
+        logger.debug(f"Saved snapshot with {len(data['wordbank'])} entries")
+        return True
+    except Exception as e:
+        logger.error(f"Error writing snapshot {path}: {e}")
+        return False
+
+
+def load_snapshot(gist_id: str) -> Optional[Tuple[Dictionary, Optional[str]]]:
+    """
+    Load the snapshot file if it belongs to the given gist.
+
+    Args:
+        gist_id: ID of the configured gist
+
+    Returns:
+        Tuple of (dictionary, gist ETag it was synchronized with), or None
+        if there is no usable snapshot
+    """
+    path = get_snapshot_path()
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path, "rb") as f:
+            data = marshal.load(f)
+    except Exception as e:
+        logger.error(f"Error reading snapshot {path}: {e}")
+        return None
+    if not isinstance(data, dict) or data.get("format") != SNAPSHOT_FORMAT:
+        logger.warning(f"Ignoring snapshot with unknown format: {path}")
+        return None
+    if data.get("gist_id") != gist_id:
+        logger.warning("Ignoring snapshot of a different gist")
+        return None
+    # The snapshot was written from validated entries
+    dictionary = parse_dictionary(data, trusted=True)
+    return dictionary, data.get("version")
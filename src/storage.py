@@ -1,10 +1,41 @@
 """
 Storage initialization and management for the gist-dictionary application.
+
+Besides the directory layout, this module provides the local storage
+backends behind DictionaryDB. The gist remains the shared copy of the
+dictionary and is mirrored asynchronously by the syncer; a backend only
+decides how the dictionary survives a restart:
+
+- GistBackend keeps the gist as the store of record and writes a binary
+  snapshot of the database now and then for fast startup.
+- SQLiteBackend writes every mutation to an indexed SQLite database in
+  WAL mode, so large dictionaries persist row by row. It is also the state
+  shared by the workers in multi-worker mode, see cluster.py.
 """
+import asyncio
+import json
 import os
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
 
-from const import ROOT_FOLDERS, ROOT_PATH, ROOT_PROFILES
+from const import (
+    ROOT_FOLDERS,
+    ROOT_PATH,
+    ROOT_PROFILES,
+    SNAPSHOT_MIN_INTERVAL,
+    SQLITE_BUSY_TIMEOUT,
+    SQLITE_FILENAME,
+    STORAGE_BACKEND,
+    STORAGE_FOLDER,
+)
+from dictionary import Dictionary, Entry
+from dict_manipulation import parse_dictionary
 from log import logger
+from snapshot import load_snapshot, save_snapshot
 from utils import write_json_file
 
 
@@ -34,3 +65,420 @@ def init_root_path() -> None:
             }
             write_json_file(profile_path, default_config)
             logger.info(f"Created default configuration file: {profile_path}")
+
+
+class StorageBackend(ABC):
+    """
+    Local persistence of the dictionary database across restarts.
+    """
+    name = "base"
+
+    @abstractmethod
+    def load(self, gist_id: str) -> Optional[Tuple[Dictionary, Optional[str]]]:
+        """
+        Load the stored dictionary of a gist.
+
+        Args:
+            gist_id: ID of the configured gist
+
+        Returns:
+            Tuple of (dictionary, gist ETag it was synchronized with), or None
+            if nothing usable is stored
+        """
+
+    def record(self, operation: str, entry: Entry) -> None:
+        """
+        Persist a single mutation. Usable as a DictionaryDB listener.
+
+        Args:
+            operation: Name of the operation
+            entry: Entry affected by the operation
+        """
+
+    @abstractmethod
+    async def reset(self, db, gist_id: str) -> None:
+        """
+        Replace the stored dictionary after the database was reloaded from the gist.
+
+        Args:
+            db: DictionaryDB holding the new state
+            gist_id: ID of the configured gist
+        """
+
+    @abstractmethod
+    async def checkpoint(self, db, gist_id: str, force: bool = False) -> None:
+        """
+        Record that the database was synchronized with the gist version in db.version.
+
+        Args:
+            db: DictionaryDB that was synchronized
+            gist_id: ID of the configured gist
+            force: Persist now even if the backend would normally defer it
+        """
+
+    def close(self) -> None:
+        """
+        Release the resources of the backend.
+        """
+
+
+class GistBackend(StorageBackend):
+    """
+    The gist is the store of record; a local snapshot speeds up startup.
+    """
+    name = "gist"
+
+    def __init__(self, min_interval: float = SNAPSHOT_MIN_INTERVAL):
+        """
+        Initialize the backend.
+
+        Args:
+            min_interval: Minimum number of seconds between two snapshots
+        """
+        self.min_interval = min_interval
+        self.last_saved_at = float("-inf")
+
+    def load(self, gist_id: str) -> Optional[Tuple[Dictionary, Optional[str]]]:
+        return load_snapshot(gist_id)
+
+    async def _save(self, db, gist_id: str) -> None:
+        """
+        Write a snapshot of the database.
+        """
+        self.last_saved_at = time.monotonic()
+        # Take the entries on the event loop, serialize them in a thread
+        entries = list(db.get_dictionary().entries())
+        await asyncio.to_thread(save_snapshot, entries, gist_id, db.version)
+
+    async def reset(self, db, gist_id: str) -> None:
+        await self.checkpoint(db, gist_id)
+
+    async def checkpoint(self, db, gist_id: str, force: bool = False) -> None:
+        # The journal covers the changes made since the last snapshot
+        if force or time.monotonic() - self.last_saved_at >= self.min_interval:
+            await self._save(db, gist_id)
+
+
+class SQLiteBackend(StorageBackend):
+    """
+    Dictionary stored row by row in a local SQLite database.
+
+    Entries keep their insertion order through the rowid and are indexed by
+    ID only: queries are served by the prefix and tag indexes of the
+    in-memory database, so further SQLite indexes would only slow writes.
+
+    Mutations are written in order by a dedicated thread with its own
+    connection, so neither a large replacement nor another process holding
+    the WAL write lock for up to busy_timeout stalls the event loop.
+
+    With track_changes, every mutation is also appended to a changes table
+    that other processes sharing the file read to follow along, and a full
+    replacement bumps a generation number telling them to reload.
+    """
+    name = "sqlite"
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS entries (
+            seq INTEGER PRIMARY KEY AUTOINCREMENT,
+            id TEXT NOT NULL UNIQUE,
+            word TEXT NOT NULL,
+            tags TEXT NOT NULL
+        );
+        DROP INDEX IF EXISTS entries_word;
+        DROP TABLE IF EXISTS entry_tags;
+        CREATE TABLE IF NOT EXISTS meta (
+            key TEXT PRIMARY KEY,
+            value TEXT
+        );
+        CREATE TABLE IF NOT EXISTS changes (
+            seq INTEGER PRIMARY KEY AUTOINCREMENT,
+            origin INTEGER NOT NULL,
+            op TEXT NOT NULL,
+            id TEXT NOT NULL,
+            word TEXT NOT NULL,
+            tags TEXT NOT NULL
+        );
+    """
+
+    def __init__(self, path: Optional[str] = None, track_changes: bool = False):
+        """
+        Open or create the database.
+
+        Args:
+            path: Path of the database file, defaults to ROOT_PATH/data
+            track_changes: Record every mutation in the changes table
+        """
+        self.path = path or os.path.join(ROOT_PATH, STORAGE_FOLDER, SQLITE_FILENAME)
+        self.track_changes = track_changes
+        # Set while applying changes made by another process, which are already stored
+        self.replaying = False
+        self.origin = os.getpid()
+        # Position in the changes table and generation of the last load()
+        self.loaded_change = 0
+        self.loaded_generation = 0
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        # Guards the reading connection, used from the event loop and worker threads
+        self._lock = threading.Lock()
+        self.connection = self._connect()
+        self.connection.executescript(self.SCHEMA)
+        # Mutations, replacements and checkpoints run on this single thread,
+        # in the order they were submitted, on their own connection
+        self._writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="sqlite-writer")
+        self._write_connection = self._connect()
+
+    def _connect(self) -> sqlite3.Connection:
+        connection = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        connection.execute(f"PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT}")
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute("PRAGMA synchronous=NORMAL")
+        connection.execute("PRAGMA foreign_keys=ON")
+        return connection
+
+    def _get_meta(self, key: str, connection: Optional[sqlite3.Connection] = None) -> Optional[str]:
+        connection = connection or self.connection
+        row = connection.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def _set_meta(self, key: str, value: Optional[str], connection: Optional[sqlite3.Connection] = None) -> None:
+        (connection or self.connection).execute(
+            "INSERT INTO meta (key, value) VALUES (?, ?) "
+            "ON CONFLICT (key) DO UPDATE SET value = excluded.value",
+            (key, value),
+        )
+
+    def load(self, gist_id: str) -> Optional[Tuple[Dictionary, Optional[str]]]:
+        with self._lock:
+            # Read everything from one snapshot of the database
+            self.connection.execute("BEGIN")
+            try:
+                stored_gist_id = self._get_meta("gist_id")
+                if stored_gist_id != gist_id:
+                    if stored_gist_id is not None:
+                        logger.warning("Ignoring SQLite storage of a different gist")
+                    return None
+                rows = self.connection.execute("SELECT id, word, tags FROM entries ORDER BY seq").fetchall()
+                version = self._get_meta("version")
+                self.loaded_change = self._last_change()
+                self.loaded_generation = int(self._get_meta("generation") or 0)
+            finally:
+                self.connection.execute("COMMIT")
+        wordbank = [{"id": row[0], "word": row[1], "tags": json.loads(row[2])} for row in rows]
+        # Rows are only ever written from validated entries
+        return parse_dictionary({"wordbank": wordbank}, trusted=True), version
+
+    def _insert(self, entry_id: str, word: str, tags: List[str]) -> None:
+        connection = self._write_connection
+        connection.execute(
+            "INSERT INTO entries (id, word, tags) VALUES (?, ?, ?) "
+            "ON CONFLICT (id) DO UPDATE SET word = excluded.word, tags = excluded.tags",
+            (entry_id, word, json.dumps(tags, ensure_ascii=False)),
+        )
+
+    def _write(self, operation: str, entry_id: str, word: str, tags: List[str]) -> None:
+        """
+        Write one mutation in its own transaction. Runs on the writer thread.
+        """
+        connection = self._write_connection
+        try:
+            connection.execute("BEGIN IMMEDIATE")
+            if operation in ("create", "update_tags"):
+                self._insert(entry_id, word, tags)
+            elif operation == "delete":
+                connection.execute("DELETE FROM entries WHERE id = ?", (entry_id,))
+            if self.track_changes:
+                connection.execute(
+                    "INSERT INTO changes (origin, op, id, word, tags) VALUES (?, ?, ?, ?, ?)",
+                    (self.origin, operation, entry_id, word, json.dumps(tags, ensure_ascii=False)),
+                )
+            connection.execute("COMMIT")
+        except sqlite3.Error as e:
+            if connection.in_transaction:
+                connection.execute("ROLLBACK")
+            logger.error(f"Error writing {operation} of {entry_id} to SQLite: {e}")
+
+    def record(self, operation: str, entry: Entry) -> None:
+        if self.replaying:
+            return
+        # Copied now, since entry views read the live store which moves on
+        self._writer.submit(self._write, operation, entry.id, entry.word, list(entry.tags or []))
+
+    def _replace(self, rows: List[Tuple[str, str, List[str]]], gist_id: str, version: Optional[str]) -> None:
+        """
+        Replace every row in one transaction. Runs on the writer thread.
+        """
+        connection = self._write_connection
+        # A gist may repeat an ID; like Dictionary.get_entry, keep the first
+        unique: Dict[str, Tuple[str, str, List[str]]] = {}
+        for row in rows:
+            unique.setdefault(row[0], row)
+        rows = list(unique.values())
+        try:
+            connection.execute("BEGIN IMMEDIATE")
+            connection.execute("DELETE FROM entries")
+            connection.executemany(
+                "INSERT INTO entries (id, word, tags) VALUES (?, ?, ?)",
+                [(entry_id, word, json.dumps(tags, ensure_ascii=False)) for entry_id, word, tags in rows],
+            )
+            self._set_meta("gist_id", gist_id, connection)
+            self._set_meta("version", version, connection)
+            self._set_meta("generation", str(int(self._get_meta("generation", connection) or 0) + 1), connection)
+            connection.execute("COMMIT")
+            logger.debug(f"Stored {len(rows)} entries in SQLite")
+        except sqlite3.Error as e:
+            if connection.in_transaction:
+                connection.execute("ROLLBACK")
+            logger.error(f"Error replacing SQLite storage: {e}")
+
+    async def reset(self, db, gist_id: str) -> None:
+        # The rows are taken from the database now; mutations recorded later
+        # are queued behind the replacement and land on top of it
+        rows = [(entry.id, entry.word, list(entry.tags or [])) for entry in db.get_dictionary().entries()]
+        await asyncio.wrap_future(self._writer.submit(self._replace, rows, gist_id, db.version))
+
+    def _checkpoint(self, gist_id: str, version: Optional[str]) -> None:
+        connection = self._write_connection
+        try:
+            if self._get_meta("gist_id", connection) == gist_id:
+                self._set_meta("version", version, connection)
+        except sqlite3.Error as e:
+            logger.error(f"Error recording SQLite checkpoint: {e}")
+
+    async def checkpoint(self, db, gist_id: str, force: bool = False) -> None:
+        # Rows are already written one by one; only the version moves on
+        await asyncio.wrap_future(self._writer.submit(self._checkpoint, gist_id, db.version))
+
+    def _last_change(self) -> int:
+        row = self.connection.execute("SELECT MAX(seq) FROM changes").fetchone()
+        return row[0] or 0
+
+    def data_version(self) -> int:
+        """
+        Get a number that changes whenever another connection commits.
+
+        Returns:
+            Value of PRAGMA data_version
+        """
+        with self._lock:
+            return self.connection.execute("PRAGMA data_version").fetchone()[0]
+
+    def generation(self) -> int:
+        """
+        Get the number of full replacements of the stored dictionary.
+
+        Returns:
+            Generation number
+        """
+        with self._lock:
+            return int(self._get_meta("generation") or 0)
+
+    def stored_version(self) -> Optional[str]:
+        """
+        Get the gist ETag the stored dictionary was last synchronized with.
+
+        Returns:
+            Gist ETag, or None if unknown
+        """
+        with self._lock:
+            return self._get_meta("version")
+
+    def first_change(self) -> Optional[int]:
+        """
+        Get the sequence number of the oldest change still in the changes table.
+
+        Returns:
+            Sequence number, or None if the table is empty
+        """
+        with self._lock:
+            return self.connection.execute("SELECT MIN(seq) FROM changes").fetchone()[0]
+
+    def changes_since(self, seq: int, limit: int = 10000) -> List[Dict[str, Any]]:
+        """
+        Get the changes recorded after a sequence number.
+
+        Args:
+            seq: Sequence number of the last change already seen
+            limit: Maximum number of changes to return
+
+        Returns:
+            List of change records with "seq", "origin", "op", "id", "word" and "tags" keys
+        """
+        with self._lock:
+            rows = self.connection.execute(
+                "SELECT seq, origin, op, id, word, tags FROM changes WHERE seq > ? ORDER BY seq LIMIT ?",
+                (seq, limit),
+            ).fetchall()
+        return [
+            {"seq": row[0], "origin": row[1], "op": row[2], "id": row[3], "word": row[4], "tags": json.loads(row[5])}
+            for row in rows
+        ]
+
+    def get_writer_seq(self) -> int:
+        """
+        Get the last change journaled by the process writing the gist.
+
+        Returns:
+            Sequence number
+        """
+        with self._lock:
+            return int(self._get_meta("writer_seq") or 0)
+
+    def _set_writer_seq(self, seq: int, keep: int) -> None:
+        """
+        Record the writer position in one transaction. Runs on the writer thread.
+        """
+        connection = self._write_connection
+        try:
+            connection.execute("BEGIN IMMEDIATE")
+            self._set_meta("writer_seq", str(seq), connection)
+            connection.execute("DELETE FROM changes WHERE seq <= ?", (seq - keep,))
+            connection.execute("COMMIT")
+        except sqlite3.Error:
+            if connection.in_transaction:
+                connection.execute("ROLLBACK")
+            raise
+
+    async def set_writer_seq(self, seq: int, keep: int) -> None:
+        """
+        Record the last change journaled by the process writing the gist and
+        drop older changes.
+
+        Args:
+            seq: Sequence number
+            keep: Number of journaled changes kept for processes lagging behind
+
+        Raises:
+            sqlite3.Error: If the transaction failed and was rolled back
+        """
+        await asyncio.wrap_future(self._writer.submit(self._set_writer_seq, seq, keep))
+
+    def close(self) -> None:
+        # Let the queued writes finish first
+        self._writer.shutdown(wait=True)
+        self._write_connection.close()
+        with self._lock:
+            self.connection.close()
+
+
+def create_backend(config: Dict[str, Any], shared: bool = False) -> StorageBackend:
+    """
+    Create the storage backend selected by the optional "storage" config section.
+
+    Args:
+        config: Parsed configuration file
+        shared: The storage is shared by several worker processes
+
+    Returns:
+        Storage backend, GistBackend unless "backend" is "sqlite" or the
+        storage is shared
+    """
+    storage_config = config.get("config", {}).get("storage", {})
+    backend = storage_config.get("backend", STORAGE_BACKEND)
+    if shared:
+        if backend != "sqlite":
+            logger.warning("Multi-worker mode shares state through SQLite, using the sqlite storage backend")
+        return SQLiteBackend(storage_config.get("path"), track_changes=True)
+    if backend == "sqlite":
+        return SQLiteBackend(storage_config.get("path"))
+    if backend != "gist":
+        logger.warning(f"Unknown storage backend {backend}, using gist")
+    return GistBackend()
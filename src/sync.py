@@ -0,0 +1,199 @@
+"""
+Write-behind synchronization of the in-memory dictionary to GitHub Gist.
+
+This module coalesces dictionary mutations into one gist update per window
+instead of uploading the whole wordbank after every single change.
+"""
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Awaitable, Callable, Optional
+
+from const import SYNC_DEBOUNCE, SYNC_MAX_BATCH, SYNC_MAX_DELAY
+from log import logger
+
+
+class GistSyncer:
+    """
+    Background task that debounces mutations and pushes them in batches.
+
+    A push happens when no mutation arrived for `debounce` seconds, when the
+    oldest pending mutation is `max_delay` seconds old, or when `max_batch`
+    mutations are pending, whichever comes first.
+
+    Nothing is pushed before mark_ready() is called, so that mutations made
+    while the dictionary is still loading cannot upload a partial wordbank.
+    """
+    def __init__(
+        self,
+        push: Callable[[Optional[float]], Awaitable[bool]],
+        debounce: float = SYNC_DEBOUNCE,
+        max_delay: float = SYNC_MAX_DELAY,
+        max_batch: int = SYNC_MAX_BATCH,
+    ):
+        """
+        Initialize the syncer.
+
+        Args:
+            push: Coroutine function uploading the current state within an
+                optional max_wait in seconds, returning True on success
+            debounce: Quiet period in seconds before pending mutations are pushed
+            max_delay: Maximum age in seconds of a pending mutation
+            max_batch: Number of pending mutations that triggers an immediate push
+        """
+        self.push = push
+        self.debounce = debounce
+        self.max_delay = max_delay
+        self.max_batch = max_batch
+        self.pending = 0
+        self.paused = 0
+        self.first_pending_at: Optional[float] = None
+        self.last_pending_at: Optional[float] = None
+        self.ready = asyncio.Event()
+        self._wakeup = asyncio.Event()
+        self._lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+
+    def notify(self, operation: str, entry: Any = None) -> None:
+        """
+        Record a mutation to be pushed. Usable as a DictionaryDB listener.
+
+        Args:
+            operation: Name of the operation
+            entry: Entry affected by the operation
+        """
+        now = time.monotonic()
+        if self.pending == 0:
+            self.first_pending_at = now
+        self.last_pending_at = now
+        self.pending += 1
+        self._wakeup.set()
+
+    def _due_in(self) -> float:
+        """
+        Get the number of seconds until pending mutations must be pushed.
+
+        Returns:
+            Seconds to wait, 0 if a push is due now
+        """
+        if self.pending >= self.max_batch:
+            return 0.0
+        now = time.monotonic()
+        quiet_deadline = self.last_pending_at + self.debounce
+        hard_deadline = self.first_pending_at + self.max_delay
+        return max(0.0, min(quiet_deadline, hard_deadline) - now)
+
+    async def flush(self, max_wait: Optional[float] = None) -> bool:
+        """
+        Push all pending mutations now.
+
+        Args:
+            max_wait: Longest wait in seconds for the rate limit, unbounded if None
+
+        Returns:
+            True if there was nothing to push or the push succeeded, False otherwise
+        """
+        async with self._lock:
+            if self.pending == 0:
+                return True
+            if not self.ready.is_set():
+                logger.warning(f"Dictionary not loaded yet, keeping {self.pending} change(s) pending")
+                return False
+            batch = self.pending
+            first_pending_at = self.first_pending_at
+            self.pending = 0
+            self.first_pending_at = None
+            try:
+                success = await self.push(max_wait)
+            except Exception as e:
+                logger.error(f"Error pushing pending changes: {e}")
+                success = False
+            if success:
+                logger.info(f"Synchronized {batch} pending change(s) to gist")
+            else:
+                # Keep the mutations pending so the next window retries them
+                self.pending += batch
+                self.first_pending_at = first_pending_at
+                self.last_pending_at = time.monotonic()
+                logger.warning(f"Failed to synchronize {batch} change(s), will retry")
+            return success
+
+    async def _run(self) -> None:
+        """
+        Main loop of the background task.
+        """
+        await self.ready.wait()
+        while True:
+            await self._wakeup.wait()
+            self._wakeup.clear()
+            while self.pending and not self.paused:
+                delay = self._due_in()
+                if delay > 0:
+                    try:
+                        # New mutations wake us up to recompute the deadline
+                        await asyncio.wait_for(self._wakeup.wait(), timeout=delay)
+                        self._wakeup.clear()
+                        continue
+                    except asyncio.TimeoutError:
+                        if self.paused:
+                            break
+                if not await self.flush():
+                    # Back off for a full window before retrying a failed push
+                    await asyncio.sleep(self.max_delay)
+
+    @asynccontextmanager
+    async def hold(self) -> AsyncIterator[None]:
+        """
+        Suspend automatic pushes, e.g. while a bulk operation is applied.
+
+        Pending mutations are pushed by the next window after the last hold
+        is released; an explicit flush() still pushes immediately.
+        """
+        self.paused += 1
+        try:
+            yield
+        finally:
+            self.paused -= 1
+            self._wakeup.set()
+
+    def mark_ready(self) -> None:
+        """
+        Allow pushes once the dictionary reflects the gist.
+        """
+        self.ready.set()
+        self._wakeup.set()
+
+    def start(self) -> None:
+        """
+        Start the background task on the running event loop.
+        """
+        if self._task is None:
+            # Asyncio primitives are bound to the loop they are first used
+            # on, and the app may be started again on a new one
+            ready, self.ready = self.ready, asyncio.Event()
+            if ready.is_set():
+                self.ready.set()
+            self._wakeup = asyncio.Event()
+            if self.pending:
+                self._wakeup.set()
+            self._lock = asyncio.Lock()
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self, max_wait: Optional[float] = None) -> bool:
+        """
+        Stop the background task and flush pending mutations.
+
+        Args:
+            max_wait: Longest wait in seconds for the rate limit, unbounded if None
+
+        Returns:
+            True if the final flush succeeded, False otherwise
+        """
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        return await self.flush(max_wait)
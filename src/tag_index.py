@@ -0,0 +1,273 @@
+"""
+Inverted tag index with boolean tag queries.
+
+Each tag maps to a Python int used as a bitset, bit n being set when the
+entry with insertion sequence number n has the tag. A query such as
+`ja AND n2 AND NOT mastered` is then evaluated with a few bitwise
+operations over these ints, and its matches are counted and paged without
+looking at the entries themselves.
+
+Query syntax: tags combined with AND, OR and NOT (upper case) and
+parentheses. NOT binds tighter than AND, which binds tighter than OR, and
+tags written next to each other are ANDed. Tags containing spaces,
+parentheses or quotes are written in double quotes with \\" and \\\\ escapes.
+"""
+import re
+from typing import Dict, Iterable, List, Optional, Tuple, Union
+
+OPERATORS = ("AND", "OR", "NOT")
+
+# Parsed query: a tag name, or a tuple of an operator and its operands
+Query = Union[str, Tuple]
+
+_TOKEN = re.compile(r'\s*(?:(\()|(\))|"((?:[^"\\]|\\.)*)"|([^\s()"]+))')
+
+
+def _tokenize(query: str) -> List[Tuple[str, str]]:
+    """
+    Split a query into (kind, value) tokens.
+
+    Raises:
+        ValueError: If the query contains an unterminated quote
+    """
+    tokens = []
+    position = 0
+    query = query.rstrip()
+    while position < len(query):
+        match = _TOKEN.match(query, position)
+        if match is None:
+            raise ValueError(f"Unterminated quote in tag query at position {position}")
+        opening, closing, quoted, word = match.groups()
+        if opening:
+            tokens.append(("(", opening))
+        elif closing:
+            tokens.append((")", closing))
+        elif quoted is not None:
+            tokens.append(("tag", re.sub(r"\\(.)", r"\1", quoted)))
+        elif word in OPERATORS:
+            tokens.append((word, word))
+        else:
+            tokens.append(("tag", word))
+        position = match.end()
+    return tokens
+
+
+class _Parser:
+    """
+    Recursive descent parser over the tokens of a query.
+    """
+    def __init__(self, tokens: List[Tuple[str, str]]):
+        self.tokens = tokens
+        self.position = 0
+
+    def peek(self) -> Optional[str]:
+        return self.tokens[self.position][0] if self.position < len(self.tokens) else None
+
+    def take(self) -> Tuple[str, str]:
+        token = self.tokens[self.position]
+        self.position += 1
+        return token
+
+    def parse_or(self) -> Query:
+        node = self.parse_and()
+        while self.peek() == "OR":
+            self.take()
+            node = ("OR", node, self.parse_and())
+        return node
+
+    def parse_and(self) -> Query:
+        node = self.parse_not()
+        while self.peek() in ("AND", "NOT", "tag", "("):
+            if self.peek() == "AND":
+                self.take()
+            node = ("AND", node, self.parse_not())
+        return node
+
+    def parse_not(self) -> Query:
+        if self.peek() == "NOT":
+            self.take()
+            return ("NOT", self.parse_not())
+        return self.parse_operand()
+
+    def parse_operand(self) -> Query:
+        kind = self.peek()
+        if kind == "tag":
+            return self.take()[1]
+        if kind == "(":
+            self.take()
+            node = self.parse_or()
+            if self.peek() != ")":
+                raise ValueError("Missing closing parenthesis in tag query")
+            self.take()
+            return node
+        raise ValueError(f"Expected a tag in tag query, got {kind or 'end of query'}")
+
+
+def parse_tag_query(query: str) -> Query:
+    """
+    Parse a boolean tag query.
+
+    Args:
+        query: Query such as `ja AND (n2 OR n3) AND NOT mastered`
+
+    Returns:
+        Parsed query
+
+    Raises:
+        ValueError: If the query is empty or malformed
+    """
+    tokens = _tokenize(query)
+    if not tokens:
+        raise ValueError("Empty tag query")
+    parser = _Parser(tokens)
+    node = parser.parse_or()
+    if parser.peek() is not None:
+        raise ValueError(f"Unexpected {parser.take()[1]!r} in tag query")
+    return node
+
+
+class TagIndex:
+    """
+    Tag to bitset index over entry sequence numbers.
+    """
+    def __init__(self):
+        """
+        Initialize an empty index.
+        """
+        self.bitsets: Dict[str, int] = {}
+        # Bitset of all live entries, the universe NOT is taken against
+        self.all = 0
+
+    @classmethod
+    def from_store(cls, store) -> "TagIndex":
+        """
+        Build an index from an EntryStore in one pass.
+
+        Bits are set in bytearrays and converted to ints once, since growing
+        an int bit by bit would copy it for every entry.
+
+        Args:
+            store: EntryStore of the dictionary
+
+        Returns:
+            New TagIndex
+        """
+        index = cls()
+        size = (store.next_seq + 7) // 8
+        tag_bytes = [bytearray(size) for _ in store.tag_names]
+        all_bytes = bytearray(size)
+        seqs = store.seqs
+        for slot in store.slots():
+            seq = seqs[slot]
+            offset, bit = seq >> 3, 1 << (seq & 7)
+            all_bytes[offset] |= bit
+            for tag_id in store.tag_ids_at(slot):
+                tag_bytes[tag_id][offset] |= bit
+        index.all = int.from_bytes(all_bytes, "little")
+        for name, data in zip(store.tag_names, tag_bytes):
+            bits = int.from_bytes(data, "little")
+            if bits:
+                index.bitsets[name] = bits
+        return index
+
+    def add(self, seq: int, tags: Iterable[str]) -> None:
+        """
+        Add an entry to the index.
+
+        Args:
+            seq: Sequence number of the entry
+            tags: Tags of the entry
+        """
+        bit = 1 << seq
+        self.all |= bit
+        for tag in set(tags):
+            self.bitsets[tag] = self.bitsets.get(tag, 0) | bit
+
+    def remove(self, seq: int, tags: Iterable[str]) -> None:
+        """
+        Remove an entry from the index.
+
+        Args:
+            seq: Sequence number of the entry
+            tags: Tags of the entry
+        """
+        self.all &= ~(1 << seq)
+        self._clear(seq, set(tags))
+
+    def update(self, seq: int, old_tags: Iterable[str], new_tags: Iterable[str]) -> None:
+        """
+        Move an entry from its old tags to its new tags.
+
+        Args:
+            seq: Sequence number of the entry
+            old_tags: Tags before the update
+            new_tags: Tags after the update
+        """
+        old_tags, new_tags = set(old_tags), set(new_tags)
+        self._clear(seq, old_tags - new_tags)
+        bit = 1 << seq
+        for tag in new_tags - old_tags:
+            self.bitsets[tag] = self.bitsets.get(tag, 0) | bit
+
+    def _clear(self, seq: int, tags: Iterable[str]) -> None:
+        mask = ~(1 << seq)
+        for tag in tags:
+            bits = self.bitsets.get(tag, 0) & mask
+            if bits:
+                self.bitsets[tag] = bits
+            else:
+                self.bitsets.pop(tag, None)
+
+    def evaluate(self, query: Query) -> int:
+        """
+        Get the bitset of the entries matching a parsed query.
+
+        Args:
+            query: Query returned by parse_tag_query
+
+        Returns:
+            Bitset of the sequence numbers of the matching entries
+        """
+        if isinstance(query, str):
+            return self.bitsets.get(query, 0)
+        operator = query[0]
+        if operator == "NOT":
+            return self.all & ~self.evaluate(query[1])
+        left, right = self.evaluate(query[1]), self.evaluate(query[2])
+        if operator == "AND":
+            return left & right
+        return left | right
+
+
+def count_bits(bits: int) -> int:
+    """
+    Get the number of set bits of a bitset.
+    """
+    return bin(bits).count("1")
+
+
+def iter_bits(bits: int, after: Optional[int] = None, limit: Optional[int] = None) -> List[int]:
+    """
+    Get the positions of the set bits of a bitset in ascending order.
+
+    Args:
+        bits: Bitset
+        after: Only positions greater than this one
+        limit: Maximum number of positions to return
+
+    Returns:
+        Sequence numbers of the set bits
+    """
+    start = after + 1 if after is not None else 0
+    rest = bits >> start
+    if not rest:
+        return []
+    # Scanning the binary digits with str.find runs in C, unlike shifting
+    # the int once per match
+    digits = bin(rest)[:1:-1]
+    positions: List[int] = []
+    position = digits.find("1")
+    while position != -1 and (limit is None or len(positions) < limit):
+        positions.append(start + position)
+        position = digits.find("1", position + 1)
+    return positions
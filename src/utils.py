@@ -3,11 +3,19 @@ Common utility functions and shared code for the gist-dictionary application.
 """
 import json
 import os
+import threading
+import time
 from typing import Dict, Any, Optional
 
-from const import CONFIG_FILENAME, ROOT_PATH
+from const import CONFIG_FILENAME, CONFIG_RECHECK_INTERVAL, GITHUB_API_URL, ROOT_PATH
 from log import logger
 
+# Parsed configuration, reloaded only when the file's mtime changes
+_config_cache: Dict[str, Any] = {"data": None, "mtime": None, "checked_at": 0.0}
+
+# GitHub token resolved from the cached configuration
+_token_cache: Dict[str, Any] = {"config": None, "token": None}
+
 def read_json_file(file_path: str) -> Dict[str, Any]:
     """
     Read and parse a JSON file.
@@ -25,7 +33,7 @@ def read_json_file(file_path: str) -> Dict[str, Any]:
         logger.error(f"Error reading JSON file {file_path}: {e}")
         return {}
 
-def write_json_file(file_path: str, data: Dict[str, Any], indent: int = 2) -> bool:
+def write_json_file(file_path: str, data: Dict[str, Any], indent: int = 2, atomic: bool = False) -> bool:
     """
     Write data to a JSON file.
     
@@ -33,12 +41,17 @@ def write_json_file(file_path: str, data: Dict[str, Any], indent: int = 2) -> bo
         file_path: Path to the JSON file
         data: Dictionary to be written as JSON
         indent: Indentation level for the JSON file
+        atomic: Write to a temporary file and rename it over the target, so
+            readers never see a partially written file
         
     Returns:
         True if successful, False otherwise
     """
+    # The temporary name is unique per process and thread so concurrent
+    # writers never share it
+    target = f"{file_path}.{os.getpid()}.{threading.get_ident()}.tmp" if atomic else file_path
     try:
-        with open(file_path, "w", encoding="utf-8") as f:
+        with open(target, "w", encoding="utf-8") as f:
             f.write(
                 json.dumps(
                     data,
@@ -47,6 +60,8 @@ def write_json_file(file_path: str, data: Dict[str, Any], indent: int = 2) -> bo
                     sort_keys=False,
                 )
             )
+        if atomic:
+            os.replace(target, file_path)
         return True
     except Exception as e:
         logger.error(f"Error writing JSON file {file_path}: {e}")
@@ -65,15 +80,71 @@ def get_config() -> Dict[str, Any]:
     """
     Get the configuration from the config file.
     
+    The parsed file is cached. Its mtime is checked at most once every
+    CONFIG_RECHECK_INTERVAL seconds, so most calls do not touch the filesystem.
+    
     Returns:
         Dictionary containing the configuration
     """
-    return read_json_file(get_config_path())
+    now = time.monotonic()
+    if _config_cache["data"] is not None and now - _config_cache["checked_at"] < CONFIG_RECHECK_INTERVAL:
+        return _config_cache["data"]
+    
+    config_path = get_config_path()
+    try:
+        mtime = os.stat(config_path).st_mtime_ns
+    except OSError:
+        mtime = None
+    
+    _config_cache["checked_at"] = now
+    if _config_cache["data"] is None or mtime != _config_cache["mtime"]:
+        _config_cache["data"] = read_json_file(config_path)
+        _config_cache["mtime"] = mtime
+    return _config_cache["data"]
+
+def invalidate_config_cache() -> None:
+    """
+    Drop the cached configuration so the next get_config() reads the file.
+    """
+    _config_cache["data"] = None
+    _config_cache["mtime"] = None
+
+def get_github_api_url() -> str:
+    """
+    Get the base URL of the GitHub API.
+    
+    The GITHUB_API_URL environment variable or the "github_api_url" config
+    option point the application at GitHub Enterprise or at a local stand-in
+    such as benchmark/fake_gist.py.
+    
+    Returns:
+        Base URL without a trailing slash
+    """
+    url = os.environ.get("GITHUB_API_URL") or get_config().get("config", {}).get("github_api_url") or GITHUB_API_URL
+    return url.rstrip("/")
 
 def get_github_token() -> Optional[str]:
     """
     Get the GitHub token from environment variables or config file.
     
+    The token is resolved again only when the cached configuration changes.
+    
+    Returns:
+        GitHub token string or None if not found
+    """
+    config = get_config()
+    if config is not _token_cache["config"]:
+        _token_cache["config"] = config
+        _token_cache["token"] = _resolve_github_token(config)
+    return _token_cache["token"]
+
+def _resolve_github_token(config: Dict[str, Any]) -> Optional[str]:
+    """
+    Resolve the GitHub token from environment variables or a configuration.
+    
+    Args:
+        config: Configuration to fall back to
+        
     Returns:
         GitHub token string or None if not found
     """
@@ -87,5 +158,4 @@ def get_github_token() -> Optional[str]:
         return github_token
     
     # Fall back to config file
-    config = get_config()
     return config.get("GH_TOKEN")
\ No newline at end of file
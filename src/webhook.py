@@ -0,0 +1,462 @@
+"""
+Asynchronous delivery of entry change events to webhooks.
+
+DictionaryDB mutations are turned into events and put on a bounded queue per
+endpoint without waiting, so a slow or unreachable receiver never delays a
+request. A background task per endpoint POSTs the events in batches, with a
+limit on the deliveries in flight across endpoints, and retries failed
+deliveries with jittered exponential backoff. Events that cannot be queued
+or delivered are buffered in memory and appended to a dead-letter file
+under ROOT_PATH by a background task, so notifying never touches the disk.
+
+Endpoints are listed in the "webhooks" config option, either as URLs or as
+objects with a "url" and optionally "secret" (to sign the body with
+HMAC-SHA256), "events" (operations to send), "batch_size" and "batch_delay".
+"""
+import asyncio
+import hashlib
+import hmac
+import json
+import os
+import random
+import time
+import uuid
+from typing import Any, Dict, Iterable, List, Optional, Union
+
+import httpx
+
+from const import (
+    ROOT_PATH,
+    WEBHOOK_BACKOFF_BASE,
+    WEBHOOK_BACKOFF_MAX,
+    WEBHOOK_BATCH_DELAY,
+    WEBHOOK_BATCH_SIZE,
+    WEBHOOK_DEAD_LETTER_BUFFER,
+    WEBHOOK_DEAD_LETTER_FILENAME,
+    WEBHOOK_FOLDER,
+    WEBHOOK_MAX_CONCURRENCY,
+    WEBHOOK_MAX_RETRIES,
+    WEBHOOK_QUEUE_SIZE,
+    WEBHOOK_TIMEOUT,
+)
+from log import LogSampler, logger
+
+# Event type sent for each DictionaryDB operation
+EVENT_TYPES = {
+    "create": "entry.created",
+    "update_tags": "entry.updated",
+    "delete": "entry.deleted",
+}
+
+SIGNATURE_HEADER = "X-Gist-Dictionary-Signature"
+
+# Dropped dead letters come in bursts, so only some drops are logged
+dead_letter_drop_sampler = LogSampler()
+
+
+class DeadLetters:
+    """
+    Append-only JSON lines file of undeliverable events.
+    """
+    def __init__(self, path: Optional[str] = None):
+        """
+        Initialize the dead-letter file.
+
+        Args:
+            path: Path of the file
+        """
+        self.path = path or os.path.join(ROOT_PATH, WEBHOOK_FOLDER, WEBHOOK_DEAD_LETTER_FILENAME)
+
+    @staticmethod
+    def record(url: str, event: Dict[str, Any], reason: str) -> Dict[str, Any]:
+        """
+        Build the dead-letter record of an event.
+
+        Args:
+            url: URL of the endpoint
+            event: Undelivered event
+            reason: Why it was given up
+
+        Returns:
+            Record as written to the file
+        """
+        return {"url": url, "reason": reason, "failed_at": time.time(), "event": event}
+
+    def write(self, url: str, events: Iterable[Dict[str, Any]], reason: str) -> None:
+        """
+        Record events that could not be delivered to an endpoint.
+
+        Args:
+            url: URL of the endpoint
+            events: Undelivered events
+            reason: Why they were given up
+        """
+        self.write_records([self.record(url, event, reason) for event in events])
+
+    def write_records(self, records: Iterable[Dict[str, Any]]) -> None:
+        """
+        Append dead-letter records to the file. Blocks on file I/O.
+
+        Args:
+            records: Records built by record()
+        """
+        lines = "".join(json.dumps(record, ensure_ascii=False) + "\n" for record in records)
+        if not lines:
+            return
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(lines)
+        except Exception as e:
+            logger.error(f"Error writing webhook dead letters to {self.path}: {e}")
+
+
+class WebhookEndpoint:
+    """
+    One webhook receiver with its queue of events waiting for delivery.
+    """
+    def __init__(
+        self,
+        url: str,
+        secret: Optional[str] = None,
+        events: Optional[Iterable[str]] = None,
+        batch_size: int = WEBHOOK_BATCH_SIZE,
+        batch_delay: float = WEBHOOK_BATCH_DELAY,
+        queue_size: int = WEBHOOK_QUEUE_SIZE,
+    ):
+        """
+        Initialize the endpoint.
+
+        Args:
+            url: URL the events are POSTed to
+            secret: Key of the HMAC-SHA256 signature of the body, unsigned if omitted
+            events: Operations or event types sent to this endpoint, all of them if omitted
+            batch_size: Maximum number of events per delivery
+            batch_delay: Seconds to wait for more events after the first one of a batch
+            queue_size: Maximum number of events waiting for delivery
+        """
+        self.url = url
+        self.secret = secret
+        if events is None:
+            self.events = set(EVENT_TYPES)
+        else:
+            events = set(events)
+            self.events = {operation for operation, event_type in EVENT_TYPES.items() if {operation, event_type} & events}
+        self.batch_size = batch_size
+        self.batch_delay = batch_delay
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        # Batch being delivered, dead-lettered if the dispatcher stops first
+        self.in_flight: List[Dict[str, Any]] = []
+        self.delivered = 0
+        self.failed = 0
+
+    @classmethod
+    def from_config(cls, option: Union[str, Dict[str, Any]]) -> "WebhookEndpoint":
+        """
+        Create an endpoint from an entry of the "webhooks" config option.
+
+        Args:
+            option: URL, or object with "url" and optional settings
+
+        Returns:
+            New WebhookEndpoint
+
+        Raises:
+            ValueError: If the entry has no URL
+        """
+        if isinstance(option, str):
+            return cls(option)
+        if not isinstance(option, dict) or not option.get("url"):
+            raise ValueError(f"Invalid webhook: {option}")
+        settings = {
+            key: option[key]
+            for key in ("secret", "events", "batch_size", "batch_delay", "queue_size")
+            if key in option
+        }
+        return cls(option["url"], **settings)
+
+    def sign(self, body: bytes) -> Dict[str, str]:
+        """
+        Get the signature header of a body, if the endpoint has a secret.
+        """
+        if not self.secret:
+            return {}
+        digest = hmac.new(self.secret.encode("utf-8"), body, hashlib.sha256).hexdigest()
+        return {SIGNATURE_HEADER: f"sha256={digest}"}
+
+
+class WebhookDispatcher:
+    """
+    Event bus delivering DictionaryDB mutations to webhook endpoints.
+    """
+    def __init__(
+        self,
+        endpoints: Iterable[WebhookEndpoint] = (),
+        max_concurrency: int = WEBHOOK_MAX_CONCURRENCY,
+        timeout: float = WEBHOOK_TIMEOUT,
+        max_retries: int = WEBHOOK_MAX_RETRIES,
+        backoff_base: float = WEBHOOK_BACKOFF_BASE,
+        backoff_max: float = WEBHOOK_BACKOFF_MAX,
+        dead_letters: Optional[DeadLetters] = None,
+        dead_letter_buffer: int = WEBHOOK_DEAD_LETTER_BUFFER,
+    ):
+        """
+        Initialize the dispatcher. The HTTP session is opened on start().
+
+        Args:
+            endpoints: Webhook endpoints
+            max_concurrency: Maximum number of deliveries in flight across endpoints
+            timeout: Timeout in seconds of a delivery
+            max_retries: Number of retries before a batch is dead-lettered
+            backoff_base: Backoff in seconds before the first retry
+            backoff_max: Upper bound in seconds of a single backoff
+            dead_letters: Dead-letter file, the default one under ROOT_PATH if omitted
+            dead_letter_buffer: Maximum number of refused events waiting to be dead-lettered
+        """
+        self.endpoints = list(endpoints)
+        self.max_concurrency = max_concurrency
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.dead_letters = dead_letters or DeadLetters()
+        self.dead_letter_buffer = dead_letter_buffer
+        self.sequence = 0
+        # Dead-letter records waiting to be written, by the flush task only
+        self._overflow: List[Dict[str, Any]] = []
+        self._overflow_event: Optional[asyncio.Event] = None
+        self._dropped = 0
+        self._stopping = False
+        self._flusher: Optional[asyncio.Task] = None
+        self._session: Optional[httpx.AsyncClient] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._tasks: List[asyncio.Task] = []
+
+    def notify(self, operation: str, entry: Any) -> None:
+        """
+        Queue an event for every interested endpoint, without waiting.
+        Usable as a DictionaryDB listener.
+
+        Args:
+            operation: Name of the operation
+            entry: Entry affected by the operation
+        """
+        if not self.endpoints:
+            return
+        self.sequence += 1
+        event = {
+            "id": str(uuid.uuid4()),
+            "type": EVENT_TYPES.get(operation, operation),
+            "sequence": self.sequence,
+            "timestamp": time.time(),
+            "entry": {"id": entry.id, "word": entry.word, "tags": list(entry.tags or [])},
+        }
+        for endpoint in self.endpoints:
+            if operation not in endpoint.events:
+                continue
+            try:
+                endpoint.queue.put_nowait(event)
+            except asyncio.QueueFull:
+                endpoint.failed += 1
+                self._dead_letter(endpoint, event, "queue full")
+
+    def _dead_letter(self, endpoint: WebhookEndpoint, event: Dict[str, Any], reason: str) -> None:
+        """
+        Buffer an event for the dead-letter file without blocking. Events
+        beyond the buffer are dropped and only counted. A single task writes
+        the buffer so appends to the file never interleave.
+        """
+        if len(self._overflow) >= self.dead_letter_buffer:
+            self._dropped += 1
+            if dead_letter_drop_sampler():
+                logger.error(f"Webhook dead-letter buffer full, dropped {self._dropped} event(s)")
+            return
+        self._overflow.append(DeadLetters.record(endpoint.url, event, reason))
+        if self._overflow_event is not None:
+            self._overflow_event.set()
+
+    async def _flush(self) -> None:
+        """
+        Write buffered dead letters to the file in a worker thread.
+        """
+        while self._overflow:
+            records, self._overflow = self._overflow, []
+            await asyncio.to_thread(self.dead_letters.write_records, records)
+
+    async def _run_flush(self) -> None:
+        """
+        Main loop of the task writing buffered dead letters, until the
+        dispatcher stops and the buffer is empty.
+        """
+        while not self._stopping:
+            await self._overflow_event.wait()
+            self._overflow_event.clear()
+            await self._flush()
+
+    def backoff(self, attempt: int) -> float:
+        """
+        Get a jittered exponential backoff.
+
+        Args:
+            attempt: Number of the attempt that failed, from 0
+
+        Returns:
+            Seconds to wait before the next attempt
+        """
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+
+    async def _collect(self, endpoint: WebhookEndpoint) -> List[Dict[str, Any]]:
+        """
+        Wait for the next batch of events of an endpoint.
+        """
+        batch = [await endpoint.queue.get()]
+        deadline = time.monotonic() + endpoint.batch_delay
+        while len(batch) < endpoint.batch_size:
+            if endpoint.queue.empty():
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(endpoint.queue.get(), timeout=remaining))
+                except asyncio.TimeoutError:
+                    break
+            else:
+                batch.append(endpoint.queue.get_nowait())
+        return batch
+
+    async def deliver(self, endpoint: WebhookEndpoint, batch: List[Dict[str, Any]]) -> Optional[str]:
+        """
+        POST a batch of events to an endpoint, retrying transient failures.
+
+        Args:
+            endpoint: Receiving endpoint
+            batch: Events to deliver
+
+        Returns:
+            None if delivered, otherwise why the batch was given up
+        """
+        body = json.dumps({"events": batch}, ensure_ascii=False).encode("utf-8")
+        headers = {"Content-Type": "application/json", **endpoint.sign(body)}
+        reason = None
+        for attempt in range(self.max_retries + 1):
+            if attempt:
+                await asyncio.sleep(delay)
+            try:
+                async with self._semaphore:
+                    response = await self._session.post(endpoint.url, content=body, headers=headers)
+            except httpx.HTTPError as e:
+                reason = f"{type(e).__name__}: {e}"
+                delay = self.backoff(attempt)
+                continue
+            if response.is_success:
+                return None
+            reason = f"HTTP {response.status_code}"
+            if response.status_code != 429 and response.status_code < 500:
+                # The receiver rejected the events, sending them again will not help
+                return reason
+            retry_after = response.headers.get("retry-after")
+            delay = float(retry_after) if retry_after and retry_after.isdigit() else self.backoff(attempt)
+            delay = min(delay, self.backoff_max)
+        return reason
+
+    async def _run(self, endpoint: WebhookEndpoint) -> None:
+        """
+        Main loop of the delivery task of an endpoint. Batches are delivered
+        one after the other so that the receiver gets events in order.
+        """
+        while True:
+            endpoint.in_flight = await self._collect(endpoint)
+            reason = await self.deliver(endpoint, endpoint.in_flight)
+            if reason is None:
+                endpoint.delivered += len(endpoint.in_flight)
+            else:
+                endpoint.failed += len(endpoint.in_flight)
+                logger.warning(f"Giving up delivering {len(endpoint.in_flight)} event(s) to {endpoint.url}: {reason}")
+                for event in endpoint.in_flight:
+                    self._dead_letter(endpoint, event, reason)
+            endpoint.in_flight = []
+
+    def start(self) -> None:
+        """
+        Start the delivery tasks on the running event loop.
+        """
+        if self._tasks or not self.endpoints:
+            return
+        self._session = httpx.AsyncClient(timeout=self.timeout)
+        self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        self._overflow_event = asyncio.Event()
+        if self._overflow:
+            self._overflow_event.set()
+        self._stopping = False
+        self._tasks = [asyncio.create_task(self._run(endpoint)) for endpoint in self.endpoints]
+        self._flusher = asyncio.create_task(self._run_flush())
+
+    async def stop(self, timeout: float = 5.0) -> None:
+        """
+        Stop the delivery tasks, giving queued events a chance to go out first.
+        Events still undelivered are dead-lettered.
+
+        Args:
+            timeout: Seconds to wait for the queues to drain
+        """
+        if not self._tasks:
+            return
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline and any(
+            not endpoint.queue.empty() or endpoint.in_flight for endpoint in self.endpoints
+        ):
+            await asyncio.sleep(0.05)
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        for endpoint in self.endpoints:
+            pending = list(endpoint.in_flight)
+            while not endpoint.queue.empty():
+                pending.append(endpoint.queue.get_nowait())
+            endpoint.in_flight = []
+            self._overflow.extend(DeadLetters.record(endpoint.url, event, "shutdown") for event in pending)
+        # Let the flush task finish its write and drain the buffer, rather
+        # than cancel it while a worker thread is appending to the file
+        self._stopping = True
+        self._overflow_event.set()
+        await self._flusher
+        self._flusher = None
+        self._overflow_event = None
+        await self._session.aclose()
+        self._session = None
+
+    def state(self) -> Dict[str, Any]:
+        """
+        Get the delivery state of each endpoint.
+        """
+        return {
+            endpoint.url: {
+                "queued": endpoint.queue.qsize(),
+                "in_flight": len(endpoint.in_flight),
+                "delivered": endpoint.delivered,
+                "failed": endpoint.failed,
+            }
+            for endpoint in self.endpoints
+        }
+
+
+def create_dispatcher(config: Dict[str, Any]) -> WebhookDispatcher:
+    """
+    Create the webhook dispatcher from the "webhooks" config option.
+
+    Args:
+        config: Parsed configuration file
+
+    Returns:
+        WebhookDispatcher, without endpoints if none is configured
+    """
+    endpoints = []
+    for option in config.get("config", {}).get("webhooks", []):
+        try:
+            endpoints.append(WebhookEndpoint.from_config(option))
+        except (TypeError, ValueError) as e:
+            logger.warning(f"Ignoring webhook: {e}")
+    if endpoints:
+        logger.info(f"Delivering entry events to {len(endpoints)} webhook(s)")
+    return WebhookDispatcher(endpoints)
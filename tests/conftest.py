@@ -0,0 +1,13 @@
+"""
+Shared test setup: the modules live flat in src/ and resolve their data
+folder from HOME when imported, so HOME points at a scratch directory
+before any of them is loaded.
+"""
+import os
+import sys
+import tempfile
+
+os.environ["HOME"] = os.environ["USERPROFILE"] = tempfile.mkdtemp(prefix="gist-dictionary-test-")
+os.environ.setdefault("GIST_DICTIONARY_LOG_LEVEL", "WARNING")
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
@@ -0,0 +1,55 @@
+"""
+Tests for incremental sync through /dictionary/changes.
+"""
+import pytest
+from fastapi.testclient import TestClient
+
+import server
+from db import DictionaryDB
+from dictionary import Dictionary, EntryCreate
+
+HEADERS = {"Authorization": "Bearer test_api_key"}
+
+
+@pytest.fixture
+def client(monkeypatch):
+    async def local_dictionary(reconcile: bool = False) -> Dictionary:
+        return server.db.get_dictionary()
+
+    # Serve the in-memory dictionary instead of reaching the gist
+    monkeypatch.setattr(server, "refresh_dictionary", local_dictionary)
+    return TestClient(server.app)
+
+
+def test_etag_round_trips_into_since(client):
+    response = client.get("/v1/dictionary", headers=HEADERS)
+    assert response.status_code == 200
+    etag = response.headers["ETag"]
+    assert etag.startswith('"')
+
+    created = server.db.create_entry(EntryCreate(word="neko", tags=["ja"]))
+    response = client.get("/v1/dictionary/changes", params={"since": etag}, headers=HEADERS)
+    assert response.status_code == 200
+    changes = response.json()
+    assert not changes["reset"]
+    assert [entry["id"] for entry in changes["created"]] == [created.id]
+
+    # The revision field of the answer is accepted as well
+    response = client.get("/v1/dictionary/changes", params={"since": changes["revision"]}, headers=HEADERS)
+    assert response.status_code == 200
+    assert response.json()["created"] == []
+
+
+@pytest.mark.parametrize("form", ["{}", '"{}"', 'W/"{}"'])
+def test_get_changes_accepts_bare_and_etag_forms(form):
+    db = DictionaryDB()
+    since = form.format(db.get_revision())
+    db.create_entry(EntryCreate(word="inu"))
+    changes = db.get_changes(since)
+    assert not changes.reset
+    assert [entry.word for entry in changes.created] == ["inu"]
+
+
+def test_get_changes_rejects_malformed_revision():
+    with pytest.raises(ValueError):
+        DictionaryDB().get_changes('"nodash"')
@@ -0,0 +1,46 @@
+"""
+Tests for workers following each other through the shared SQLite storage.
+"""
+import asyncio
+
+from cluster import WorkerCoordinator
+from db import DictionaryDB
+from dictionary import EntryCreate
+from storage import SQLiteBackend
+
+
+def make_worker(path, origin):
+    storage = SQLiteBackend(path, track_changes=True)
+    # Both workers run in this process, tell their changes apart anyway
+    storage.origin = origin
+    db = DictionaryDB()
+    db.add_listener(storage.record)
+    return storage, db, WorkerCoordinator(storage, lock_path=f"{path}.{origin}.lock", keep_changes=1)
+
+
+def test_poll_applies_changes_of_other_workers(tmp_path):
+    path = str(tmp_path / "dictionary.db")
+    writer_storage, writer_db, writer = make_worker(path, 1)
+    reader_storage, reader_db, reader = make_worker(path, 2)
+    writer.is_writer = True
+
+    async def scenario():
+        created = writer_db.create_entry(EntryCreate(word="neko", tags=["ja"]))
+        writer_db.create_entry(EntryCreate(word="inu"))
+        # Let the writer thread commit both mutations
+        await asyncio.to_thread(writer_storage._writer.submit(lambda: None).result)
+
+        assert await reader.poll(reader_db) == 2
+        assert reader_db.get_entry(created.id).word == "neko"
+        assert await reader.poll(reader_db) == 0
+
+        # The writer accounts the changes as journaled and prunes the older ones
+        assert await writer.poll(writer_db) == 0
+        assert writer_storage.get_writer_seq() == writer.cursor == 2
+        assert writer_storage.first_change() == 2
+
+    try:
+        asyncio.run(scenario())
+    finally:
+        writer_storage.close()
+        reader_storage.close()
@@ -0,0 +1,120 @@
+"""
+Tests for the columnar entry store and its ID hash table.
+"""
+import json
+import random
+import uuid
+
+from dictionary import Dictionary, Entry
+from entry_store import EntryStore
+
+
+def entry_ids(store):
+    return [store.id_at(slot) for slot in store.slots()]
+
+
+def legacy_to_json(entries):
+    """
+    Serializer of the dictionary before the entry store, as it was written.
+    """
+    return json.dumps(
+        {"wordbank": [{"id": entry.id, "word": entry.word, "tags": entry.tags} for entry in entries]},
+        ensure_ascii=False,
+        indent=2,
+        sort_keys=False
+    )
+
+
+def test_insert_find_delete_and_reinsert_across_compaction():
+    store = EntryStore()
+    ids = [str(uuid.uuid4()) for _ in range(200)] + [f"custom-{number}" for number in range(50)]
+    slots = {entry_id: store.append(entry_id, f"word {entry_id}", ["tag"]) for entry_id in ids}
+    assert all(store.find(entry_id) == slot for entry_id, slot in slots.items())
+    assert store.find(str(uuid.uuid4())) is None
+    # Not canonical, so it must not collide with the canonical form
+    assert store.find(ids[0].upper()) is None
+
+    deleted = ids[::3]
+    for entry_id in deleted:
+        store.delete(store.find(entry_id))
+    assert all(store.find(entry_id) is None for entry_id in deleted)
+    assert store.live == len(ids) - len(deleted)
+
+    store.compact()
+    kept = [entry_id for entry_id in ids if entry_id not in deleted]
+    assert entry_ids(store) == kept
+    for entry_id in kept:
+        slot = store.find(entry_id)
+        assert store.id_at(slot) == entry_id
+        assert store.word_at(slot) == f"word {entry_id}"
+
+    for entry_id in deleted:
+        slot = store.append(entry_id, "again", [])
+        assert store.find(entry_id) == slot
+    assert entry_ids(store) == kept + deleted
+
+
+def test_table_survives_many_tombstones():
+    store = EntryStore()
+    for round_number in range(20):
+        ids = [f"{round_number}-{number}" for number in range(100)]
+        for entry_id in ids:
+            store.append(entry_id, entry_id, [])
+        for entry_id in ids:
+            store.delete(store.find(entry_id))
+    store.append("last", "last", [])
+    assert store.find("last") is not None
+    assert store.find("19-99") is None
+
+
+def test_duplicate_ids_resolve_to_the_first_live_one():
+    store = EntryStore()
+    first = store.append("same", "first", [])
+    store.append("other", "other", [])
+    second = store.append("same", "second", [])
+    store.extend(["same"], ["third"], [[]])
+    assert store.find("same") == first
+
+    # As when the wordbank was a list, the next one shows up once the first is gone
+    store.delete(first)
+    assert store.find("same") == second
+    store.compact()
+    assert store.word_at(store.find("same")) == "second"
+    store.delete(store.find("same"))
+    assert store.word_at(store.find("same")) == "third"
+
+
+def test_slots_of_after_compaction():
+    store = EntryStore()
+    for number in range(100):
+        store.append(f"id-{number}", f"word-{number}", [])
+    for number in range(0, 100, 2):
+        store.delete(store.find(f"id-{number}"))
+    store.compact()
+    seqs = list(range(0, 100))
+    slots = list(store.slots_of(seqs))
+    assert [store.seqs[slot] for slot in slots] == list(range(1, 100, 2))
+    assert [store.word_at(slot) for slot in slots] == [f"word-{number}" for number in range(1, 100, 2)]
+    assert list(store.slots_of([1000, -1 + 1, 99])) == [store.find("id-99")]
+
+
+def test_to_json_matches_the_legacy_serializer():
+    rng = random.Random(3)
+    entries = [
+        Entry(id=str(uuid.uuid4()), word=rng.choice(["猫", "강아지", "naïve", 'quote"d', "back\\slash"]), tags=rng.sample(["ja", "ko", "n5", "x"], rng.randint(0, 3)))
+        for _ in range(300)
+    ] + [Entry(id="not-a-uuid", word="plain", tags=[])]
+    dictionary = Dictionary(wordbank=entries)
+    assert dictionary.to_json() == legacy_to_json(entries)
+
+    # The same after tag updates, deletes and a compaction
+    live = list(entries)
+    for entry in rng.sample(live, 50):
+        entry.tags = ["updated"]
+        dictionary.update_entry_tags(entry.id, ["updated"])
+    for entry in rng.sample(live, 200):
+        live.remove(entry)
+        dictionary.delete_entry(entry.id)
+    dictionary.compact()
+    assert dictionary.to_json() == legacy_to_json(live)
+    assert legacy_to_json([]) == Dictionary().to_json()
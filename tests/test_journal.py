@@ -0,0 +1,172 @@
+"""
+Tests for the operation journal: crash recovery of compaction, partial
+writes and idempotent replay.
+"""
+import os
+
+import pytest
+
+import journal as journal_module
+from db import DictionaryDB
+from dictionary import Entry
+from journal import Journal
+
+
+def entry(entry_id, word="word", tags=()):
+    return Entry(id=entry_id, word=word, tags=list(tags))
+
+
+def state(db):
+    return sorted((view.id, view.word, tuple(view.tags)) for view in db.get_dictionary().entries())
+
+
+def gist_db():
+    """
+    Database as loaded from the gist, holding the synchronized operations.
+    """
+    db = DictionaryDB()
+    db.create_entry(entry("a", "neko"))
+    db.create_entry(entry("b", "inu"))
+    return db
+
+
+EXPECTED = [("a", "neko", ("ja",)), ("c", "tori", ())]
+
+
+@pytest.fixture
+def journal_path(tmp_path):
+    return str(tmp_path / "operations.ndjson")
+
+
+def write_operations(journal):
+    journal.append("create", entry("a", "neko"))
+    journal.append("create", entry("b", "inu"))
+    journal.mark_synced(journal.offset())
+    journal.append("update_tags", entry("a", "neko", ["ja"]))
+    journal.append("delete", entry("b", "inu"))
+    journal.append("create", entry("c", "tori"))
+
+
+def replayed(journal):
+    db = gist_db()
+    journal.replay(db)
+    return db
+
+
+def fail_on_call(function, failing_call):
+    calls = []
+
+    def wrapper(*args, **kwargs):
+        calls.append(args)
+        if len(calls) == failing_call:
+            raise OSError("Simulated crash")
+        return function(*args, **kwargs)
+    return wrapper
+
+
+@pytest.mark.parametrize(
+    "failing_call, journal_left",
+    [
+        # .tail written, state reset fails: compaction is skipped
+        (1, True),
+        # State reset, journal not moved yet: journal and .tail present
+        (2, True),
+        # Journal moved to history, .tail not moved yet: journal missing
+        (3, False),
+    ],
+)
+def test_recovers_from_interrupted_compaction(journal_path, monkeypatch, failing_call, journal_left):
+    journal = Journal(journal_path, compact_threshold=1 << 30)
+    write_operations(journal)
+    # The first os.replace() is the atomic rename of the state file
+    monkeypatch.setattr(journal_module.os, "replace", fail_on_call(os.replace, failing_call))
+    if failing_call == 1:
+        journal.compact()
+        assert not os.path.exists(f"{journal_path}.tail")
+    else:
+        with pytest.raises(OSError):
+            journal.compact()
+        assert os.path.exists(f"{journal_path}.tail")
+    monkeypatch.undo()
+    assert os.path.exists(journal_path) == journal_left
+    journal._file.close()
+
+    recovered = Journal(journal_path)
+    assert not os.path.exists(f"{journal_path}.tail")
+    operations = [record["op"] for record in recovered.pending()]
+    # Synchronized operations may come again, unconfirmed ones may not be lost
+    assert operations[-3:] == ["update_tags", "delete", "create"]
+    assert state(replayed(recovered)) == EXPECTED
+
+    # And the recovered journal keeps working
+    recovered.append("update_tags", entry("c", "tori", ["bird"]))
+    recovered.reopen()
+    assert recovered.pending()[-1]["tags"] == ["bird"]
+    recovered.close()
+
+
+def test_recovers_from_crash_before_state_reset(journal_path, monkeypatch):
+    journal = Journal(journal_path, compact_threshold=1 << 30)
+    write_operations(journal)
+    synced = journal.synced
+
+    def crash(*args, **kwargs):
+        raise OSError("Simulated crash")
+    monkeypatch.setattr(journal_module, "write_json_file", crash)
+    with pytest.raises(OSError):
+        journal.compact()
+    monkeypatch.undo()
+    journal._file.close()
+
+    recovered = Journal(journal_path)
+    assert not os.path.exists(f"{journal_path}.tail")
+    assert recovered.synced == synced
+    assert state(replayed(recovered)) == EXPECTED
+    recovered.close()
+
+
+def test_compaction_keeps_unconfirmed_operations(journal_path):
+    journal = Journal(journal_path, compact_threshold=1 << 30)
+    write_operations(journal)
+    journal.compact()
+    assert journal.synced == 0
+    assert [record["op"] for record in journal.pending()] == ["update_tags", "delete", "create"]
+    assert state(replayed(journal)) == EXPECTED
+    journal.close()
+
+
+def test_partial_trailing_line_is_dropped(journal_path):
+    journal = Journal(journal_path)
+    write_operations(journal)
+    journal.close()
+    with open(journal_path, "ab") as f:
+        f.write(b'{"op": "create", "id": "d", "wo')
+
+    recovered = Journal(journal_path)
+    assert [record["id"] for record in recovered.pending()] == ["a", "b", "c"]
+    # An operation appended after the crash is not glued to the partial line
+    recovered.append("create", entry("e", "kame"))
+    recovered.reopen()
+    assert [record["id"] for record in recovered.pending()][-1] == "e"
+    recovered.close()
+
+
+def test_replay_is_idempotent(journal_path):
+    journal = Journal(journal_path)
+    write_operations(journal)
+    journal.append("create", entry("a", "neko", ["n5"]))
+    journal.append("delete", entry("missing"))
+    journal.append("update_tags", entry("missing", tags=["x"]))
+    expected = [("a", "neko", ("n5",)), ("c", "tori", ())]
+
+    db = gist_db()
+    journal.replay(db)
+    assert state(db) == expected
+    journal.replay(db)
+    assert state(db) == expected
+
+    # Replaying the whole journal, synchronized part included, ends the same
+    for record in journal.read():
+        db.apply_operation(record)
+    assert state(db) == expected
+    journal.close()
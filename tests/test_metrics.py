@@ -0,0 +1,27 @@
+"""
+Tests for the HTTP metrics middleware labels.
+"""
+import asyncio
+
+from metrics import Histogram, MetricsMiddleware
+
+
+async def app(scope, receive, send):
+    await send({"type": "http.response.start", "status": 405, "headers": []})
+    await send({"type": "http.response.body", "body": b""})
+
+
+def test_non_standard_methods_share_one_series():
+    histogram = Histogram("test_http_request_duration_seconds", "Test", ("method", "route", "status"))
+    middleware = MetricsMiddleware(app, histogram)
+
+    async def send(message):
+        pass
+
+    async def scenario():
+        for method in ("GET", "PROPFIND", "X-RANDOM-1", "X-RANDOM-2"):
+            await middleware({"type": "http", "method": method, "path": "/"}, None, send)
+
+    asyncio.run(scenario())
+    assert sorted(histogram._children) == [("GET", "unmatched", "405"), ("OTHER", "unmatched", "405")]
+    assert sum(histogram.labels("OTHER", "unmatched", 405).counts) == 3
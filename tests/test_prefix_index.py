@@ -0,0 +1,59 @@
+"""
+Tests for the prefix index and its staged additions and removals.
+"""
+import random
+from types import SimpleNamespace
+
+from db import DictionaryDB
+from dictionary import EntryCreate
+from prefix_index import PrefixIndex, normalize_word
+
+
+def expected(live, prefix, limit):
+    normalized = normalize_word(prefix)
+    pairs = sorted((normalize_word(word), key) for key, word in live.items())
+    return [key for word, key in pairs if word.startswith(normalized)][:limit]
+
+
+def test_matches_a_sorted_scan_through_adds_removes_and_compactions():
+    rng = random.Random(7)
+    live = {key: "".join(rng.choices("abAB", k=rng.randint(1, 4))) for key in range(500)}
+    index = PrefixIndex.from_entries(SimpleNamespace(word=word, seq=key) for key, word in live.items())
+    index.merge_at = 20
+    next_key = len(live)
+    for _ in range(3000):
+        roll = rng.random()
+        if roll < 0.3:
+            live[next_key] = "".join(rng.choices("abAB", k=3))
+            index.add(live[next_key], next_key)
+            next_key += 1
+        elif roll < 0.4:
+            batch = [("".join(rng.choices("ab", k=2)), next_key + offset) for offset in range(rng.randint(1, 50))]
+            index.add_many(batch)
+            live.update((key, word) for word, key in batch)
+            next_key += len(batch)
+        elif roll < 0.75 and live:
+            key = rng.choice(list(live))
+            assert index.remove(live.pop(key), key)
+            assert not index.remove("zz", key)
+        else:
+            prefix = "".join(rng.choices("abAB", k=rng.randint(0, 2)))
+            assert index.search(prefix, 15) == expected(live, prefix, 15)
+    assert len(index) == len(live)
+
+
+def test_equal_words_stay_in_key_order():
+    index = PrefixIndex()
+    for key in (5, 1, 3):
+        index.add("Neko", key)
+    index.add_many([("neko", 2), ("neko", 4)])
+    index.compact()
+    assert index.search("ne") == [1, 2, 3, 4, 5]
+    assert index.remove("NEKO", 3)
+    assert index.search("neko") == [1, 2, 4, 5]
+
+
+def test_create_entries_indexes_words_for_suggestions():
+    db = DictionaryDB()
+    db.create_entries([EntryCreate(word=word) for word in ("inu", "neko", "inari")])
+    assert [entry.word for entry in db.suggest("in")] == ["inari", "inu"]
@@ -0,0 +1,26 @@
+"""
+Tests for the SQLite storage backend.
+"""
+import asyncio
+
+from db import DictionaryDB
+from dictionary import Dictionary
+from storage import SQLiteBackend
+
+
+def test_reset_keeps_first_of_duplicate_ids(tmp_path):
+    storage = SQLiteBackend(str(tmp_path / "dictionary.db"))
+    db = DictionaryDB()
+    db.load_dictionary(Dictionary.from_columns(["a", "b", "a"], ["first", "other", "second"], [["x"], [], ["y"]]))
+    try:
+        asyncio.run(storage.reset(db, "gist"))
+        stored = storage.load("gist")
+        assert stored is not None
+        dictionary, _ = stored
+        assert [(entry.id, entry.word, entry.tags) for entry in dictionary.entries()] == [
+            ("a", "first", ["x"]),
+            ("b", "other", []),
+        ]
+        assert db.get_dictionary().get_entry("a").word == dictionary.get_entry("a").word
+    finally:
+        storage.close()
@@ -0,0 +1,48 @@
+"""
+Tests for the write-behind syncer and its bounded shutdown flush.
+"""
+import asyncio
+import time
+
+import httpx
+import pytest
+
+from ratelimit import PRIORITY_WRITE, GistScheduler, RateLimited
+from sync import GistSyncer
+
+
+def test_stop_bounds_the_final_push_and_keeps_changes_pending():
+    waits = []
+
+    async def push(max_wait):
+        waits.append(max_wait)
+        return False
+
+    async def scenario():
+        syncer = GistSyncer(push, debounce=60, max_delay=60)
+        syncer.mark_ready()
+        syncer.start()
+        syncer.notify("create")
+        syncer.notify("delete")
+        assert not await syncer.stop(10.0)
+        return syncer.pending
+
+    assert asyncio.run(scenario()) == 2
+    assert waits == [10.0]
+
+
+def test_blocked_write_with_max_wait_fails_fast():
+    async def send():
+        return httpx.Response(200)
+
+    async def scenario():
+        scheduler = GistScheduler()
+        # As after a Retry-After of an hour
+        scheduler.blocked_until = time.time() + 3600
+        start = time.monotonic()
+        with pytest.raises(RateLimited) as error:
+            await scheduler.request(send, PRIORITY_WRITE, max_wait=10.0)
+        assert time.monotonic() - start < 1.0
+        assert error.value.retry_in > 3000
+
+    asyncio.run(scenario())